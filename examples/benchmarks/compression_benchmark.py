@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark compression options for channel datasets.
+
+Writes synthetic MT count data (int32 random walk, similar to a 24 bit
+digitizer) with different compression settings and reports the write
+speed, read speed and compression ratio.
+
+    python compression_benchmark.py --n_samples 10000000
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from mth5 import mth5
+
+# =============================================================================
+# compression options to test
+# =============================================================================
+options = [('none', {'compression': 'none'}),
+           ('gzip-1', {'compression': 'gzip', 'compression_opts': 1}),
+           ('gzip-4', {'compression': 'gzip', 'compression_opts': 4}),
+           ('gzip-4 shuffle', {'compression': 'gzip', 'compression_opts': 4,
+                               'shuffle': True}),
+           ('lzf', {'compression': 'lzf'}),
+           ('lzf shuffle', {'compression': 'lzf', 'shuffle': True}),
+           ('scaleoffset gzip-4', {'compression': 'gzip',
+                                   'compression_opts': 4,
+                                   'scaleoffset': 0}),
+           ('blosc', {'compression': 'blosc', 'compression_opts': 5}),
+           ('bitshuffle', {'compression': 'bitshuffle'})]
+
+def make_counts(n_samples):
+    """
+    Make a random walk of integer counts that looks like MT data.
+    """
+    steps = np.random.normal(0, 50, n_samples).astype(np.int32)
+    return np.cumsum(steps, dtype=np.int32)
+
+def run_benchmark(n_samples, repeat=3):
+    data = make_counts(n_samples)
+    n_mb = data.nbytes / 1E6
+    lines = ['{0:<22}{1:>12}{2:>12}{3:>10}'.format('option', 'write MB/s',
+                                                  'read MB/s', 'ratio')]
+    lines.append('-' * len(lines[0]))
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for name, kwargs in options:
+            fn = Path(temp_dir).joinpath('benchmark.mth5')
+            m = mth5.MTH5()
+            m.open_mth5(fn, 'w')
+            run = m.add_station('MT001').add_run('MT001a')
+            try:
+                t0 = time.perf_counter()
+                ch = run.add_channel('Ex', 'electric', data, **kwargs)
+                ch_path = ch.hdf5_dataset.name
+                m.close_mth5()
+                write_time = time.perf_counter() - t0
+            except Exception as error:
+                m.close_mth5()
+                lines.append('{0:<22}skipped: {1}'.format(name, error))
+                continue
+
+            read_time = np.inf
+            for ii in range(repeat):
+                with h5py.File(fn, 'r') as h5_obj:
+                    ds = h5_obj[ch_path]
+                    t0 = time.perf_counter()
+                    ds[()]
+                    read_time = min(read_time, time.perf_counter() - t0)
+                    storage = ds.id.get_storage_size()
+
+            lines.append('{0:<22}{1:>12.1f}{2:>12.1f}{3:>10.2f}'.format(
+                name, n_mb / write_time, n_mb / read_time,
+                data.nbytes / storage))
+
+    return '\n'.join(lines)
+
+# =============================================================================
+# run
+# =============================================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--n_samples', type=int, default=5000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(run_benchmark(args.n_samples, args.repeat))
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark MTTS.get_slice.
+
+Compares selecting a window with boolean masks over the full time index,
+how get_slice used to work, with get_slice on the implicit regular time
+axis (index arithmetic) and on a stored time coordinate (binary search).
+The default is 10^8 samples, which needs about 2 GB of memory for the
+samples plus the time coordinate.
+
+    python get_slice_benchmark.py --n_samples 100000000 --repeat 5
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import argparse
+import time
+
+import numpy as np
+
+from mth5 import metadata
+from mth5.timeseries import MTTS
+from mth5.utils.mttime import MTime
+
+# =============================================================================
+# boolean mask version to compare against
+# =============================================================================
+def get_slice_mask(ts, start, end):
+    times = ts.time.values
+    return ts.isel(time=(times >= MTime(start).datetime64) &
+                        (times <= MTime(end).datetime64))
+
+def time_it(func, repeat):
+    t0 = time.perf_counter()
+    for ii in range(repeat):
+        result = func()
+    return (time.perf_counter() - t0) / repeat * 1E3, result
+
+def run_benchmark(n_samples, sample_rate, repeat):
+    ch_metadata = metadata.Electric()
+    ch_metadata.sample_rate = sample_rate
+    ch_metadata.time_period.start = '2020-01-01T00:00:00'
+    mtts = MTTS('electric', data=np.zeros(n_samples, dtype=np.float32),
+                channel_metadata=ch_metadata)
+
+    # a window of 1000 samples in the middle of the series
+    start = MTime()
+    start.epoch_ns = int(mtts.time_index[n_samples // 2])
+    end = MTime()
+    end.epoch_ns = int(mtts.time_index[n_samples // 2 + 999])
+
+    lines = ['{0:<22}{1:>14}{2:>12}{3:>8}'.format('method', 'time [ms]',
+                                                 'n_samples', 'view')]
+    lines.append('-' * len(lines[0]))
+
+    def add_line(name, t, ts_slice):
+        lines.append('{0:<22}{1:>14.3f}{2:>12}{3:>8}'.format(
+            name, t, ts_slice.size,
+            str(np.shares_memory(ts_slice.values, mtts.ts.values))))
+
+    add_line('regular axis', *time_it(lambda: mtts.get_slice(start, end),
+                                      repeat))
+    mtts.materialize_time()
+    add_line('time coordinate', *time_it(lambda: mtts.get_slice(start, end),
+                                         repeat))
+    add_line('boolean mask', *time_it(
+        lambda: get_slice_mask(mtts.ts, start, end), repeat))
+
+    return '\n'.join(lines)
+
+# =============================================================================
+# run
+# =============================================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--n_samples', type=int, default=10**8)
+    parser.add_argument('--sample_rate', type=float, default=4096)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(run_benchmark(args.n_samples, args.sample_rate, args.repeat))
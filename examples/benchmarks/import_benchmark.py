@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the time to import mth5.metadata and build the standards.
+
+Reports the time to build the standards dictionaries from the csv files and
+from the binary standards cache, and the wall time of a new python process
+importing mth5.metadata and making its first metadata object, which is when
+the standards are loaded.
+
+    python import_benchmark.py --repeat 10
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import argparse
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from mth5.standards import schema
+
+# =============================================================================
+# benchmarks
+# =============================================================================
+def clear_standards():
+    schema._STANDARDS_REGISTRY.clear()
+    schema._read_csv.cache_clear()
+
+def build_from_csv():
+    clear_standards()
+    t0 = time.perf_counter()
+    standards = schema.Standards()
+    for name in schema.Standards.level_names():
+        getattr(standards, name)
+    standards.ATTR_DICT
+    return time.perf_counter() - t0
+
+def build_from_cache(cache_fn):
+    clear_standards()
+    t0 = time.perf_counter()
+    schema.load_standards_cache(cache_fn)
+    schema.Standards().ATTR_DICT
+    return time.perf_counter() - t0
+
+def import_time():
+    t0 = time.perf_counter()
+    subprocess.run([sys.executable, '-c',
+                    'from mth5 import metadata; metadata.Station()'],
+                   check=True, capture_output=True)
+    return time.perf_counter() - t0
+
+def run_benchmark(repeat):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache_fn = Path(temp_dir).joinpath('standards_cache.pickle')
+        schema.save_standards_cache(cache_fn)
+
+        csv_time = min([build_from_csv() for ii in range(repeat)])
+        cache_time = min([build_from_cache(cache_fn) for ii in range(repeat)])
+
+    process_time = min([import_time() for ii in range(repeat)])
+
+    lines = ['build standards from csv:    {0:8.1f} ms'.format(csv_time * 1E3),
+             'build standards from cache:  {0:8.1f} ms'.format(
+                 cache_time * 1E3),
+             'first Station in a new process: {0:8.1f} ms'.format(
+                 process_time * 1E3)]
+    return '\n'.join(lines)
+
+# =============================================================================
+# run
+# =============================================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    print(run_benchmark(args.repeat))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark metadata to_dict and from_dict.
+
+Compares the accessor based `to_dict`/`from_dict` with the attribute by
+attribute path through `get_attr_from_name`/`set_attr_from_name` for
+Station, Run, Electric and Magnetic.
+
+    python metadata_benchmark.py --repeat 500
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import argparse
+import time
+from collections import OrderedDict
+
+from mth5 import metadata
+from mth5.utils import helpers
+
+# =============================================================================
+# attribute by attribute versions to compare against
+# =============================================================================
+def to_dict_by_name(meta_obj):
+    meta_dict = {}
+    for name in list(meta_obj._attr_dict.keys()):
+        try:
+            meta_dict[name] = meta_obj.get_attr_from_name(name)
+        except AttributeError:
+            meta_dict[name] = None
+    return {meta_obj._class_name.lower(): OrderedDict(sorted(
+        meta_dict.items()))}
+
+def from_dict_by_name(meta_obj, meta_dict):
+    class_name = list(meta_dict.keys())[0]
+    for name, value in helpers.flatten_dict(meta_dict[class_name]).items():
+        meta_obj.set_attr_from_name(name, value)
+
+def time_it(func, repeat):
+    t0 = time.perf_counter()
+    for ii in range(repeat):
+        func()
+    return (time.perf_counter() - t0) / repeat * 1E6
+
+def run_benchmark(repeat):
+    lines = ['{0:<10}{1:>14}{2:>14}{3:>14}{4:>14}'.format(
+        'class', 'to_dict old', 'to_dict new', 'from_dict old',
+        'from_dict new')]
+    lines.append('{0:<10}{1:>14}{1:>14}{1:>14}{1:>14}'.format('', '[us]'))
+    lines.append('-' * len(lines[0]))
+    for meta_class in [metadata.Station, metadata.Run, metadata.Electric,
+                       metadata.Magnetic]:
+        meta_obj = meta_class()
+        meta_obj.time_period.start = '2020-01-01T12:00:00'
+        meta_dict = meta_obj.to_dict()
+        new_obj = meta_class()
+
+        lines.append('{0:<10}{1:>14.1f}{2:>14.1f}{3:>14.1f}{4:>14.1f}'.format(
+            meta_class.__name__,
+            time_it(lambda: to_dict_by_name(meta_obj), repeat),
+            time_it(meta_obj.to_dict, repeat),
+            time_it(lambda: from_dict_by_name(new_obj, meta_dict), repeat),
+            time_it(lambda: new_obj.from_dict(meta_dict), repeat)))
+
+    return '\n'.join(lines)
+
+# =============================================================================
+# run
+# =============================================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--repeat', type=int, default=500)
+    args = parser.parse_args()
+
+    print(run_benchmark(args.repeat))
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark mth5.parallel.read_many.
+
+Compares reading every channel of a file one after the other in one
+process with reading them with a pool of worker processes into shared
+memory.  Channels are gzip compressed so that reading is bound by
+decompression, like most archived files.
+
+    python parallel_read_benchmark.py --n_channels 100 --n_samples 1000000
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import argparse
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from mth5 import mth5
+from mth5.parallel import ChannelLocator, read_many
+
+# =============================================================================
+# make a file to read
+# =============================================================================
+def make_file(fn, n_channels, n_samples):
+    mth5_obj = mth5.MTH5(compression='gzip', compression_opts=4)
+    mth5_obj.open_mth5(fn, mode='w')
+    station = mth5_obj.add_station('MT001')
+    locators = []
+    for ii in range(n_channels):
+        # 10 channels per run, the run summary table holds 20
+        run = station.add_run('MT001{0:03}'.format(ii // 10))
+        data = np.cumsum(np.random.randn(n_samples)).astype(np.float32)
+        channel = run.add_channel('ch{0:03}'.format(ii), 'electric', data)
+        locators.append(ChannelLocator.from_channel(channel))
+    mth5_obj.close_mth5()
+    return locators
+
+def run_benchmark(n_channels, n_samples, workers, repeat):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        locators = make_file(Path(tmp_dir).joinpath('parallel.mth5'),
+                             n_channels, n_samples)
+        lines = ['{0} channels of {1} samples'.format(n_channels,
+                                                      n_samples)]
+        lines.append('{0:<22}{1:>12}'.format('method', 'time [s]'))
+        lines.append('-' * len(lines[1]))
+        for max_workers in workers:
+            name = ('one process' if max_workers == 0 else
+                    '{0} workers'.format(max_workers))
+            t0 = time.perf_counter()
+            for ii in range(repeat):
+                read_many(locators, max_workers=max_workers)
+            lines.append('{0:<22}{1:>12.3f}'.format(
+                name, (time.perf_counter() - t0) / repeat))
+
+    return '\n'.join(lines)
+
+# =============================================================================
+# run
+# =============================================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--n_channels', type=int, default=100)
+    parser.add_argument('--n_samples', type=int, default=1000000)
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=[0, 2, os.cpu_count() or 1])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(run_benchmark(args.n_channels, args.n_samples, args.workers,
+                        args.repeat))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark MTH5.rebuild_summaries.
+
+Compares rebuilding the station, run and channel summary tables by
+getting every station, run and channel through the object API and adding
+each table entry, with rebuild_summaries which scans the file once reading
+only attributes and writes each table once.
+
+    python rebuild_summaries_benchmark.py --n_stations 100 --n_runs 2
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from mth5 import mth5
+
+# =============================================================================
+# rebuild through the object API to compare against
+# =============================================================================
+def rebuild_object_api(mth5_obj):
+    stations = mth5_obj.stations_group
+    stations.summary_table.replace_rows(
+        np.zeros(0, dtype=stations.summary_table.dtype))
+    for station_name in stations.groups_list:
+        if station_name in ['Summary', 'Channel_Catalog']:
+            continue
+        station = stations.get_station(station_name)
+        station.summary_table.replace_rows(
+            np.zeros(0, dtype=station.summary_table.dtype))
+        for run_name in station.groups_list:
+            if run_name == 'Summary':
+                continue
+            run = station.get_run(run_name)
+            run.summary_table.replace_rows(
+                np.zeros(0, dtype=run.summary_table.dtype))
+            for channel_name in run.groups_list:
+                if channel_name == 'Summary':
+                    continue
+                run.summary_table.add_row(
+                    run.get_channel(channel_name).table_entry)
+            station.summary_table.add_row(run.table_entry)
+
+def make_file(fn, n_stations, n_runs, components):
+    mth5_obj = mth5.MTH5()
+    mth5_obj.open_mth5(fn, mode='w')
+    data = np.zeros(16, dtype=np.float32)
+    for ii in range(n_stations):
+        station = mth5_obj.add_station('MT{0:03}'.format(ii))
+        for jj in range(n_runs):
+            run = station.add_run(chr(97 + jj))
+            for comp in components:
+                run.add_channel(comp, 'electric', data)
+    return mth5_obj
+
+def run_benchmark(n_stations, n_runs, repeat):
+    components = ['Ex', 'Ey', 'Hx', 'Hy', 'Hz']
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        mth5_obj = make_file(Path(tmp_dir).joinpath('rebuild.mth5'),
+                             n_stations, n_runs, components)
+        try:
+            lines = ['{0} stations, {1} runs, {2} channels'.format(
+                n_stations, n_stations * n_runs,
+                n_stations * n_runs * len(components))]
+            lines.append('{0:<22}{1:>12}'.format('method', 'time [s]'))
+            lines.append('-' * len(lines[1]))
+            for name, func in [
+                    ('object API', lambda: rebuild_object_api(mth5_obj)),
+                    ('rebuild_summaries',
+                     lambda: mth5_obj.rebuild_summaries()),
+                    ('verify',
+                     lambda: mth5_obj.rebuild_summaries(verify=True))]:
+                t0 = time.perf_counter()
+                for ii in range(repeat):
+                    func()
+                lines.append('{0:<22}{1:>12.3f}'.format(
+                    name, (time.perf_counter() - t0) / repeat))
+        finally:
+            mth5_obj.close_mth5()
+
+    return '\n'.join(lines)
+
+# =============================================================================
+# run
+# =============================================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--n_stations', type=int, default=100)
+    parser.add_argument('--n_runs', type=int, default=2)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(run_benchmark(args.n_stations, args.n_runs, args.repeat))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark MTH5Table.locate.
+
+Compares reading the column from the file on every query, how locate used
+to work, with the cached column and with a hash index for 'eq' on a
+string column and a sorted index for 'ge' on a time column.
+
+    python table_locate_benchmark.py --n_rows 500 --repeat 1000
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import h5py
+import numpy as np
+
+from mth5.mth5_groups import MTH5Table
+from mth5.utils.mttime import MTimeArray
+
+# =============================================================================
+# reading the column each time to compare against
+# =============================================================================
+def locate_uncached(dataset, column, value, test):
+    test_array = dataset[column]
+    if column == 'start':
+        test_array = MTimeArray(test_array.astype(str)).datetime64
+        return np.where(test_array >= value)[0]
+    return np.where(test_array == value)[0]
+
+def time_it(func, repeat):
+    t0 = time.perf_counter()
+    for ii in range(repeat):
+        result = func()
+    return (time.perf_counter() - t0) / repeat * 1E6, result
+
+def make_table(fn, n_rows):
+    dtype = np.dtype([('attribute', 'S72'), ('start', 'S32')])
+    starts = MTimeArray.from_ns(np.arange(n_rows, dtype=np.int64) *
+                                3600 * 10**9)
+    rows = np.array([('attribute_{0:05}'.format(ii).encode(),
+                      start.encode())
+                     for ii, start in enumerate(starts.iso_str)],
+                    dtype=dtype)
+    h5 = h5py.File(fn, 'w')
+    h5.create_dataset('Summary', data=rows, maxshape=(None, ))
+    return h5
+
+def run_benchmark(n_rows, repeat):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        h5 = make_table(Path(tmp_dir).joinpath('table.h5'), n_rows)
+        try:
+            return _run_benchmark(h5['Summary'], n_rows, repeat)
+        finally:
+            h5.close()
+
+def _run_benchmark(dataset, n_rows, repeat):
+    table = MTH5Table(dataset)
+    name = 'attribute_{0:05}'.format(n_rows // 2)
+    start = table.get_column('start')[n_rows // 2].decode()
+    start64 = MTimeArray([start]).datetime64[0]
+
+    lines = ['{0:<22}{1:>12}{2:>16}'.format('method', 'test',
+                                           'time [us]')]
+    lines.append('-' * len(lines[0]))
+
+    def add_line(method, test, t):
+        lines.append('{0:<22}{1:>12}{2:>16.2f}'.format(method, test, t))
+
+    for column, value, test, value_uncached in [
+            ('attribute', name, 'eq', np.bytes_(name)),
+            ('start', start, 'ge', start64)]:
+        add_line('read column', test, time_it(
+            lambda: locate_uncached(dataset, column, value_uncached, test),
+            repeat)[0])
+        table.drop_index(column)
+        add_line('cached column', test, time_it(
+            lambda: table.locate(column, value, test), repeat)[0])
+        table.create_index(column,
+                           kind='sorted' if column == 'start' else 'hash')
+        add_line('{0} index'.format(table.indexes[column]), test, time_it(
+            lambda: table.locate(column, value, test), repeat)[0])
+
+    return '\n'.join(lines)
+
+# =============================================================================
+# run
+# =============================================================================
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--n_rows', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=1000)
+    args = parser.parse_args()
+
+    print(run_benchmark(args.n_rows, args.repeat))
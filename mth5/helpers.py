@@ -13,8 +13,26 @@ import h5py
 import gc
 import logging
 
+import numpy as np
+
+from mth5.utils.exceptions import MTH5Error
+from mth5.utils.helpers import to_numpy_type
+
 logger = logging.getLogger(__name__)
 
+# compression filters that can be used for channel datasets, blosc and
+# bitshuffle need hdf5plugin to be installed
+COMPRESSION = ['gzip', 'lzf', 'szip', 'blosc', 'bitshuffle']
+COMPRESSION_LEVELS = {'gzip': range(10),
+                      'lzf': [None],
+                      'szip': [('ec', 8), ('ec', 16), ('ec', 32),
+                               ('nn', 8), ('nn', 16), ('nn', 32)],
+                      'blosc': range(10),
+                      'bitshuffle': [None]}
+# keys for dataset compression options stored in the file attributes
+DATASET_OPTIONS = ['compression', 'compression_opts', 'shuffle',
+                   'fletcher32', 'scaleoffset']
+
 def recursive_hdf5_tree(group, lines=[]):
     if isinstance(group, (h5py._hl.group.Group, h5py._hl.files.File)):
         for key, value in group.items():
@@ -39,6 +57,56 @@ def close_open_files():
                 msg += 'File already closed.'
                 logger.info(msg)
                 
+def attribute_equal(old_value, new_value):
+    """
+    Test if an attribute value read from HDF5 is the same as a new value,
+    including the kind of data type so a change from int to float is
+    still written.
+
+    :param old_value: value read from the HDF5 attributes
+    :param new_value: value converted with `to_numpy_type`
+    :return: True if the values are the same
+    :rtype: bool
+
+    """
+    old_array = np.asarray(old_value)
+    new_array = np.asarray(new_value)
+    if old_array.dtype.kind != new_array.dtype.kind:
+        return False
+    try:
+        return bool(np.array_equal(old_array, new_array))
+    except (TypeError, ValueError):
+        return False
+
+def write_attributes(h5_object, attr_dict):
+    """
+    Write a dictionary of attributes to an HDF5 object.  Values are
+    converted with `to_numpy_type` and only attributes that are new or have
+    changed are written.
+
+    :param h5_object: HDF5 object to write attributes to
+    :type h5_object: :class:`h5py.Group` or :class:`h5py.Dataset`
+    :param attr_dict: attribute names and values
+    :type attr_dict: dictionary
+    :return: names of the attributes that were written
+    :rtype: list
+
+    """
+    attrs = h5_object.attrs
+    existing = dict(attrs.items())
+
+    written = []
+    for key, value in attr_dict.items():
+        value = to_numpy_type(value)
+        if key in existing and attribute_equal(existing[key], value):
+            continue
+        attrs.create(key, value)
+        written.append(key)
+
+    logger.debug('wrote %s of %s attributes to %s', len(written),
+                 len(attr_dict), h5_object.name)
+    return written
+                
 def get_tree(parent):
     """
     Simple function to recursively print the contents of an hdf5 group
@@ -71,4 +139,164 @@ def get_tree(parent):
 
     #lines.append(parent.name)
     parent.visititems(fancy_print) 
-    return '\n'.join(lines)
\ No newline at end of file
+    return '\n'.join(lines)
+
+def validate_compression(compression, level):
+    """
+    Validate the compression type and level.
+
+    :param compression: [ gzip | lzf | szip | blosc | bitshuffle | None ]
+    :type compression: string
+    :param level: compression level, depends on the compression type
+    :type level: integer or tuple for szip
+    :return: compression, level
+    :rtype: tuple
+    :raises MTH5Error: if the compression or level is not supported
+
+    """
+    if compression in [None, False, 'none', 'None', '']:
+        return None, None
+
+    if not isinstance(compression, str):
+        msg = "compression must be a string not {0}".format(type(compression))
+        logger.error(msg)
+        raise MTH5Error(msg)
+    compression = compression.lower()
+
+    if compression not in COMPRESSION:
+        msg = "compression {0} not understood, must be in {1}".format(
+            compression, COMPRESSION)
+        logger.error(msg)
+        raise MTH5Error(msg)
+
+    if compression in ['gzip'] and level is None:
+        level = 4
+    if compression in ['blosc'] and level is None:
+        level = 5
+    if compression in ['szip'] and level is None:
+        level = ('nn', 16)
+    if isinstance(level, list):
+        level = tuple(level)
+
+    if level not in COMPRESSION_LEVELS[compression]:
+        msg = "compression level {0} not supported for {1}, use {2}".format(
+            level, compression, list(COMPRESSION_LEVELS[compression]))
+        logger.error(msg)
+        raise MTH5Error(msg)
+
+    return compression, level
+
+def get_dataset_options(compression=None, compression_opts=None,
+                        shuffle=False, fletcher32=False, scaleoffset=None):
+    """
+    Get the keyword arguments for :meth:`h5py.Group.create_dataset` for the
+    given compression and filter options.
+
+    :param compression: [ gzip | lzf | szip | blosc | bitshuffle | None ],
+                        defaults to None
+    :type compression: string, optional
+    :param compression_opts: compression level, defaults to None
+    :type compression_opts: integer, optional
+    :param shuffle: use the HDF5 shuffle filter, defaults to False
+    :type shuffle: bool, optional
+    :param fletcher32: add a fletcher32 checksum, defaults to False
+    :type fletcher32: bool, optional
+    :param scaleoffset: scale-offset filter, for integer data the number of
+                        bits to keep where 0 is lossless, defaults to None
+    :type scaleoffset: integer, optional
+    :return: keyword arguments for create_dataset
+    :rtype: dictionary
+    :raises MTH5Error: if blosc or bitshuffle is requested and hdf5plugin
+                       is not installed
+
+    :Example: ::
+
+        >>> get_dataset_options('gzip', 4, shuffle=True)
+        {'compression': 'gzip', 'compression_opts': 4, 'shuffle': True}
+
+    """
+    compression, compression_opts = validate_compression(compression,
+                                                         compression_opts)
+    options = {}
+    if compression in ['blosc', 'bitshuffle']:
+        try:
+            import hdf5plugin
+        except ImportError:
+            msg = ("{0} compression requires hdf5plugin, " +
+                   "install with pip install hdf5plugin").format(compression)
+            logger.error(msg)
+            raise MTH5Error(msg)
+        if compression in ['blosc']:
+            options.update(hdf5plugin.Blosc(cname='lz4',
+                                            clevel=compression_opts))
+        else:
+            options.update(hdf5plugin.Bitshuffle())
+    elif compression is not None:
+        options['compression'] = compression
+        if compression_opts is not None:
+            options['compression_opts'] = compression_opts
+
+    if shuffle:
+        options['shuffle'] = True
+    if fletcher32:
+        options['fletcher32'] = True
+    if scaleoffset is not None:
+        options['scaleoffset'] = int(scaleoffset)
+
+    return options
+
+def dataset_options_to_attrs(compression=None, compression_opts=None,
+                             shuffle=False, fletcher32=False,
+                             scaleoffset=None):
+    """
+    Make a dictionary of the dataset options as strings so they can be
+    stored in HDF5 attributes and read back with
+    :func:`dataset_options_from_attrs`.
+
+    :return: dataset options as strings
+    :rtype: dictionary
+
+    """
+    compression, compression_opts = validate_compression(compression,
+                                                         compression_opts)
+    return {'compression': str(compression),
+            'compression_opts': str(compression_opts),
+            'shuffle': str(bool(shuffle)),
+            'fletcher32': str(bool(fletcher32)),
+            'scaleoffset': str(scaleoffset)}
+
+def dataset_options_from_attrs(attrs, prefix=''):
+    """
+    Read dataset options from HDF5 attributes written with
+    :func:`dataset_options_to_attrs`.
+
+    :param attrs: HDF5 attributes
+    :type attrs: :class:`h5py.AttributeManager` or dictionary
+    :param prefix: prefix of the attribute keys, defaults to ''
+    :type prefix: string, optional
+    :return: dataset options that can be input into
+             :func:`get_dataset_options`
+    :rtype: dictionary
+
+    """
+    options = {}
+    for key in DATASET_OPTIONS:
+        value = attrs.get('{0}{1}'.format(prefix, key), None)
+        if isinstance(value, bytes):
+            value = value.decode()
+        if value in [None, 'None', 'none', '']:
+            value = None
+        elif key in ['shuffle', 'fletcher32']:
+            value = value in [True, 'True', 'true']
+        elif key in ['compression_opts']:
+            if value.startswith('('):
+                value = tuple([v.strip(" '") for v in
+                               value.strip('()').split(',')])
+                value = (value[0], int(value[1]))
+            else:
+                value = int(value)
+        elif key in ['scaleoffset']:
+            value = int(value)
+        options[key] = value
+
+    return options
@@ -46,20 +46,65 @@ Created on Sun Apr 24 20:50:41 2020
 # Imports
 # =============================================================================
 import json
-import pandas as pd
+import sys
 import numpy as np
-import logging
 
 from collections import OrderedDict
-from operator import itemgetter
+from collections.abc import Mapping
+from operator import itemgetter, attrgetter
 
 from mth5.standards.schema import (Standards, validate_attribute,
                                    validate_type)
 from mth5.utils.mttime import MTime
 from mth5.utils.exceptions import MTSchemaError
+from mth5.utils.mth5logger import ClassLogger
 from mth5.utils import helpers
 
-ATTR_DICT = Standards().ATTR_DICT
+class _StandardsAttrDict(Mapping):
+    """
+    Standards attribute dictionaries by level.  They are built, or read from
+    the standards cache, when first used so importing mth5 does not read or
+    write any files.
+    """
+    def __init__(self):
+        self._attr_dict = None
+
+    def _get_attr_dict(self):
+        if self._attr_dict is None:
+            self._attr_dict = Standards().ATTR_DICT
+        return self._attr_dict
+
+    def __getitem__(self, key):
+        return self._get_attr_dict()[key]
+
+    def __iter__(self):
+        return iter(self._get_attr_dict())
+
+    def __len__(self):
+        return len(self._get_attr_dict())
+
+ATTR_DICT = _StandardsAttrDict()
+
+# incremented when add_base_attribute changes the standards of an attribute,
+# the cached attribute accessors are rebuilt when it changes
+_STANDARDS_GENERATION = 0
+
+# attributes validated in the property setter
+_SKIP_VALIDATION = frozenset(['latitude', 'longitude',  'elevation',
+                              'start_date', 'end_date', 'start', 'end',
+                              'name', 'applied', 'logger'])
+_STANDARD_TYPES = {'string': str,
+                   'integer': int,
+                   'float': float,
+                   'boolean': bool}
+def _is_series(value):
+    """
+    Test if value is a pandas.Series without importing pandas, if pandas 
+    has not been imported value cannot be a Series.
+    """
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(value, pd.Series)
+
 # =============================================================================
 #  Base class that everything else will inherit
 # =============================================================================
@@ -76,15 +121,17 @@ class Base():
         * from_series
     """
 
+    logger = ClassLogger()
+
+    _validators = {}
+    _accessors = None
+
     def __init__(self, **kwargs):
 
         self.comments = None
         self._attr_dict = {}
         
         self._class_name = validate_attribute(self.__class__.__name__)
-        
-        self.logger = logging.getLogger('{0}.{1}'.format(__name__, 
-                                                         self._class_name))
 
         for name, value in kwargs.items():
             self.set_attr_from_name(name, value)
@@ -100,7 +147,7 @@ class Base():
         return self.to_json()
     
     def __eq__(self, other):
-        if isinstance(other, (Base, dict, str, pd.Series)):
+        if isinstance(other, (Base, dict, str)) or _is_series(other):
             home_dict = self.to_dict()
             if isinstance(other, Base):
                 other_dict = other.to_dict()
@@ -109,7 +156,7 @@ class Base():
             elif isinstance(other, str):
                 other_dict = OrderedDict(sorted(json.loads(other).items(), 
                                                 key=itemgetter(0)))
-            elif isinstance(other, pd.Series):
+            elif _is_series(other):
                 other_dict = OrderedDict(sorted(other.to_dict().items(), 
                                                 key=itemgetter(0)))
             if other_dict == self.to_dict():
@@ -238,11 +285,11 @@ class Base():
 
         else:
             msg = 'value={0} must be {1} not {2}'
-            info = 'converting {0} to {1}'
+            info = 'converting %s to %s'
             if isinstance(value, str):
                 if v_type is int:
                     try:
-                        self.logger.debug(info.format(type(value), v_type))
+                        self.logger.debug(info, type(value), v_type)
                         return int(value)
                     except ValueError as error:
                         self.logger.exception(error)
@@ -250,7 +297,7 @@ class Base():
                                                        type(value)))
                 elif v_type is float:
                     try:
-                        self.logger.debug(info.format(type(value), v_type))
+                        self.logger.debug(info, type(value), v_type)
                         return float(value)
                     except ValueError as error:
                         self.logger.exception(error)
@@ -258,10 +305,10 @@ class Base():
                                                        v_type, type(value)))
                 elif v_type is bool:
                     if value.lower() in ['false']:
-                        self.logger.debug(info.format(value, False))
+                        self.logger.debug(info, value, False)
                         return False
                     elif value.lower() in ['true']:
-                        self.logger.debug(info.format(value, True))
+                        self.logger.debug(info, value, True)
                         return True
                     else:
                         self.logger.exception(msg.format(value, 
@@ -275,18 +322,18 @@ class Base():
             
             elif isinstance(value, int):
                 if v_type is float:
-                    self.logger.debug(info.format(type(value), v_type))
+                    self.logger.debug(info, type(value), v_type)
                     return float(value)
                 elif v_type is str:
-                    self.logger.debug(info.format(type(value), v_type))
+                    self.logger.debug(info, type(value), v_type)
                     return '{0:.0f}'.format(value)
             
             elif isinstance(value, float):
                 if v_type is int:
-                    self.logger.debug(info.format(type(value), v_type))
+                    self.logger.debug(info, type(value), v_type)
                     return int(value)
                 elif v_type is str:
-                    self.logger.debug(info.format(type(value), v_type))
+                    self.logger.debug(info, type(value), v_type)
                     return '{0}'.format(value)
             elif isinstance(value, list):
                 if v_type is str:
@@ -350,36 +397,110 @@ class Base():
         set attribute based on metadata standards
 
         """
-        # skip these attribute because they are validated in the property 
-        # setter.
-        skip_list = ['latitude', 'longitude',  'elevation',
-                     'start_date', 'end_date', 'start', 'end',
-                     'name', 'applied', 'logger']
-         
-        if hasattr(self, '_attr_dict'):
-            if name[0] != '_':
-                if not name in skip_list: 
-                    self.logger.debug('Setting {0} to {1}'.format(name, 
-                                                                  value))
-                    v_dict = self._attr_dict[name]
-                    v_type = self._get_standard_type(name)
-                    value = self._validate_type(value, v_type,
-                                                v_dict['style'])
-                    # check options
-                    if v_dict['style'] == 'controlled vocabulary':
-                        options = v_dict['options']
-                        accept, other, msg = self._validate_option(value,
-                                                                   options)
-                        if not accept:
-                            self.logger.error(msg.format(value, options))
-                            raise MTSchemaError(msg.format(value, options))
-                        if other and not accept:
-                            self.logger.warning(msg.format(value, 
-                                                           options,
-                                                           name))
+        if (name[0] != '_' and name not in _SKIP_VALIDATION and
+                '_attr_dict' in self.__dict__):
+            v_dict = self._attr_dict[name]
+            entry = self._validators.get(name)
+            if entry is None or entry[0] is not v_dict:
+                entry = (v_dict, self._compile_validator(name, v_dict))
+                self._validators[name] = entry
+            value = entry[1](self, value)
                         
         super().__setattr__(name, value)
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # each class keeps its own compiled validators and accessors
+        cls._validators = {}
+        cls._accessors = None
+
+    def _validate_attribute(self, name, value):
+        """
+        Validate a value against the standards for the attribute name,
+        including controlled vocabulary options.
+        
+        This is the full validation, used by the compiled validators if the
+        value is not a simple match to the standards type.
+
+        """
+        v_dict = self._attr_dict[name]
+        v_type = self._get_standard_type(name)
+        value = self._validate_type(value, v_type, v_dict['style'])
+        # check options
+        if v_dict['style'] == 'controlled vocabulary':
+            options = v_dict['options']
+            accept, other, msg = self._validate_option(value, options)
+            if not accept:
+                self.logger.error(msg.format(value, options))
+                raise MTSchemaError(msg.format(value, options))
+            if other and not accept:
+                self.logger.warning(msg.format(value, options, name))
+                
+        return value
+
+    def _compile_validator(self, name, v_dict):
+        """
+        Compile the standards of an attribute into a function
+        validator(obj, value) that returns the validated value.  The type
+        and the lower case options are worked out once, values that are
+        already the correct type are returned directly, anything else goes
+        through `_validate_attribute`.
+
+        :param name: attribute name
+        :type name: string
+        :param v_dict: standards dictionary of the attribute
+        :type v_dict: dictionary
+        :return: validator function
+        :rtype: function
+
+        """
+        def full_validator(obj, value):
+            return obj._validate_attribute(name, value)
+
+        try:
+            if validate_attribute(name) != name:
+                return full_validator
+        except MTSchemaError:
+            return full_validator
+
+        v_type = v_dict['type']
+        if v_type is None or v_type == 'h5py_reference':
+            return full_validator
+        if not isinstance(v_type, type) and isinstance(v_type, str):
+            v_type = _STANDARD_TYPES.get(validate_type(v_type))
+        if not isinstance(v_type, type):
+            return full_validator
+
+        style = v_dict['style']
+        if v_type is str and style and 'list' in style:
+            return full_validator
+
+        check_options = style == 'controlled vocabulary'
+        if check_options:
+            if not v_dict['options']:
+                return full_validator
+            options = frozenset([ss.lower() for ss in v_dict['options']])
+            other_possible = 'other' in options
+        is_str = v_type is str
+
+        def validator(obj, value):
+            if isinstance(value, v_type):
+                if is_str and value in ('None', 'none'):
+                    return None
+            elif value is None:
+                return None
+            else:
+                return full_validator(obj, value)
+
+            if check_options:
+                if not isinstance(value, str):
+                    return full_validator(obj, value)
+                if not other_possible and value.lower() not in options:
+                    return full_validator(obj, value)
+            return value
+
+        return validator
+
     def _get_standard_type(self, name):
         """
         helper function to get the standard type for the given name
@@ -508,42 +629,101 @@ class Base():
             >>> r.add_base_attribute('temperature', 'ambient', extra)
 
         """
+        global _STANDARDS_GENERATION
         name = self._validate_name(name)
+        try:
+            old_value_dict = dict(self._attr_dict[name])
+        except KeyError:
+            old_value_dict = None
         self._attr_dict.update({name: value_dict})
+        if self._attr_dict[name] != old_value_dict:
+            _STANDARDS_GENERATION += 1
         self.set_attr_from_name(name, value)
-        self.logger.debug('Added {0} to _attr_dict with {1}'.format(name,
-                                                                    value_dict))
-        self.logger.debug('set {0} to {1} as type {2}'.format(name, value,
-                                                              value_dict['type']))
+        self.logger.debug('Added %s to _attr_dict with %s', name, value_dict)
+        self.logger.debug('set %s to %s as type %s', name, value,
+                          value_dict['type'])
 
 
                 
+    def _get_accessors(self):
+        """
+        Get the sorted attribute names of `_attr_dict` with a getter and a
+        setter for each.  These are made once per class and remade if the
+        attribute dictionary changes.
+        
+        :return: (getters, setters) where getters is a list of
+                 (name, getter, type, standards type) sorted by name and
+                 setters is a dictionary of name: (parent getter, name)
+        :rtype: tuple
+
+        """
+        attr_dict = self._attr_dict
+        accessors = self._accessors
+        if (accessors is not None and accessors[0] is attr_dict and 
+                accessors[1] == len(attr_dict) and
+                accessors[2] == _STANDARDS_GENERATION):
+            return accessors[3], accessors[4]
+        
+        getters = []
+        setters = {}
+        for name in sorted(attr_dict.keys()):
+            attr_name = self._validate_name(name)
+            v_type = self._get_standard_type(attr_name)
+            if isinstance(v_type, str) and v_type != 'h5py_reference':
+                py_type = _STANDARD_TYPES.get(validate_type(v_type))
+            elif isinstance(v_type, type):
+                py_type = v_type
+            else:
+                py_type = None
+            getters.append((name, attrgetter(attr_name), py_type, v_type))
+            
+            if '.' in name:
+                parent, key = name.rsplit('.', 1)
+                setters[name] = (attrgetter(parent), key)
+            else:
+                setters[name] = (None, name)
+        
+        type(self)._accessors = (attr_dict, len(attr_dict), 
+                                 _STANDARDS_GENERATION, getters, setters)
+        return getters, setters
+                
     def to_dict(self, nested=False):
         """
         make a dictionary from attributes, makes dictionary from _attr_list.
         
+        Values that are already the standards type are used directly,
+        other values are validated with the standards type.
+        
         :param nested: make the returned dictionary nested
         :type nested: [ True | False ] , default is False
         
         """
-        meta_dict = {}
-        for name in list(self._attr_dict.keys()):
+        getters, setters = self._get_accessors()
+        meta_dict = OrderedDict()
+        for name, getter, py_type, v_type in getters:
             try:
-                meta_dict[name] = self.get_attr_from_name(name)
+                value = getter(self)
             except AttributeError as error:
                 msg = ('{0}: setting {1} to None.  '.format(error, name) + 
                        'Try setting {0} to the desired value'.format(name))
                 self.logger.info(msg)
                 meta_dict[name] = None
+                continue
+            
+            if value is None:
+                meta_dict[name] = None
+            elif (py_type is not None and isinstance(value, py_type) and 
+                  not (py_type is str and value in ('None', 'none'))):
+                meta_dict[name] = value
+            else:
+                meta_dict[name] = self._validate_type(value, v_type)
 
         if nested:
            meta_dict = helpers.structure_dict(meta_dict)
+           meta_dict = OrderedDict(sorted(meta_dict.items(),
+                                          key=itemgetter(0)))
 
-        meta_dict = {self._class_name.lower(): 
-                     OrderedDict(sorted(meta_dict.items(),
-                                        key=itemgetter(0)))}
-        
-        return meta_dict
+        return {self._class_name.lower(): meta_dict}
 
     def from_dict(self, meta_dict):
         """
@@ -567,8 +747,18 @@ class Base():
         
         # be sure to flatten the dictionary first for easier transform
         meta_dict = helpers.flatten_dict(meta_dict[class_name])
+        getters, setters = self._get_accessors()
         for name, value in meta_dict.items():
-            self.set_attr_from_name(name, value)
+            try:
+                parent_getter, key = setters[name]
+                if parent_getter is None:
+                    setattr(self, key, value)
+                else:
+                    setattr(parent_getter(self), key, value)
+            except (KeyError, AttributeError):
+                # not in the standards or the path does not exist, the
+                # slower path gives the proper error messages
+                self.set_attr_from_name(name, value)
                 
     def to_json(self, nested=False, indent=' '*4):
         """
@@ -613,7 +803,7 @@ class Base():
         ..todo:: Force types in series
         
         """
-        if not isinstance(pd_series, pd.Series):
+        if not _is_series(pd_series):
             msg = ("Input must be a Pandas.Series not type {0}".format(
                     type(pd_series)))
             self.logger.error(msg)
@@ -631,6 +821,7 @@ class Base():
         :rtype: pandas.Series
 
         """
+        import pandas as pd
         
         return pd.Series(self.to_dict()[self._class_name.lower()])
     
@@ -755,7 +946,7 @@ class Location(Base):
             return 0.0
 
         except ValueError:
-            self.logger.debug('Latitude is a string {0}'.format(latitude))
+            self.logger.debug('Latitude is a string %s', latitude)
             lat_value = self._convert_position_str2float(latitude)
 
         if abs(lat_value) >= 90:
@@ -786,7 +977,7 @@ class Location(Base):
             return 0.0
 
         except ValueError:
-            self.logger.debug('Longitude is a string {0}'.format(longitude))
+            self.logger.debug('Longitude is a string %s', longitude)
             lon_value = self._convert_position_str2float(longitude)
 
         if abs(lon_value) >= 180:
@@ -848,8 +1039,7 @@ class Location(Base):
         position_str = '{0}:{1:02.0f}:{2:05.2f}'.format(sign * int(deg),
                                                         int(minutes),
                                                         sec)
-        self.logger.debug('Converted {0} to {1}'.format(position,
-                                                        position_str))
+        self.logger.debug('Converted %s to %s', position, position_str)
 
         return position_str
 
@@ -885,8 +1075,7 @@ class Location(Base):
 
         position_value = sign * (abs(deg) + minutes / 60. + sec / 3600.)
         
-        self.logger.debug('Converted {0} to {1}'.format(position_str, 
-                                                        position_value))
+        self.logger.debug('Converted %s to %s', position_str, position_value)
 
         return position_value
 
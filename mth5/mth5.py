@@ -19,7 +19,6 @@ Created on Sun Dec  9 20:50:41 2018
 # =============================================================================
 # Imports
 # =============================================================================
-import logging
 
 from pathlib import Path
 from platform import platform
@@ -27,10 +26,13 @@ from platform import platform
 import h5py
 
 from mth5.utils.exceptions import MTH5Error
+from mth5.utils.mth5logger import ClassLogger
 from mth5 import __version__
 from mth5.utils.mttime import get_now_utc
 from mth5 import mth5_groups as m5groups
-from mth5.helpers import get_tree, close_open_files
+from mth5.helpers import (get_tree, close_open_files, validate_compression,
+                          dataset_options_to_attrs,
+                          dataset_options_from_attrs)
 
 # =============================================================================
 # MT HDF5 file
@@ -76,6 +78,11 @@ class MTH5:
     update_metadata_from_cfg     update metadata attributes from a cfg file
     update_metadata_from_series  update metadata attributes from pandas series
     h5_is_write                  check if MTH5 file is open and writeable
+    h5_is_read                   check if MTH5 file is open
+    start_swmr_write             start single writer multiple reader mode
+    refresh                      see data written by a SWMR writer
+    write_swmr_metadata          write metadata of channels written in SWMR
+                                 mode once the readers are closed
     ============================ ==============================================
 
     * Example: Load MTH5 File
@@ -83,6 +90,30 @@ class MTH5:
     >>> import mth5.mth5 as mth5
     >>> data = mth5.MTH5.open_mth5(r"/home/mtdata/mt01.mth5")
 
+    * Example: Make a new file with compressed channels
+
+    >>> data = mth5.MTH5(compression="gzip", compression_opts=4, shuffle=True)
+    >>> data.open_mth5(r"/home/mtdata/mt01.mth5", "w")
+    >>> # override the file default for a single channel
+    >>> ex = data.add_channel("MT01", "MT01a", "Ex", "electric", ex_data,
+    ...                       compression="lzf")
+
+    * Example: Read a file while another process appends to it
+
+    >>> # writer, channels are made before starting SWMR mode
+    >>> writer_mth5 = mth5.MTH5()
+    >>> writer_mth5.open_mth5(r"/home/mtdata/mt01.mth5", "w", swmr=True)
+    >>> run = writer_mth5.add_run("MT01", "MT01a")
+    >>> hx_writer = run.open_channel_writer("Hx", "magnetic", hx_metadata)
+    >>> writer_mth5.start_swmr_write()
+    >>> hx_writer.append(block)
+    >>> # reader, in another process
+    >>> reader_mth5 = mth5.MTH5()
+    >>> reader_mth5.open_mth5(r"/home/mtdata/mt01.mth5", "r", swmr=True)
+    >>> hx = reader_mth5.get_channel("MT01", "MT01a", "Hx")
+    >>> reader_mth5.refresh()
+    >>> hx.n_samples
+
     * Example: Update metadata from cfg file
 
     >>> data = mth5.MTH5()
@@ -133,8 +164,16 @@ class MTH5:
     .. seealso:: https://www.hdfgroup.org/ and h5py()
     """
 
-    def __init__(self, filename=None):
+    logger = ClassLogger()
+
+    def __init__(self, filename=None, compression=None, compression_opts=None,
+                 shuffle=False, fletcher32=False, scaleoffset=None):
         self.__hdf5_obj = None
+        self.__swmr = False
+        self.__wrapper_cache = m5groups.WrapperCache()
+        # metadata of channels written in SWMR mode still to be written, by
+        # file name, see write_swmr_metadata
+        self.__swmr_metadata = {}
 
         self.__filename = filename
         if self.__filename:
@@ -142,7 +181,6 @@ class MTH5:
                 self.__filename = Path(self.__filename)
 
         self._class_name = self.__class__.__name__
-        self.logger = logging.getLogger("{0}.{1}".format(__name__, self._class_name))
 
         self._default_root_name = "Survey"
         self._default_subgroup_names = ["Stations", "Reports", "Filters",
@@ -156,8 +194,18 @@ class MTH5:
             "MTH5.software": "mth5",
         }
 
+        # default compression and filters for channel datasets, these are
+        # stored in the root attributes when a new file is made.
+        compression, compression_opts = validate_compression(
+            compression, compression_opts)
+        self.dataset_options = {"compression": compression,
+                                "compression_opts": compression_opts,
+                                "shuffle": shuffle,
+                                "fletcher32": fletcher32,
+                                "scaleoffset": scaleoffset}
+
     def __str__(self):
-        if self.h5_is_write():
+        if self.h5_is_read():
             return get_tree(self.__hdf5_obj)
 
         return "HDF5 file is closed and cannot be accessed."
@@ -168,7 +216,7 @@ class MTH5:
     @property
     def filename(self):
         """ file name of the hdf5 file"""
-        if self.h5_is_write():
+        if self.h5_is_read():
             return Path(self.__hdf5_obj.filename)
         msg = (
             "MTH5 file is not open or has not been created yet. "
@@ -177,50 +225,152 @@ class MTH5:
         self.logger.warning(msg)
         return self.__filename
 
+    @property
+    def wrapper_cache(self):
+        """
+        Cache of the containers of the open file, see 
+        :class:`mth5.mth5_groups.WrapperCache`
+        """
+        return self.__wrapper_cache
+
     @property
     def survey_group(self):
         """ Convenience property for /Survey group"""
-        if self.h5_is_write():
-            return m5groups.SurveyGroup(self.__hdf5_obj["/Survey"])
+        if self.h5_is_read():
+            return self.__wrapper_cache.get(
+                self.__hdf5_obj["/Survey"], m5groups.SurveyGroup)
         self.logger.info("File is closed cannot access /Survey")
         return None
 
     @property
     def reports_group(self):
         """ Convenience property for /Survey/Reports group"""
-        if self.h5_is_write():
-            return m5groups.ReportsGroup(self.__hdf5_obj["/Survey/Reports"])
+        if self.h5_is_read():
+            return self.__wrapper_cache.get(
+                self.__hdf5_obj["/Survey/Reports"], m5groups.ReportsGroup)
         self.logger.info("File is closed cannot access /Reports")
         return None
 
     @property
     def filters_group(self):
         """ Convenience property for /Survey/Filters group"""
-        if self.h5_is_write():
-            return m5groups.FiltersGroup(self.__hdf5_obj["/Survey/Filters"])
+        if self.h5_is_read():
+            return self.__wrapper_cache.get(
+                self.__hdf5_obj["/Survey/Filters"], m5groups.FiltersGroup)
         self.logger.info("File is closed cannot access /Filters")
         return None
 
     @property
     def standards_group(self):
         """ Convenience property for /Survey/Standards group"""
-        if self.h5_is_write():
-            return m5groups.StandardsGroup(self.__hdf5_obj["/Survey/Standards"])
+        if self.h5_is_read():
+            return self.__wrapper_cache.get(
+                self.__hdf5_obj["/Survey/Standards"], m5groups.StandardsGroup)
         self.logger.info("File is closed cannot access /Standards")
         return None
 
     @property
     def stations_group(self):
         """ Convenience property for /Survey/Stations group"""
-        if self.h5_is_write():
-            return m5groups.MasterStationGroup(self.__hdf5_obj["/Survey/Stations"])
+        if self.h5_is_read():
+            return self.__wrapper_cache.get(
+                self.__hdf5_obj["/Survey/Stations"], m5groups.MasterStationGroup)
         self.logger.info("File is closed cannot access /Stations")
         return None
 
-    def open_mth5(self, filename, mode="a"):
+    @property
+    def channel_catalog(self):
+        """
+        Catalog of every channel in the file, see
+        :class:`mth5.mth5_groups.ChannelCatalog`
+        """
+        if self.h5_is_write():
+            return self.stations_group.channel_catalog
+        if isinstance(self.__hdf5_obj, h5py.File) and self.__hdf5_obj:
+            catalog = m5groups.ChannelCatalog.from_file(
+                self.__hdf5_obj, self.__wrapper_cache)
+            if catalog is not None:
+                return catalog
+            msg = ("File has no channel catalog, open the file in append "
+                   "mode to make one")
+        else:
+            msg = "File is closed cannot access the channel catalog"
+        self.logger.error(msg)
+        raise MTH5Error(msg)
+
+    def query_channels(self, station=None, run=None, channel=None,
+                       component=None, measurement_type=None,
+                       sample_rate=None, start=None, end=None):
+        """
+        Find channels in the file with one read of the channel catalog.
+        Each keyword can be a single value or a list of values, channels
+        that match all the keywords are returned.  See
+        :func:`mth5.mth5_groups.ChannelCatalog.query`.
+
+        :return: matching channels
+        :rtype: :class:`pandas.DataFrame`
+
+        :Example: ::
+
+            >>> mth5_obj.query_channels(component='Hx', sample_rate=4096,
+            ...                         start='2020-07-01',
+            ...                         end='2020-08-01')
+
+        """
+        return self.channel_catalog.query(
+            station=station, run=run, channel=channel, component=component,
+            measurement_type=measurement_type, sample_rate=sample_rate,
+            start=start, end=end)
+
+    def rebuild_summaries(self, verify=False):
+        """
+        Rebuild the summary tables of the stations, runs and channels and
+        the channel catalog by scanning the file once, see
+        :func:`mth5.mth5_groups.MasterStationGroup.rebuild_summaries`.
+
+        :param verify: only report differences between the tables and the
+                       file, nothing is written, defaults to False
+        :type verify: bool, optional
+        :return: differences found for each table that is not up to date,
+                 keyed by the path of the table
+        :rtype: dictionary
+        :raises MTH5Error: if the file is closed, or read only and verify
+                           is False
+
+        :Example: ::
+
+            >>> mth5_obj.rebuild_summaries(verify=True)
+            {'/Survey/Stations/MT001/Summary': ['missing entry MT001b']}
+            >>> mth5_obj.rebuild_summaries()
+
+        """
+        if not (isinstance(self.__hdf5_obj, h5py.File) and self.__hdf5_obj):
+            msg = "File is closed cannot rebuild summaries"
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+        if not verify and not self.h5_is_write():
+            msg = "File is read only, can only verify summaries"
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        return self.__wrapper_cache.get(
+            self.__hdf5_obj["/Survey/Stations"],
+            m5groups.MasterStationGroup).rebuild_summaries(verify=verify)
+
+    def open_mth5(self, filename, mode="a", swmr=False):
         """
         open an mth5 file
 
+        :param filename: file name
+        :type filename: string or :class:`pathlib.Path`
+        :param mode: [ a | w | r | r+ | w- | x ], defaults to "a"
+        :type mode: string, optional
+        :param swmr: single writer multiple reader, in mode "r" the file is
+                     read while another process writes to it.  In a write
+                     mode the file is opened with the latest HDF5 file
+                     format, call :func:`start_swmr_write` once the
+                     channels to write are made. Defaults to False
+        :type swmr: bool, optional
         :return: Survey Group
         :type: m5groups.SurveyGroup
 
@@ -232,6 +382,8 @@ class MTH5:
 
 
         """
+        self.__swmr = swmr
+        self.__wrapper_cache = m5groups.WrapperCache()
         self.__filename = filename
         if not isinstance(self.__filename, Path):
             self.__filename = Path(filename)
@@ -250,7 +402,11 @@ class MTH5:
                     )
                     self.logger.exception(msg.format(error, self.__filename))
             elif mode in ["a", "r", "r+", "w-", "x"]:
-                self.__hdf5_obj = h5py.File(self.__filename, mode=mode)
+                self.__hdf5_obj = h5py.File(self.__filename, mode=mode,
+                                            **self._file_options(mode))
+                if "dataset.compression" in self.__hdf5_obj.attrs:
+                    self.dataset_options = dataset_options_from_attrs(
+                        self.__hdf5_obj.attrs, prefix="dataset.")
 
             else:
                 msg = "mode {0} is not understood".format(mode)
@@ -264,6 +420,17 @@ class MTH5:
                 self.logger.error(msg)
                 raise MTH5Error(msg)
 
+    def _file_options(self, mode):
+        """
+        Keywords for h5py.File, SWMR needs the latest file format and a
+        reader opens the file with swmr=True.
+        """
+        if not self.__swmr:
+            return {}
+        if mode in ["r"]:
+            return {"libver": "latest", "swmr": True}
+        return {"libver": "latest"}
+
     def initialize_file(self):
         """
         Initialize the default groups for the file
@@ -273,10 +440,14 @@ class MTH5:
 
         """
 
-        self.__hdf5_obj = h5py.File(self.__filename, "w")
+        self.__hdf5_obj = h5py.File(self.__filename, "w",
+                                    **self._file_options("w"))
 
         # write general metadata
         self.__hdf5_obj.attrs.update(self._file_attrs)
+        self.__hdf5_obj.attrs.update(
+            dict([("dataset.{0}".format(key), value) for key, value in
+                  dataset_options_to_attrs(**self.dataset_options).items()]))
 
         survey_group = self.__hdf5_obj.create_group(self._default_root_name)
         survey_obj = m5groups.SurveyGroup(survey_group)
@@ -297,15 +468,71 @@ class MTH5:
 
     def close_mth5(self):
         """
-        close mth5 file to make sure everything is flushed to the file
+        close mth5 file to make sure everything is flushed to the file.
+        
+        Metadata of channels written in SWMR mode cannot be written in SWMR
+        mode, so the file is opened again after closing to write it, see 
+        :func:`write_swmr_metadata`.  Readers need to close the file first.
+        
+        :raises MTH5Error: if the metadata of channels written in SWMR mode
+                           cannot be written, the file is closed and the 
+                           metadata is kept, close the readers and call 
+                           close_mth5 again
+        """
+        if self.h5_is_read():
+            if self.swmr_mode and self.h5_is_write():
+                deferred = self.__wrapper_cache.pop_deferred_metadata()
+                if deferred:
+                    self.__swmr_metadata.setdefault(
+                        self.__hdf5_obj.filename, {}).update(deferred)
+            
+            self.__hdf5_obj.flush()
+            try:
+                self.__hdf5_obj.close()
+                self.logger.info("Flushed and closed {0}".format(
+                    str(self.__filename)))
+            except:
+                close_open_files()
+        self.__wrapper_cache.clear()
+            
+        if self.__swmr_metadata:
+            self.write_swmr_metadata()
+            
+    def write_swmr_metadata(self):
         """
+        Write the metadata of channels written in SWMR mode to files that 
+        are closed, :func:`close_mth5` calls this.  Each file is opened in
+        append mode, which fails while a reader has the file open.  The 
+        metadata of a file is kept until it is written, so call again once
+        the readers are closed.
         
-        self.__hdf5_obj.flush()
-        try:
-            self.__hdf5_obj.close()
-            self.logger.info("Flushed and closed {0}".format(str(self.filename)))
-        except:
-            close_open_files()
+        :raises MTH5Error: if a file cannot be opened, the metadata is kept
+        
+        :Example: ::
+            
+            >>> writer_mth5.close_mth5()
+            MTH5Error: Cannot write metadata of 4 channels written in SWMR
+            mode ...
+            >>> # close the readers
+            >>> writer_mth5.write_swmr_metadata()
+
+        """
+        for filename, deferred in list(self.__swmr_metadata.items()):
+            try:
+                with h5py.File(filename, mode="a") as hdf5_obj:
+                    m5groups.ChannelWriter.write_deferred_metadata(hdf5_obj,
+                                                                   deferred)
+            except OSError as error:
+                msg = ("Cannot write metadata of {0} channels written in "
+                       "SWMR mode to {1}: {2}.  Close the readers of the "
+                       "file and call close_mth5 or write_swmr_metadata "
+                       "again").format(len(deferred), filename, error)
+                self.logger.error(msg)
+                raise MTH5Error(msg)
+            del self.__swmr_metadata[filename]
+            self.logger.info("Wrote metadata of {0} channels written in "
+                             "SWMR mode to {1}".format(len(deferred), 
+                                                       filename))
 
     def h5_is_write(self):
         """
@@ -320,18 +547,111 @@ class MTH5:
                 return False
         return False
 
+    def h5_is_read(self):
+        """
+        check to see if the hdf5 file is open
+        """
+        if isinstance(self.__hdf5_obj, h5py.File):
+            return bool(self.__hdf5_obj)
+        return False
+
+    @property
+    def swmr_mode(self):
+        """ True if the file is in single writer multiple reader mode """
+        if self.h5_is_read():
+            return self.__hdf5_obj.swmr_mode
+        return False
+
+    def start_swmr_write(self):
+        """
+        Start single writer multiple reader mode, after this readers that
+        open the file with swmr=True see data appended to channels.
+
+        Groups, channels and attributes cannot be added in SWMR mode, so 
+        make every channel to be written first, for instance with 
+        :func:`mth5.mth5_groups.RunGroup.open_channel_writer`.  Appending 
+        with a :class:`mth5.mth5_groups.ChannelWriter` flushes the file 
+        after each block.  Attributes are not written in SWMR mode, so rows
+        cannot be added to or removed from the summary tables and the 
+        metadata of the written channels is written by :func:`close_mth5`,
+        once the readers have closed the file.
+
+        :raises MTH5Error: if the file is not writable or was not opened 
+                           with swmr=True
+
+        :Example: ::
+
+            >>> mth5_obj.open_mth5('live.mth5', 'w', swmr=True)
+            >>> run = mth5_obj.add_run('MT001', 'MT001a')
+            >>> writer = run.open_channel_writer('Hx', 'magnetic',
+            ...                                  channel_metadata=hx_meta)
+            >>> mth5_obj.start_swmr_write()
+            >>> writer.append(block)
+
+        """
+        if not self.h5_is_write():
+            msg = "File is not open for writing cannot start SWMR mode"
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+        if self.__hdf5_obj.swmr_mode:
+            return
+
+        self.__hdf5_obj.flush()
+        try:
+            self.__hdf5_obj.swmr_mode = True
+        except (RuntimeError, ValueError) as error:
+            msg = ("{0}. Cannot start SWMR mode, open the file with "
+                   "swmr=True, files made without it need to be copied "
+                   "to a new file").format(error)
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+        self.logger.info("Started SWMR mode for %s", self.filename)
+
+    def refresh(self):
+        """
+        Refresh the cached groups, channels and tables of the file to see 
+        data and metadata written by a SWMR writer since they were read.
+        Metadata is read again on next access.
+
+        :Example: ::
+
+            >>> hx = mth5_obj.get_channel('MT001', 'MT001a', 'Hx')
+            >>> mth5_obj.refresh()
+            >>> hx.n_samples
+            8192
+
+        """
+        if not self.h5_is_read():
+            msg = "File is closed cannot refresh"
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+        self.__wrapper_cache.refresh()
+
     def from_reference(self, h5_reference):
         """
-        Get an HDF5 group, dataset, etc from a reference
+        Get the container of an HDF5 group or dataset from a reference.
+        Containers are cached, see :attr:`wrapper_cache`, so getting the 
+        same reference again returns the same container.
+
+        :param h5_reference: HDF5 reference, like metadata.hdf5_reference
+        :type h5_reference: :class:`h5py.Reference`
+        :return: container of the referenced object, the HDF5 object if it
+                 is not an MTH5 group, channel or table
+        :rtype: [ :class:`mth5.mth5_groups.StationGroup` |
+                  :class:`mth5.mth5_groups.RunGroup` |
+                  :class:`mth5.mth5_groups.ElectricDataset` | ... ]
+
+        :Example: ::
 
-        :param h5_reference: DESCRIPTION
-        :type h5_reference: TYPE
-        :return: DESCRIPTION
-        :rtype: TYPE
+            >>> ex = mth5_obj.get_channel('MT001', 'MT001a', 'Ex')
+            >>> mth5_obj.from_reference(ex.metadata.hdf5_reference)
+            Channel Electric:
+            -------------------
+                component:        Ex
+                ...
 
         """
-        # in the future should allow this to return the proper container.
-        return self.__hdf5_obj[h5_reference]
+        return self.__wrapper_cache.get(self.__hdf5_obj[h5_reference])
 
     def add_station(self, name, station_metadata=None):
         """
@@ -483,7 +803,7 @@ class MTH5:
         return self.stations_group.get_station(station_name).remove_run(run_name)
 
     def add_channel(self, station_name, run_name, channel_name, channel_type,
-                    data, channel_metadata=None):
+                    data, channel_metadata=None, **kwargs):
         """
         Convenience function to add a channel using
         ``mth5.stations_group.get_station().get_run().add_channel()``
@@ -504,6 +824,8 @@ class MTH5:
         :type channel_metadata: [ :class:`mth5.metadata.Electric` |
                                  :class:`mth5.metadata.Magnetic` |
                                  :class:`mth5.metadata.Auxiliary` ], optional
+        :param kwargs: compression keywords that override the file defaults,
+                       see ``mth5.mth5_groups.RunGroup.add_channel``
         :return: Channel container
         :rtype: [ :class:`mth5.mth5_groups.ElectricDatset` |
                  :class:`mth5.mth5_groups.MagneticDatset` |
@@ -529,7 +851,8 @@ class MTH5:
             self.stations_group.get_station(station_name)
             .get_run(run_name)
             .add_channel(
-                channel_name, channel_type, data, channel_metadata=channel_metadata
+                channel_name, channel_type, data, channel_metadata=channel_metadata,
+                **kwargs
             )
         )
 
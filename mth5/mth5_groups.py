@@ -10,20 +10,158 @@ Created on Fri May 29 15:09:48 2020
 # =============================================================================
 # Imports
 # =============================================================================
+import datetime
 import inspect
+import math
+from collections import OrderedDict
 import numpy as np
 import weakref
-import logging
 import h5py
 
 from mth5 import metadata
 from mth5.standards import schema
-from mth5.utils.helpers import to_numpy_type, inherit_doc_string
-from mth5.helpers import get_tree
-from mth5.utils.exceptions import MTH5TableError, MTH5Error
+from mth5.utils.helpers import inherit_doc_string, from_numpy_type
+from mth5.utils.mttime import MTime, MTimeArray, NS_PER_SECOND
+from mth5.helpers import (get_tree, write_attributes, get_dataset_options,
+                          dataset_options_to_attrs,
+                          dataset_options_from_attrs)
+from mth5.utils.exceptions import MTH5TableError, MTH5Error, MTTimeError
+from mth5.utils.mth5logger import ClassLogger
+
+# columns of summary tables that hold time stamps
+TIME_COLUMNS = ('start', 'end', 'start_date', 'end_date')
+
+def get_attribute(attrs, key, default=None):
+    """
+    Get an attribute of an HDF5 object, metadata that is not set is written 
+    as 'none' and returned as the default.
+    
+    :param attrs: attributes of an HDF5 object
+    :type attrs: :class:`h5py.AttributeManager`
+    :param key: attribute name
+    :type key: string
+    :param default: value if the attribute is not set, defaults to None
+    :return: attribute value
+    
+    """
+    value = attrs.get(key, default)
+    if isinstance(value, str) and value in ['none', 'None']:
+        return default
+    return value
+
+class _TableGeneration():
+    """
+    write generation of a table dataset, shared by its MTH5Table objects
+    """
+    __slots__ = ('value', '__weakref__')
+    
+    def __init__(self):
+        self.value = 0
+
+# write generation of each table dataset by dataset id, kept while an 
+# MTH5Table of the dataset exists.  Every write made through an MTH5Table 
+# bumps the generation so that columns cached by other MTH5Table objects of
+# the same dataset are read again.
+_TABLE_GENERATIONS = weakref.WeakValueDictionary()
 
 # make a dictionary of available metadata classes
 meta_classes = dict(inspect.getmembers(metadata, inspect.isclass))
+
+# 2 attributes added to the metadata of groups and channels that help with
+# querying, 1) the metadata class name and 2) the HDF5 reference that can be
+# used instead of paths
+MTH5_ATTR_DICT = {'mth5_type': {'type':str, 
+                                'required':True,
+                                'style':'free form',
+                                'description': 'type of group', 
+                                'units':None,
+                                'options':[],
+                                'alias':[],
+                                'example':'group_name'},
+                  'hdf5_reference': {'type': 'h5py_reference', 
+                                     'required':True,
+                                     'style':'free form',
+                                     'description': 'hdf5 internal reference', 
+                                     'units':None,
+                                     'options':[],
+                                     'alias':[],
+                                     'example':'<HDF5 Group Reference>'}}
+
+# attribute dictionary of each metadata class with MTH5_ATTR_DICT added, a
+# copy so the standards shared by all metadata objects are not changed
+_MTH5_ATTR_DICTS = {}
+
+def add_mth5_attributes(metadata_obj, class_name, hdf5_obj):
+    """
+    Add the 'mth5_type' and 'hdf5_reference' attributes to a metadata 
+    object.  The attribute dictionary of the metadata object is replaced by
+    a copy with the attributes added, one copy is made for each metadata 
+    class.
+    
+    :param metadata_obj: metadata of a group or channel
+    :type metadata_obj: :class:`mth5.metadata.Base`
+    :param class_name: name of the container class, 'Group' is stripped 
+                       for the 'mth5_type'
+    :type class_name: string
+    :param hdf5_obj: HDF5 group or dataset of the container
+    :type hdf5_obj: [ :class:`h5py.Group` | :class:`h5py.Dataset` ]
+
+    """
+    attr_dict = metadata_obj._attr_dict
+    try:
+        standards, n_attrs, mth5_attr_dict = _MTH5_ATTR_DICTS[
+            type(metadata_obj)]
+    except KeyError:
+        standards = None
+    if standards is not attr_dict or n_attrs != len(attr_dict):
+        mth5_attr_dict = attr_dict.copy()
+        mth5_attr_dict.update(MTH5_ATTR_DICT)
+        _MTH5_ATTR_DICTS[type(metadata_obj)] = (attr_dict, len(attr_dict),
+                                                mth5_attr_dict)
+    
+    metadata_obj._attr_dict = mth5_attr_dict
+    metadata_obj.set_attr_from_name('mth5_type', class_name.split('Group')[0])
+    metadata_obj.set_attr_from_name('hdf5_reference', hdf5_obj.ref)
+
+def _sample_index(start_ns, time_ns, sample_rate, rounding='nearest'):
+    """
+    Sample index of a time in equally spaced samples
+
+    :param start_ns: time of the first sample in epoch nanoseconds
+    :type start_ns: integer
+    :param time_ns: time to get the index for in epoch nanoseconds
+    :type time_ns: integer
+    :param sample_rate: sample rate in samples per second
+    :type sample_rate: float
+    :param rounding: [ nearest | ceil | floor ], see
+                     :func:`ChannelDataset.get_index_from_time`
+    :type rounding: string, optional
+    :return: sample index, can be negative or past the last sample
+    :rtype: integer
+    :raises ValueError: if rounding is not understood
+
+    """
+    position = (time_ns - start_ns) * sample_rate / NS_PER_SECOND
+    # sample times are whole nanoseconds
+    tolerance = 0.5 * sample_rate / NS_PER_SECOND
+    if rounding == 'ceil':
+        return int(math.ceil(position - tolerance))
+    elif rounding == 'floor':
+        return int(math.floor(position + tolerance))
+    elif rounding == 'nearest':
+        return int(round(position))
+    raise ValueError(
+        "rounding must be [ nearest | ceil | floor ] not {0}".format(rounding))
+
+
+def _metadata_snapshot(meta_dict):
+    """
+    Copy of a metadata dictionary as read or written, to tell if the 
+    metadata was changed since.  Lists are copied as they can be changed in
+    place.
+    """
+    return dict([(key, list(value) if isinstance(value, list) else value)
+                 for key, value in meta_dict.items()])
 # =============================================================================
 # 
 # =============================================================================
@@ -64,63 +202,38 @@ class BaseGroup():
     metadata.
     
     """
+
+    logger = ClassLogger()
+    
+    # cache of the file the container is in, set by WrapperCache
+    _wrapper_cache = None
     
     def __init__(self, group, group_metadata=None, **kwargs):
         
         if group is not None and isinstance(group, (h5py.Group, h5py.Dataset)):
             self.hdf5_group = weakref.ref(group)()
         
-        self.logger = logging.getLogger('{0}.{1}'.format(__name__, 
-                                                         self._class_name))
-        
-        # set metadata to the appropriate class.  Standards is not a 
-        # metadata.Base object so should be skipped. If the class name is not
-        # defined yet set to Base class.
-        self.metadata = metadata.Base()
-        if self._class_name not in ['Standards']:
-            try:
-                self.metadata = meta_classes[self._class_name]()
-            except KeyError:
-                self.metadata = metadata.Base()
-            
-        # add 2 attributes that will help with querying 
-        # 1) the metadata class name
-        self.metadata.add_base_attribute('mth5_type', 
-                                         self._class_name.split('Group')[0],
-                                         {'type':str, 
-                                          'required':True,
-                                          'style':'free form',
-                                          'description': 'type of group', 
-                                          'units':None,
-                                          'options':[],
-                                          'alias':[],
-                                          'example':'group_name'})
-        
-        # 2) the HDF5 reference that can be used instead of paths
-        self.metadata.add_base_attribute('hdf5_reference', 
-                                         self.hdf5_group.ref,
-                                         {'type': 'h5py_reference', 
-                                          'required':True,
-                                          'style':'free form',
-                                          'description': 'hdf5 internal reference', 
-                                          'units':None,
-                                          'options':[],
-                                          'alias':[],
-                                          'example':'<HDF5 Group Reference>'})
-        # set summary attributes    
-        self.logger.debug("Metadata class for {0} is {1}".format(
-                self._class_name, type(self.metadata)))
+        # metadata is made on first access, see `BaseGroup.metadata`
+        self._metadata = None
+        self._written_metadata = None
+        # summary table is made on first access, see `BaseGroup.summary_table`
+        self._summary_table = None
         
         # if metadata, make sure that its the same class type
         if group_metadata is not None:
-            if not isinstance(group_metadata, (self.metadata, metadata.Base)):
+            if not isinstance(group_metadata, metadata.Base):
                 msg = "metadata must be type metadata.{0} not {1}".format(
                     self._class_name, type(group_metadata))
                 self.logger.error(msg)
                 raise MTH5Error(msg)
              
-            # load from dict because of the extra attributes for MTH5
-            self.metadata.from_dict(group_metadata.to_dict())
+            # load from dict because of the extra attributes for MTH5, keep
+            # the type and reference of this group
+            meta_dict = group_metadata.to_dict()
+            for value in meta_dict.values():
+                value.pop('mth5_type', None)
+                value.pop('hdf5_reference', None)
+            self.metadata.from_dict(meta_dict)
              
             # write out metadata to make sure that its in the file.
             self.write_metadata()
@@ -158,23 +271,82 @@ class BaseGroup():
     def _class_name(self):
         return self.__class__.__name__.split('Group')[0]
     
+    @property
+    def metadata(self):
+        """
+        Metadata container, made on first access.  If the HDF5 group already
+        has metadata in its attributes those are read in.
+        """
+        if self._metadata is None:
+            self._initialize_metadata()
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value):
+        self._metadata = value
+        
+    def _initialize_metadata(self):
+        """
+        Make the metadata container for the group and read in existing
+        attributes.  Only done when metadata is needed, so getting a group
+        is cheap if only the HDF5 object is used.
+        
+        """
+        # set metadata to the appropriate class.  Standards is not a 
+        # metadata.Base object so should be skipped. If the class name is not
+        # defined yet set to Base class.
+        self._metadata = metadata.Base()
+        if self._class_name not in ['Standards']:
+            try:
+                self._metadata = meta_classes[self._class_name]()
+            except KeyError:
+                self._metadata = metadata.Base()
+            
+        # add 2 attributes that will help with querying 
+        add_mth5_attributes(self._metadata, self._class_name, 
+                            self.hdf5_group)
+        self.logger.debug("Metadata class for %s is %s", self._class_name,
+                          type(self._metadata))
+        
+        # existing group, fill from the attributes
+        if 'mth5_type' in self.hdf5_group.attrs:
+            self.read_metadata()
+    
     @property
     def summary_table(self):
-        return MTH5Table(self.hdf5_group['Summary'])
+        """
+        Summary table of the group, made on first access and kept so cached
+        columns and indexes are reused between queries.
+        """
+        if self._summary_table is None:
+            self._summary_table = MTH5Table(self.hdf5_group['Summary'])
+        return self._summary_table
     
     @property
     def groups_list(self):
         return list(self.hdf5_group.keys())
     
+    def refresh(self):
+        """
+        Refresh the summary table and read metadata again on next access, 
+        to see changes made by a SWMR writer.
+        
+        """
+        if self._summary_table is not None:
+            self._summary_table.refresh()
+        self._metadata = None
+    
     def read_metadata(self):
         """
         read metadata from the HDF5 group into metadata object
 
         """
-        meta_dict = dict([(key, value) for key, value in 
+        meta_dict = dict([(key, from_numpy_type(value)) for key, value in 
                           self.hdf5_group.attrs.items()])
         
         self.metadata.from_dict({self._class_name: meta_dict})
+        self._written_metadata = _metadata_snapshot(
+            self.metadata.to_dict()[self.metadata._class_name.lower()])
                
     def write_metadata(self):
         """
@@ -182,10 +354,17 @@ class BaseGroup():
 
         """
         meta_dict = self.metadata.to_dict()[self.metadata._class_name.lower()]
-        for key, value in meta_dict.items():
-            value = to_numpy_type(value)
-            self.logger.debug('wrote metadata {0} = {1}'.format(key, value))
-            self.hdf5_group.attrs.create(key, value)
+        write_attributes(self.hdf5_group, meta_dict)
+        self._written_metadata = _metadata_snapshot(meta_dict)
+        
+    def _metadata_changed(self):
+        """
+        True if the metadata was changed since it was read or written
+        """
+        if self._metadata is None:
+            return False
+        return (self._metadata.to_dict()[self._metadata._class_name.lower()]
+                != self._written_metadata)
 
     def read_data(self):
         raise MTH5Error("read_data is not implemented yet")
@@ -209,16 +388,18 @@ class BaseGroup():
             (0, ),
             maxshape=self._defaults_summary_attrs['max_shape'],
             dtype=self._defaults_summary_attrs['dtype'])
+        self._summary_table = None
         
         summary_table.attrs.update({'type': 'summary table',
                                     'last_updated': 'date_time',
-                                    'reference': summary_table.ref})
+                                    'reference': summary_table.ref,
+                                    'n_rows': 0})
         
         self.logger.debug(
-            "Created {0} table with max_shape = {1}, dtype={2}".format(
-                self._defaults_summary_attrs['name'],
-                self._defaults_summary_attrs['max_shape'],
-                self._defaults_summary_attrs['dtype']))
+            "Created %s table with max_shape = %s, dtype=%s",
+            self._defaults_summary_attrs['name'],
+            self._defaults_summary_attrs['max_shape'],
+            self._defaults_summary_attrs['dtype'])
         
     def initialize_group(self):
         """
@@ -391,13 +572,15 @@ class StandardsGroup(BaseGroup):
         	example       : CC-0
             
         """
-        find = self.summary_table.locate('attribute', attribute_name)
+        table = self.summary_table
+        table.create_index('attribute')
+        find = table.locate('attribute', attribute_name)
         if len(find) == 0:
             msg = f"Could not find {attribute_name} in standards."
             self.logger.error(msg)
             raise MTH5TableError(msg)
             
-        meta_item = self.summary_table.array[find]
+        meta_item = table.values[find]
         lines = ['', attribute_name, '-' * (len(attribute_name) + 4)]
         for name, value  in zip(meta_item.dtype.names[1:],
                                 meta_item.item()[1:]):
@@ -417,10 +600,11 @@ class StandardsGroup(BaseGroup):
         :type summary_dict: dictionary
 
         """
-        
+        table = self.summary_table
+        rows = []
         for key, v_dict in summary_dict.items():
             key_list = [key]
-            for dkey in self.summary_table.dtype.names[1:]:
+            for dkey in table.dtype.names[1:]:
                 value = v_dict[dkey]
                 
                 if isinstance(value, list):
@@ -434,11 +618,10 @@ class StandardsGroup(BaseGroup):
                     value = ''
                     
                 key_list.append(value)
+            rows.append(tuple(key_list))
             
-            key_list = np.array([tuple(key_list)], self.summary_table.dtype)
-            index = self.summary_table.add_row(key_list)
-            
-        self.logger.debug(f'Added {index} rows to Standards Group')
+        index = table.add_rows(np.array(rows, dtype=table.dtype))
+        self.logger.debug('Added %s rows to Standards Group', index.size)
         
     def initialize_group(self):
         """
@@ -613,6 +796,18 @@ class MasterStationGroup(BaseGroup):
      
     """
     
+    # attributes read for each level when rebuilding summary tables
+    _summary_attributes = {'station': ['archive_id', 'time_period.start',
+                                       'time_period.end', 'data_type',
+                                       'location.latitude', 
+                                       'location.longitude'],
+                           'run': ['id', 'time_period.start', 
+                                   'time_period.end', 'data_type', 
+                                   'sample_rate'],
+                           'channel': ['component', 'time_period.start',
+                                       'time_period.end', 'type', 'units',
+                                       'sample_rate']}
+    
     def __init__(self, group, **kwargs):
         
         super().__init__(group, **kwargs)
@@ -632,7 +827,348 @@ class MasterStationGroup(BaseGroup):
                                                       np.float),
                                                      ('hdf5_reference', 
                                                       h5py.ref_dtype)])}
+        self._channel_catalog = None
+        
+    @property
+    def channel_catalog(self):
+        """
+        Catalog of every channel in the file, see 
+        :class:`mth5.mth5_groups.ChannelCatalog`.  Made from the existing 
+        channels if the file does not have one yet.
+        """
+        if (self._channel_catalog is None or 
+                not self._channel_catalog.hdf5_dataset.id.valid):
+            self._channel_catalog = ChannelCatalog.from_file(
+                self.hdf5_group, self._wrapper_cache)
+            if self._channel_catalog is None:
+                self.initialize_channel_catalog()
+        return self._channel_catalog
+    
+    def refresh(self):
+        """
+        Refresh the summary table and the channel catalog and read metadata
+        again on next access, to see changes made by a SWMR writer.
+        
+        """
+        super().refresh()
+        if self._channel_catalog is not None:
+            self._channel_catalog.refresh()
+    
+    def initialize_group(self):
+        """
+        Initialize group by making a summary table, the channel catalog and
+        writing metadata
+
+        """
+        super().initialize_group()
+        self.initialize_channel_catalog()
+        
+    def initialize_channel_catalog(self):
+        """
+        Make the channel catalog ``/Survey/Stations/Channel_Catalog`` and
+        fill it with the channels in the file with one write.  An existing 
+        catalog is replaced.
+        
+        :return: channel catalog
+        :rtype: :class:`mth5.mth5_groups.ChannelCatalog`
+
+        """
+        if ChannelCatalog.name in self.hdf5_group:
+            del self.hdf5_group[ChannelCatalog.name]
+        catalog_dataset = self.hdf5_group.create_dataset(
+            ChannelCatalog.name,
+            (0, ),
+            maxshape=(None, ),
+            dtype=ChannelCatalog.catalog_dtype)
+        catalog_dataset.attrs.update({'type': 'channel catalog',
+                                      'reference': catalog_dataset.ref,
+                                      'n_rows': 0})
+        self._channel_catalog = ChannelCatalog(catalog_dataset)
+        _add_wrapper(self, self._channel_catalog)
+        
+        channels = self._scan_tree()[2]
+        self._channel_catalog.add_rows(self._catalog_rows(channels))
+        self.logger.debug("Made channel catalog with %s channels", 
+                          len(channels))
+        
+        return self._channel_catalog
+    
+    def _scan_tree(self):
+        """
+        Find every station, run and channel with one pass over the tree and 
+        read the attributes needed for the summary tables, 
+        see `MasterStationGroup._summary_attributes`.
+        
+        :return: stations, runs and channels as dictionaries of path 
+                 relative to ``/Survey/Stations`` to (HDF5 object, 
+                 attributes), in the order visited
+        :rtype: tuple
+
+        """
+        stations = {}
+        runs = {}
+        channels = {}
+        
+        def read(obj, level):
+            attrs = obj.attrs
+            return (obj, dict([(key, get_attribute(attrs, key)) for key in 
+                               self._summary_attributes[level]]))
+        
+        def visit(name, obj):
+            depth = name.count('/')
+            if isinstance(obj, h5py.Group):
+                if depth == 0:
+                    stations[name] = read(obj, 'station')
+                elif depth == 1:
+                    runs[name] = read(obj, 'run')
+            elif depth == 2 and 'mth5_type' in obj.attrs:
+                channels[name] = read(obj, 'channel')
+        
+        self.hdf5_group.visititems(visit)
+        return stations, runs, channels
+    
+    @staticmethod
+    def _times_ns(times):
+        """
+        Convert a list of time strings to nanoseconds, times that are not 
+        set are 0.
+        """
+        ns = np.zeros(len(times), dtype=np.int64)
+        valid = [ii for ii, value in enumerate(times) if value is not None]
+        if not valid:
+            return ns
+        try:
+            ns[valid] = MTimeArray([times[ii] for ii in valid]).ns
+        except (ValueError, MTTimeError):
+            for ii in valid:
+                try:
+                    ns[ii] = MTime(times[ii]).epoch_ns
+                except (ValueError, MTTimeError):
+                    continue
+        return ns
+    
+    def _catalog_rows(self, channels):
+        """
+        Channel catalog rows of channels from `_scan_tree`, the same as 
+        :func:`ChannelCatalog.make_entry` for each channel.
+        """
+        names = [name.split('/') for name in channels]
+        values = list(channels.values())
+        
+        def column(key, default):
+            return [default if attrs[key] is None else attrs[key] 
+                    for obj, attrs in values]
+        
+        columns = {'station': [name[0] for name in names],
+                   'run': [name[1] for name in names],
+                   'channel': [name[2] for name in names],
+                   'component': column('component', '')}
+        ChannelCatalog.check_names(ChannelCatalog.catalog_dtype, columns)
+        columns.update({
+            'measurement_type': column('type', ''),
+            'sample_rate': column('sample_rate', np.nan),
+            'start': self._times_ns(column('time_period.start', None)),
+            'end': self._times_ns(column('time_period.end', None)),
+            'n_samples': [obj.size for obj, attrs in values],
+            'hdf5_reference': [obj.ref for obj, attrs in values]})
+        return self._fill_rows(ChannelCatalog.catalog_dtype, columns)
+    
+    @staticmethod
+    def _fill_rows(dtype, columns):
+        """
+        Make summary table rows from a dictionary of column values, columns
+        that are not in the table are skipped.
+        """
+        n_rows = len(columns['hdf5_reference'])
+        rows = np.zeros(n_rows, dtype=dtype)
+        for name in dtype.names:
+            if name in columns:
+                rows[name] = columns[name]
+        return rows
+    
+    @staticmethod
+    def _compare_rows(old_rows, new_rows, key_names):
+        """
+        Compare summary table rows by key columns, references are not 
+        compared.
         
+        :return: differences
+        :rtype: list of strings
+        """
+        def by_key(rows):
+            keyed = {}
+            duplicates = []
+            for row in rows:
+                key = tuple(row[name] for name in key_names)
+                if key in keyed:
+                    duplicates.append(key)
+                keyed[key] = row
+            return keyed, duplicates
+        
+        def key_str(key):
+            return '/'.join([k.decode() if isinstance(k, bytes) else str(k)
+                             for k in key])
+        
+        old, duplicates = by_key(old_rows)
+        new = by_key(new_rows)[0]
+        messages = ['duplicate entry {0}'.format(key_str(key)) 
+                    for key in duplicates]
+        messages += ['missing entry {0}'.format(key_str(key)) 
+                     for key in new if key not in old]
+        messages += ['extra entry {0}'.format(key_str(key)) 
+                     for key in old if key not in new]
+        for key in [key for key in new if key in old]:
+            for name in new_rows.dtype.names:
+                if name == 'hdf5_reference' or name not in old_rows.dtype.names:
+                    continue
+                old_value = old[key][name]
+                new_value = new[key][name]
+                if old_value == new_value:
+                    continue
+                if (isinstance(new_value, float) and np.isnan(new_value) and
+                    np.isnan(old_value)):
+                    continue
+                messages.append('{0}: {1} is {2} should be {3}'.format(
+                    key_str(key), name, old_value, new_value))
+        return messages
+    
+    def rebuild_summaries(self, verify=False):
+        """
+        Rebuild the summary tables of the stations group, every station and
+        every run, and the channel catalog from the file.
+        
+        The tree is scanned once with visititems and only the attributes 
+        needed for the tables are read, no group or channel objects are 
+        made.  Each table is built in memory and written with one write.
+        
+        :param verify: only compare the tables with the file and report 
+                       differences, nothing is written, defaults to False
+        :type verify: bool, optional
+        :return: differences found for each table that is not up to date,
+                 keyed by the path of the table.  Empty if every table is
+                 up to date.
+        :rtype: dictionary
+        
+        :Example: ::
+            
+            >>> mth5_obj.stations_group.rebuild_summaries(verify=True)
+            {'/Survey/Stations/Summary': ['missing entry MT001']}
+
+        """
+        stations, runs, channels = self._scan_tree()
+        
+        # group channels by run and runs by station
+        run_channels = dict([(name, []) for name in runs])
+        for name, channel in channels.items():
+            run_channels[name.rsplit('/', 1)[0]].append(channel)
+        station_runs = dict([(name, []) for name in stations])
+        for name, run in runs.items():
+            station_runs[name.split('/')[0]].append((name, run))
+            
+        summaries = []
+        run_components = {}
+        for name, (run, run_attrs) in runs.items():
+            ch_list = run_channels[name]
+            
+            def column(key):
+                return [attrs[key] for obj, attrs in ch_list]
+            
+            run_components[name] = column('component')
+            summaries.append((run, RunGroup, ('component', ), {
+                'component': column('component'),
+                'start': column('time_period.start'),
+                'end': column('time_period.end'),
+                'n_samples': [obj.size for obj, attrs in ch_list],
+                'measurement_type': column('type'),
+                'units': column('units'),
+                'hdf5_reference': [obj.ref for obj, attrs in ch_list]}))
+            
+        station_components = {}
+        for name, (station, station_attrs) in stations.items():
+            run_list = station_runs[name]
+            
+            def column(key):
+                return [attrs[key] for run_name, (obj, attrs) in run_list]
+            
+            station_components[name] = ','.join(sorted(set(
+                str(component) for run_name, run in run_list 
+                for component in run_components[run_name])))
+            summaries.append((station, StationGroup, ('id', ), {
+                'id': [run_name.split('/')[1] if attrs['id'] is None 
+                       else attrs['id'] 
+                       for run_name, (obj, attrs) in run_list],
+                'start': column('time_period.start'),
+                'end': column('time_period.end'),
+                'components': [','.join([str(c) for c in 
+                                         run_components[run_name]])
+                               for run_name, run in run_list],
+                'measurement_type': column('data_type'),
+                'sample_rate': column('sample_rate'),
+                'hdf5_reference': [obj.ref for run_name, (obj, attrs) 
+                                   in run_list]}))
+            
+        def column(key):
+            return [attrs[key] for obj, attrs in stations.values()]
+        
+        summaries.append((self.hdf5_group, MasterStationGroup, 
+                          ('archive_id', ), {
+            'archive_id': [name if attrs['archive_id'] is None 
+                           else attrs['archive_id']
+                           for name, (obj, attrs) in stations.items()],
+            'start': column('time_period.start'),
+            'end': column('time_period.end'),
+            'components': [station_components[name] for name in stations],
+            'measurement_type': column('data_type'),
+            'location.latitude': column('location.latitude'),
+            'location.longitude': column('location.longitude'),
+            'hdf5_reference': [obj.ref for obj, attrs in stations.values()]}))
+        
+        report = {}
+        for group, group_class, key_names, columns in summaries:
+            path = '/'.join([group.name, 'Summary'])
+            if 'Summary' not in group:
+                report[path] = ['missing summary table']
+                if verify:
+                    continue
+                # reset the summary table of a cached container as well
+                _get_wrapper(self, group, group_class).initialize_summary_table()
+            table = MTH5Table(group['Summary'])
+            rows = self._fill_rows(table.dtype, columns)
+            messages = self._compare_rows(table.values[table.valid_rows], 
+                                          rows, key_names)
+            if messages:
+                report.setdefault(path, []).extend(messages)
+            if not verify and (messages or table.removed_rows.size > 0):
+                table.replace_rows(rows)
+        
+        # channel catalog, catalogs of older files with shorter names are 
+        # made again
+        if ChannelCatalog.name not in self.hdf5_group:
+            report[ChannelCatalog.path] = ['missing channel catalog']
+            if not verify:
+                self.initialize_channel_catalog()
+        elif (self.hdf5_group[ChannelCatalog.name].dtype != 
+              ChannelCatalog.catalog_dtype):
+            report[ChannelCatalog.path] = ['old channel catalog data type']
+            if not verify:
+                self.initialize_channel_catalog()
+        else:
+            catalog = self.channel_catalog
+            rows = self._catalog_rows(channels)
+            messages = self._compare_rows(
+                catalog.values[catalog.valid_rows], rows, 
+                ('station', 'run', 'channel'))
+            if messages:
+                report[ChannelCatalog.path] = messages
+            if not verify and (messages or catalog.removed_rows.size > 0):
+                catalog.replace_rows(rows)
+        
+        for path, messages in report.items():
+            log = self.logger.warning if verify else self.logger.info
+            log("%s has %s differences with the file: %s", path, 
+                len(messages), '; '.join(messages[:10]))
+            
+        return report
     
     def add_station(self, station_name, station_metadata=None):
         """
@@ -668,16 +1204,18 @@ class MasterStationGroup(BaseGroup):
         
         try:
             station_group = self.hdf5_group.create_group(station_name)
-            self.logger.debug("Created group {0}".format(station_group.name))
+            self.logger.debug("Created group %s", station_group.name)
             station_obj = StationGroup(station_group, 
                                        station_metadata=station_metadata)
             station_obj.initialize_group()
+            _add_wrapper(self, station_obj)
         
         except ValueError:
             msg = (f"Station {station_name} already exists, " +
                    "returning existing group.")
             self.logger.info(msg)
-            station_obj = StationGroup(self.hdf5_group[station_name])
+            station_obj = _get_wrapper(self, self.hdf5_group[station_name],
+                                       StationGroup)
             station_obj.read_metadata()
 
         return station_obj
@@ -707,7 +1245,8 @@ class MasterStationGroup(BaseGroup):
         """
         
         try:
-            return StationGroup(self.hdf5_group[station_name])
+            return _get_wrapper(self, self.hdf5_group[station_name], 
+                                StationGroup)
         except KeyError:
             msg = (f'{station_name} does not exist, ' +
                    'check station_list for existing names')
@@ -741,6 +1280,12 @@ class MasterStationGroup(BaseGroup):
         
         try:
             del self.hdf5_group[station_name]
+            _remove_wrappers(self, '/'.join([self.hdf5_group.name, 
+                                             station_name]))
+            catalog = ChannelCatalog.from_file(self.hdf5_group, 
+                                               self._wrapper_cache)
+            if catalog is not None:
+                catalog.remove_channels(station=station_name)
             self.logger.info("Deleting a station does not reduce the HDF5" +
                              "file size it simply remove the reference. If " +
                              "file size reduction is your goal, simply copy" +
@@ -979,18 +1524,19 @@ class StationGroup(BaseGroup):
         
         try:
             run_group = self.hdf5_group.create_group(run_name)
-            self.logger.debug("Created group {0}".format(run_group.name))
-            run_obj = RunGroup(run_group, run_metdata=run_metadata)
-            run_obj.initialize_group()
+            self.logger.debug("Created group %s", run_group.name)
+            run_obj = RunGroup(run_group, run_metadata=run_metadata)
             if run_obj.metadata.id is None:
                 run_obj.metadata.id = run_name
+            run_obj.initialize_group()
             self.summary_table.add_row(run_obj.table_entry)
+            _add_wrapper(self, run_obj)
         
         except ValueError:
             msg = (f"run {run_name} already exists, " +
                    "returning existing group.")
             self.logger.info(msg)
-            run_obj = RunGroup(self.hdf5_group[run_name])
+            run_obj = _get_wrapper(self, self.hdf5_group[run_name], RunGroup)
             run_obj.read_metadata()
 
         return run_obj
@@ -1008,7 +1554,7 @@ class StationGroup(BaseGroup):
 
         """
         try:
-            return RunGroup(self.hdf5_group[run_name])
+            return _get_wrapper(self, self.hdf5_group[run_name], RunGroup)
         except KeyError:
             msg = (f'{run_name} does not exist, ' +
                    'check groups_list for existing names')
@@ -1042,6 +1588,13 @@ class StationGroup(BaseGroup):
         
         try:
             del self.hdf5_group[run_name]
+            _remove_wrappers(self, '/'.join([self.hdf5_group.name, run_name]))
+            catalog = ChannelCatalog.from_file(self.hdf5_group, 
+                                               self._wrapper_cache)
+            if catalog is not None:
+                catalog.remove_channels(
+                    *ChannelCatalog.split_path(self.hdf5_group.name),
+                    run=run_name)
             self.logger.info("Deleting a run does not reduce the HDF5" +
                              "file size it simply remove the reference. If " +
                              "file size reduction is your goal, simply copy" +
@@ -1263,7 +1816,9 @@ class RunGroup(BaseGroup):
                                          ('hdf5_reference', h5py.ref_dtype)]))
         
     def add_channel(self, channel_name, channel_type, data, channel_dtype='f',
-                    max_shape=(None,), chunks=True, channel_metadata=None):
+                    max_shape=(None,), chunks=True, channel_metadata=None,
+                    compression=None, compression_opts=None, shuffle=None,
+                    fletcher32=None, scaleoffset=None):
         """
         add a channel to the run
         
@@ -1277,6 +1832,22 @@ class RunGroup(BaseGroup):
         :type channel_metadata: [ :class:`mth5.metadata.Electric` |
                                  :class:`mth5.metadata.Magnetic` |
                                  :class:`mth5.metadata.Auxiliary` ], optional
+        :param compression: [ gzip | lzf | szip | blosc | bitshuffle | none ],
+                            defaults to None which uses the file default
+        :type compression: string, optional
+        :param compression_opts: compression level, defaults to None which
+                                 uses the file default
+        :type compression_opts: integer, optional
+        :param shuffle: use the shuffle filter, defaults to None which uses
+                        the file default
+        :type shuffle: bool, optional
+        :param fletcher32: add a checksum, defaults to None which uses the
+                           file default
+        :type fletcher32: bool, optional
+        :param scaleoffset: scale-offset filter, for integer counts 0 is
+                            lossless, defaults to None which uses the file
+                            default
+        :type scaleoffset: integer, optional
         :return: Channel container
         :rtype: [ :class:`mth5.mth5_groups.ElectricDatset` |
                  :class:`mth5.mth5_groups.MagneticDatset` |
@@ -1301,6 +1872,9 @@ class RunGroup(BaseGroup):
             if data.size < 1024:
                 chunks = None
                 
+        dataset_options, dataset_attrs = self._get_dataset_options(
+            compression=compression, compression_opts=compression_opts,
+            shuffle=shuffle, fletcher32=fletcher32, scaleoffset=scaleoffset)
         
         try:
             if data is not None:
@@ -1308,48 +1882,189 @@ class RunGroup(BaseGroup):
                                                            data=data,
                                                            maxshape=max_shape,
                                                            dtype=data.dtype,
-                                                           chunks=chunks)
+                                                           chunks=chunks,
+                                                           **dataset_options)
             else:
                 channel_group = self.hdf5_group.create_dataset(channel_name,
                                                            shape=(1, ),
                                                            maxshape=max_shape,
                                                            dtype=channel_dtype,
-                                                           chunks=chunks)
+                                                           chunks=chunks,
+                                                           **dataset_options)
+            channel_group.attrs.update(dataset_attrs)
             
-            self.logger.debug("Created group {0}".format(channel_group.name))
-            if channel_type.lower() in ['magnetic']:
-                channel_obj = MagneticDataset(channel_group,
-                                            channel_metdata=channel_metadata)
-            elif channel_type.lower() in ['electric']:
-                channel_obj = ElectricDataset(channel_group,
-                                            channel_metdata=channel_metadata)
-            elif channel_type.lower() in ['auxiliary']:
-                channel_obj = AuxiliaryDataset(channel_group,
-                                            channel_metdata=channel_metadata)
-            else:
-                msg = ("`channel_type` must be in [ electric | magnetic | " +
-                       "auxiliary ]. Input was {0}".format(channel_type))
-                self.logger.error(msg)
-                raise MTH5Error(msg)
+            self.logger.debug("Created group %s", channel_group.name)
+            channel_obj = self._make_channel_object(channel_group,
+                                                    channel_type,
+                                                    channel_metadata)
             if channel_obj.metadata.component is None:
                 channel_obj.metadata.component = channel_name
             channel_obj.write_metadata()
             self.summary_table.add_row(channel_obj.table_entry)
+            _add_wrapper(self, channel_obj)
         
         except OSError:
             msg = (f"channel {channel_name} already exists, " +
                    "returning existing group.")
             self.logger.info(msg)
             if channel_type in ['magnetic']:
-                channel_obj = MagneticDataset(self.hdf5_group[channel_name])
+                channel_class = MagneticDataset
             elif channel_type in ['electric']:
-                channel_obj = ElectricDataset(self.hdf5_group[channel_name])
+                channel_class = ElectricDataset
             elif channel_type in ['auxiliary']:
-                channel_obj = AuxiliaryDataset(self.hdf5_group[channel_name])
+                channel_class = AuxiliaryDataset
+            channel_obj = _get_wrapper(self, self.hdf5_group[channel_name],
+                                       channel_class)
             channel_obj.read_metadata()
             
         return channel_obj
-    
+
+    def _get_dataset_options(self, **kwargs):
+        """
+        Get the dataset compression options from the file defaults stored in
+        the root attributes updated by any keyword arguments that are not
+        None.
+
+        :return: keyword arguments for create_dataset and the options as
+                 strings to store in the dataset attributes
+        :rtype: tuple of dictionaries
+
+        """
+        options = dataset_options_from_attrs(self.hdf5_group.file.attrs,
+                                             prefix='dataset.')
+        options.update(dict([(key, value) for key, value in kwargs.items()
+                             if value is not None]))
+        # the level of the file default doesn't apply to a new compression
+        if (kwargs.get('compression', None) is not None and
+                kwargs.get('compression_opts', None) is None):
+            options['compression_opts'] = None
+
+        return get_dataset_options(**options), dataset_options_to_attrs(
+            **options)
+
+    def _make_channel_object(self, channel_dataset, channel_type,
+                             channel_metadata=None):
+        """
+        Wrap an HDF5 dataset in the channel container for `channel_type`.
+
+        :param channel_dataset: HDF5 dataset of the channel
+        :type channel_dataset: :class:`h5py.Dataset`
+        :param channel_type: [ electric | magnetic | auxiliary ]
+        :type channel_type: string
+        :param channel_metadata: metadata container, defaults to None
+        :type channel_metadata: [ :class:`mth5.metadata.Electric` |
+                                 :class:`mth5.metadata.Magnetic` |
+                                 :class:`mth5.metadata.Auxiliary` ], optional
+        :return: Channel container
+        :raises MTH5Error: If channel type is not correct
+
+        """
+        # the channel uses the cache of the run to find the catalog
+        if channel_type.lower() in ['magnetic']:
+            return MagneticDataset(channel_dataset,
+                                   dataset_metadata=channel_metadata,
+                                   _wrapper_cache=self._wrapper_cache)
+        elif channel_type.lower() in ['electric']:
+            return ElectricDataset(channel_dataset,
+                                   dataset_metadata=channel_metadata,
+                                   _wrapper_cache=self._wrapper_cache)
+        elif channel_type.lower() in ['auxiliary']:
+            return AuxiliaryDataset(channel_dataset,
+                                    dataset_metadata=channel_metadata,
+                                    _wrapper_cache=self._wrapper_cache)
+
+        msg = ("`channel_type` must be in [ electric | magnetic | " +
+               "auxiliary ]. Input was {0}".format(channel_type))
+        self.logger.error(msg)
+        raise MTH5Error(msg)
+
+    def open_channel_writer(self, channel_name, channel_type,
+                            channel_metadata=None, channel_dtype='f',
+                            chunk_size=65536, compression=None,
+                            compression_opts=None, shuffle=None,
+                            fletcher32=None, scaleoffset=None,
+                            flush_interval=None):
+        """
+        Open a writer that appends blocks of data to a new channel.  The
+        channel is created as an empty resizable dataset chunked by
+        `chunk_size` samples, so long recordings can be written in bounded
+        memory.
+
+        :param channel_name: name of the channel
+        :type channel_name: string
+        :param channel_type: [ electric | magnetic | auxiliary ]
+        :type channel_type: string
+        :param channel_metadata: metadata container, should include the
+                                 sample rate and start time, defaults to None
+        :type channel_metadata: [ :class:`mth5.metadata.Electric` |
+                                 :class:`mth5.metadata.Magnetic` |
+                                 :class:`mth5.metadata.Auxiliary` ], optional
+        :param channel_dtype: data type of the channel, defaults to 'f'
+        :type channel_dtype: string or :class:`numpy.dtype`, optional
+        :param chunk_size: number of samples in an HDF5 chunk,
+                           defaults to 65536
+        :type chunk_size: integer, optional
+        :param compression: compression filter, defaults to None which uses
+                            the file default.  See `add_channel` for
+                            options and the other filter keywords.
+        :type compression: string, optional
+        :param flush_interval: number of samples between updates of the 
+                               summary tables, defaults to None to update
+                               them on close
+        :type flush_interval: integer, optional
+        :return: channel writer
+        :rtype: :class:`mth5.mth5_groups.ChannelWriter`
+        :raises MTH5Error: If the channel already exists or the channel type
+                           is not correct
+
+        :Example: ::
+
+            >>> with run.open_channel_writer('Ex', 'electric',
+            ...                              channel_metadata=ex_metadata,
+            ...                              chunk_size=4096) as writer:
+            ...     for block in blocks:
+            ...         writer.append(block)
+
+        """
+        if channel_name in self.hdf5_group:
+            msg = "channel {0} already exists".format(channel_name)
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        dataset_options, dataset_attrs = self._get_dataset_options(
+            compression=compression, compression_opts=compression_opts,
+            shuffle=shuffle, fletcher32=fletcher32, scaleoffset=scaleoffset)
+
+        channel_dataset = self.hdf5_group.create_dataset(
+            channel_name,
+            shape=(0,),
+            maxshape=(None,),
+            dtype=channel_dtype,
+            chunks=(int(chunk_size),),
+            **dataset_options)
+        channel_dataset.attrs.update(dataset_attrs)
+        self.logger.debug("Created group %s", channel_dataset.name)
+
+        try:
+            channel_obj = self._make_channel_object(channel_dataset,
+                                                    channel_type,
+                                                    channel_metadata)
+        except MTH5Error:
+            del self.hdf5_group[channel_name]
+            raise
+
+        if channel_obj.metadata.component is None:
+            channel_obj.metadata.component = channel_name
+        channel_obj.write_metadata()
+        summary_index = self.summary_table.add_row(channel_obj.table_entry)
+        _add_wrapper(self, channel_obj)
+
+        writer = ChannelWriter(channel_obj, self, 
+                               flush_interval=flush_interval)
+        # components are not unique, so keep the row of this channel
+        writer._summary_index = summary_index
+        return writer
+
     def get_channel(self, channel_name):
         """
         
@@ -1389,14 +2104,9 @@ class RunGroup(BaseGroup):
         
         try:
             ch_dataset = self.hdf5_group[channel_name]
-            if ch_dataset.attrs['mth5_type'].lower() in ['electric']:
-                return ElectricDataset(ch_dataset)
-            elif ch_dataset.attrs['mth5_type'].lower() in ['magnetic']:
-                return MagneticDataset(ch_dataset)
-            elif ch_dataset.attrs['mth5_type'].lower() in ['auxiliary']:
-                return AuxiliaryDataset(ch_dataset)
-            else:
-                return ChannelDataset(ch_dataset)
+            if 'mth5_type' not in ch_dataset.attrs:
+                raise KeyError(channel_name)
+            return _get_wrapper(self, ch_dataset)
             
         except KeyError:
             msg = (f'{channel_name} does not exist, ' +
@@ -1431,8 +2141,16 @@ class RunGroup(BaseGroup):
         try:
             component = self.hdf5_group[channel_name].attrs['component']
             del self.hdf5_group[channel_name]
+            _remove_wrappers(self, '/'.join([self.hdf5_group.name, 
+                                             channel_name]))
             self.summary_table.remove_row(self.summary_table.locate('component', 
                                                                     component))
+            catalog = ChannelCatalog.from_file(self.hdf5_group, 
+                                               self._wrapper_cache)
+            if catalog is not None:
+                catalog.remove_channels(
+                    *ChannelCatalog.split_path(self.hdf5_group.name),
+                    channel=channel_name)
             self.logger.info("Deleting a channel does not reduce the HDF5" +
                              "file size it simply remove the reference. If " +
                              "file size reduction is your goal, simply copy" +
@@ -1441,8 +2159,144 @@ class RunGroup(BaseGroup):
             msg = (f'{channel_name} does not exist, ' +
                    'check group_list for existing names')
             self.logger.exception(msg)
-            raise MTH5Error(msg)   
-    
+            raise MTH5Error(msg)
+
+    def to_array(self, channels=None, start=None, end=None):
+        """
+        Read a window of multiple channels into a single preallocated
+        array of shape (n_channels, n_samples) and return it as an
+        :class:`xarray.Dataset` where all channels share the same time
+        coordinate.
+
+        Like :func:`ChannelDataset.time_slice` the window holds the samples
+        >= start and <= end, and the time coordinate is the sample times of
+        the channels, which are not the requested start if it falls between
+        samples.
+
+        Only the HDF5 attributes needed to compute sample indices are read,
+        no channel metadata objects are created.  The channels must have the
+        same sample rate.
+
+        :param channels: channel names to read, defaults to None which reads
+                         all channels in the run
+        :type channels: list of strings, optional
+        :param start: start time of the window, defaults to None which uses
+                      the latest start time of the channels
+        :type start: string or :class:`mth5.utils.mttime.MTime`, optional
+        :param end: end time of the window, defaults to None which uses the
+                    earliest end time of the channels
+        :type end: string or :class:`mth5.utils.mttime.MTime`, optional
+        :return: dataset with a data variable for each channel
+        :rtype: :class:`xarray.Dataset`
+        :raises MTH5Error: if a channel does not exist, the sample rates are
+                           different, or the window is not within the data
+
+        :Example: ::
+
+            >>> run = mth5_obj.get_run('MT001', 'MT001a')
+            >>> run_ds = run.to_array(['Ex', 'Ey', 'Hx', 'Hy'],
+            ...                       start='2020-01-01T12:00:00',
+            ...                       end='2020-01-01T13:00:00')
+            >>> run_ds.to_array().shape
+            (4, 14745601)
+
+        """
+        # xarray is only imported when needed, it is slow to import.
+        import xarray as xr
+
+        if channels is None:
+            channels = [name for name, obj in self.hdf5_group.items()
+                        if isinstance(obj, h5py.Dataset) and
+                        'mth5_type' in obj.attrs]
+
+        datasets = []
+        for name in channels:
+            try:
+                datasets.append(self.hdf5_group[name])
+            except KeyError:
+                msg = (f'{name} does not exist, ' +
+                       'check groups_list for existing names')
+                self.logger.error(msg)
+                raise MTH5Error(msg)
+
+        if len(datasets) == 0:
+            msg = "No channels found in {0}".format(self.hdf5_group.name)
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        sample_rates = set([float(ds.attrs['sample_rate']) for ds in datasets])
+        if len(sample_rates) != 1:
+            msg = "Channels must have the same sample rate, found {0}".format(
+                sorted(sample_rates))
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+        sample_rate = sample_rates.pop()
+        if sample_rate <= 0:
+            msg = "sample_rate is {0}, need a valid sample rate".format(
+                sample_rate)
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        starts = MTimeArray([ds.attrs['time_period.start'] for ds in datasets])
+        if start is None:
+            start = starts[int(np.argmax(starts.ns))]
+        elif not isinstance(start, MTime):
+            start = MTime(start)
+
+        # first sample at or after the window start in each channel, same as
+        # ChannelDataset.time_slice
+        offsets = [_sample_index(ch_start, start.epoch_ns, sample_rate, 'ceil')
+                   for ch_start in starts.ns.tolist()]
+        if end is None:
+            n_samples = min([ds.size - offset for ds, offset in
+                             zip(datasets, offsets)])
+        else:
+            if not isinstance(end, MTime):
+                end = MTime(end)
+            # last sample at or before the window end in each channel
+            n_samples = min([
+                _sample_index(ch_start, end.epoch_ns, sample_rate, 'floor') -
+                offset + 1 for ch_start, offset in
+                zip(starts.ns.tolist(), offsets)])
+
+        for ds, offset in zip(datasets, offsets):
+            if n_samples < 1 or offset < 0 or offset + n_samples > ds.size:
+                msg = ("Requested window {0} to {1} is not within the data " +
+                       "of {2}").format(start, end, ds.name)
+                self.logger.error(msg)
+                raise MTH5Error(msg)
+
+        # read every channel directly into its row of a single buffer
+        data = np.empty((len(datasets), n_samples),
+                        dtype=np.result_type(*[ds.dtype for ds in datasets]))
+        for ii, (ds, offset) in enumerate(zip(datasets, offsets)):
+            ds.read_direct(data,
+                           source_sel=np.s_[offset:offset + n_samples],
+                           dest_sel=np.s_[ii, 0:n_samples])
+
+        # the time axis is the sample times of the channels, which need not
+        # be the requested start.  Sample times are rounded to whole
+        # nanoseconds from the channel start, so they do not drift when the
+        # sample period is not a whole number of nanoseconds
+        period_ns = NS_PER_SECOND / sample_rate
+        first_samples = [ch_start + int(round(offset * period_ns)) for
+                         ch_start, offset in zip(starts.ns.tolist(), offsets)]
+        if max(first_samples) - min(first_samples) > 1:
+            self.logger.warning(
+                "Channels are not sampled at the same times, using the "
+                "sample times of {0}".format(datasets[0].name))
+        times = MTimeArray.from_ns(
+            starts.ns[0] + np.round((offsets[0] + np.arange(n_samples)) *
+                                    period_ns).astype(np.int64))
+
+        return xr.Dataset(
+            dict([(name, (['time'], data[ii])) for ii, name in
+                  enumerate(channels)]),
+            coords={'time': times.datetime64},
+            attrs={'sample_rate': sample_rate,
+                   'time_period.start': times[0].iso_str,
+                   'time_period.end': times[-1].iso_str})
+
 class ChannelDataset():
     """
     Holds a channel dataset.  This is a simple container for the data to make 
@@ -1489,74 +2343,49 @@ class ChannelDataset():
         	start:            1980-01-01T00:00:00+00:00
         	end:              1980-01-01T00:00:01+00:00
         	sample rate:      4096
-            
-    :Get a window
-     
-    
+
+    :Get a window, only the requested samples are read from the file:
+
+    >>> ex_window = channel.time_slice('1980-01-01T00:00:00.25',
+    ...                                n_samples=256)
+    >>> type(ex_window)
+    mth5.timeseries.MTTS
+
     """
+
+    logger = ClassLogger()
+    
+    # cache of the file the container is in, set by WrapperCache
+    _wrapper_cache = None
     
     def __init__(self, dataset, dataset_metadata=None, **kwargs):
         
         if dataset is not None and isinstance(dataset, (h5py.Dataset)):
             self.hdf5_dataset = weakref.ref(dataset)()
         
-        self.logger = logging.getLogger('{0}.{1}'.format(__name__, 
-                                                         self._class_name))
+        # metadata is made on first access, see `ChannelDataset.metadata`
+        self._metadata = None
+        self._written_metadata = None
         
-        # set metadata to the appropriate class.  Standards is not a 
-        # metadata.Base object so should be skipped. If the class name is not
-        # defined yet set to Base class.
-        self.metadata = metadata.Base()
-        try:
-            self.metadata = meta_classes[self._class_name]()
-        except KeyError:
-            self.metadata = metadata.Base()
-            
-        # add 2 attributes that will help with querying 
-        # 1) the metadata class name
-        self.metadata.add_base_attribute('mth5_type', 
-                                         self._class_name.split('Group')[0],
-                                         {'type':str, 
-                                          'required':True,
-                                          'style':'free form',
-                                          'description': 'type of group', 
-                                          'units':None,
-                                          'options':[],
-                                          'alias':[],
-                                          'example':'group_name'})
-        
-        # 2) the HDF5 reference that can be used instead of paths
-        self.metadata.add_base_attribute('hdf5_reference', 
-                                         self.hdf5_dataset.ref,
-                                         {'type': 'h5py_reference', 
-                                          'required':True,
-                                          'style':'free form',
-                                          'description': 'hdf5 internal reference', 
-                                          'units':None,
-                                          'options':[],
-                                          'alias':[],
-                                          'example':'<HDF5 Group Reference>'})
-        # set summary attributes    
-        self.logger.debug("Metadata class for {0} is {1}".format(
-                self._class_name, type(self.metadata)))
+        # if any other keywords, set first as the cache of the file is 
+        # used when metadata is written
+        for key, value in kwargs.items():
+            setattr(self, key, value)
         
         # if metadata, make sure that its the same class type
         if dataset_metadata is not None:
-            if not isinstance(dataset_metadata, (self.metadata, metadata.Base)):
+            if not isinstance(dataset_metadata, metadata.Base):
                 msg = "metadata must be type metadata.{0} not {1}".format(
                     self._class_name, type(dataset_metadata))
                 self.logger.error(msg)
                 raise MTH5Error(msg)
              
-            # load from dict because of the extra attributes for MTH5
-            self.metadata.from_dict(dataset_metadata.to_dict())
+            # load from dict because of the extra attributes for MTH5, keep
+            # the type and reference of this dataset
+            self.metadata.from_dict(self._metadata_dict(dataset_metadata))
              
             # write out metadata to make sure that its in the file.
             self.write_metadata()
-        
-        # if any other keywords 
-        for key, value in kwargs.items():
-            setattr(self, key, value)
             
     def __str__(self):
         lines = ['Channel {0}:'.format(self._class_name)]
@@ -1578,18 +2407,77 @@ class ChannelDataset():
     @property
     def _class_name(self):
         return self.__class__.__name__.split('Dataset')[0]
+    
+    @property
+    def metadata(self):
+        """
+        Metadata container, made on first access.  If the HDF5 dataset
+        already has metadata in its attributes those are read in.
+        """
+        if self._metadata is None:
+            self._initialize_metadata()
+        return self._metadata
+    
+    @metadata.setter
+    def metadata(self, value):
+        self._metadata = value
+        
+    def _initialize_metadata(self):
+        """
+        Make the metadata container for the channel and read in existing
+        attributes.  Only done when metadata is needed, so getting a channel
+        to read data from `hdf5_dataset` is cheap.
+        
+        """
+        # set metadata to the appropriate class.  If the class name is not
+        # defined yet set to Base class.
+        try:
+            self._metadata = meta_classes[self._class_name]()
+        except KeyError:
+            self._metadata = metadata.Base()
+            
+        # add 2 attributes that will help with querying 
+        add_mth5_attributes(self._metadata, self._class_name, 
+                            self.hdf5_dataset)
+        self.logger.debug("Metadata class for %s is %s", self._class_name,
+                          type(self._metadata))
+        
+        # existing channel, fill from the attributes
+        if 'mth5_type' in self.hdf5_dataset.attrs:
+            self.read_metadata()
 
     
+    @staticmethod
+    def _metadata_dict(metadata_obj):
+        """
+        metadata dictionary without the MTH5 attributes
+        """
+        meta_dict = metadata_obj.to_dict()
+        for value in meta_dict.values():
+            for key in MTH5_ATTR_DICT:
+                value.pop(key, None)
+        return meta_dict
+    
+    def _copy_metadata(self):
+        """
+        copy of the channel metadata without the MTH5 attributes
+        """
+        new_metadata = type(self.metadata)()
+        new_metadata.from_dict(self._metadata_dict(self.metadata))
+        return new_metadata
+    
     def read_metadata(self):
         """
         Read metadata from the HDF5 file into the metadata container, that 
         way it can be validated.
 
         """
-        meta_dict = dict([(key, value) for key, value in 
+        meta_dict = dict([(key, from_numpy_type(value)) for key, value in 
                           self.hdf5_dataset.attrs.items()])
         
         self.metadata.from_dict({self._class_name: meta_dict})
+        self._written_metadata = _metadata_snapshot(
+            self.metadata.to_dict()[self.metadata._class_name.lower()])
                
     def write_metadata(self):
         """
@@ -1598,10 +2486,22 @@ class ChannelDataset():
 
         """
         meta_dict = self.metadata.to_dict()[self.metadata._class_name.lower()]
-        for key, value in meta_dict.items():
-            value = to_numpy_type(value)
-            self.logger.debug('wrote metadata {0} = {1}'.format(key, value))
-            self.hdf5_dataset.attrs.create(key, value)
+        write_attributes(self.hdf5_dataset, meta_dict)
+        self._written_metadata = _metadata_snapshot(meta_dict)
+        
+        catalog = ChannelCatalog.from_file(self.hdf5_dataset, 
+                                           self._wrapper_cache)
+        if catalog is not None:
+            catalog.update_channel(self.hdf5_dataset)
+    
+    def _metadata_changed(self):
+        """
+        True if the metadata was changed since it was read or written
+        """
+        if self._metadata is None:
+            return False
+        return (self._metadata.to_dict()[self._metadata._class_name.lower()]
+                != self._written_metadata)
     
     @property
     def table_entry(self):
@@ -1625,22 +2525,327 @@ class ChannelDataset():
                                          ('units', 'S25'),
                                          ('hdf5_reference', h5py.ref_dtype)]))
     
-    def time_slice(self, start_time, end_time):
+    @property
+    def n_samples(self):
+        return self.hdf5_dataset.size
+    
+    def refresh(self):
         """
-        Get a time slice from the channel
+        Refresh the dataset to see samples appended by a SWMR writer, 
+        metadata is read again on next access.
         
+        :return: number of samples
+        :rtype: integer
         
-        :param start_time: DESCRIPTION
-        :type start_time: TYPE
-        :param end_time: DESCRIPTION
-        :type end_time: TYPE
-        :return: DESCRIPTION
-        :rtype: TYPE
+        :Example: ::
+            
+            >>> hx.refresh()
+            8192
+
+        """
+        self.hdf5_dataset.refresh()
+        self._metadata = None
+        return self.n_samples
+
+    def get_index_from_time(self, given_time, rounding='nearest'):
+        """
+        Get the sample index for a given time, computed from
+        `metadata.time_period.start` and `metadata.sample_rate`.  Assumes
+        the samples are equally spaced.
+
+        :param given_time: time to get the index for
+        :type given_time: string or :class:`mth5.utils.mttime.MTime`
+        :param rounding: [ nearest | ceil | floor ] index of the sample 
+                         closest to the given time, the first sample at or 
+                         after it, or the last sample at or before it.  
+                         Sample times within half a nanosecond of the given
+                         time count as equal. Defaults to 'nearest'
+        :type rounding: string, optional
+        :return: sample index, can be outside the bounds of the dataset
+        :rtype: integer
+        :raises MTH5Error: if the sample rate is not set
+
+        """
+        sample_rate = self.metadata.sample_rate
+        if sample_rate in [None, 0]:
+            msg = ("sample_rate is {0}, need a valid sample rate to " +
+                   "compute an index from time").format(sample_rate)
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        if not isinstance(given_time, MTime):
+            given_time = MTime(given_time)
+        start = MTime(self.metadata.time_period.start)
+
+        try:
+            return _sample_index(start.epoch_ns, given_time.epoch_ns,
+                                 sample_rate, rounding)
+        except ValueError as error:
+            self.logger.error(str(error))
+            raise
+
+    def time_slice(self, start_time, end_time=None, n_samples=None):
+        """
+        Get a time slice from the channel.  The sample indices are computed
+        directly from the start time and sample rate of the channel, so only
+        the requested samples are read from the HDF5 file.
+
+        Looks for >= start_time & <= end_time.  If `n_samples` is given
+        instead of `end_time`, then that many samples are returned starting
+        at `start_time`.
+
+        :param start_time: start time of the slice
+        :type start_time: string or :class:`mth5.utils.mttime.MTime`
+        :param end_time: end time of the slice, defaults to None
+        :type end_time: string or :class:`mth5.utils.mttime.MTime`, optional
+        :param n_samples: number of samples to get, defaults to None
+        :type n_samples: integer, optional
+        :return: time series of the requested slice
+        :rtype: :class:`mth5.timeseries.MTTS`
+        :raises MTH5Error: if the slice is not within the data
+
+        :Example: ::
+
+            >>> ex = mth5_obj.get_channel('MT001', 'MT001a', 'Ex')
+            >>> ex_slice = ex.time_slice('2020-01-01T12:00:00',
+            ...                          end_time='2020-01-01T13:00:00')
+
+        """
+        # timeseries imports xarray, so only import when needed
+        from mth5.timeseries import MTTS
+
+        if end_time is None and n_samples is None:
+            msg = "Must input either end_time or n_samples"
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        start_index = self.get_index_from_time(start_time, rounding='ceil')
+        if n_samples is not None:
+            end_index = start_index + int(n_samples)
+        else:
+            end_index = self.get_index_from_time(end_time,
+                                                 rounding='floor') + 1
+
+        if start_index >= self.n_samples or end_index <= 0:
+            msg = ("Requested slice {0} to {1} is not within the data " +
+                   "{2} to {3}").format(start_time, end_time or n_samples,
+                                        self.metadata.time_period.start,
+                                        self.metadata.time_period.end)
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        if start_index < 0:
+            self.logger.warning("Requested start is before the data start, "
+                                "setting start to the data start")
+            start_index = 0
+        if end_index > self.n_samples:
+            self.logger.warning("Requested end is after the data end, "
+                                "setting end to the data end")
+            end_index = self.n_samples
+
+        # only read the samples needed
+        data = self.hdf5_dataset[start_index:end_index]
+
+        # copy the metadata so the channel metadata is not changed
+        slice_metadata = self._copy_metadata()
+        start = MTime(self.metadata.time_period.start)
+        slice_metadata.time_period.start = (start + datetime.timedelta(
+            seconds=start_index / self.metadata.sample_rate)).iso_str
+
+        return MTTS(self.metadata.type, data=data,
+                    channel_metadata=slice_metadata)
+
+    def decimate(self, dec_factor, run_group, channel_name=None,
+                 block_size=2**20, **kwargs):
+        """
+        Decimate the channel with an anti-alias filter into a new channel
+        of `run_group`.  The data are read, filtered and written in blocks
+        of `block_size` samples so the channel is never loaded whole.  The
+        output is the same as :func:`mth5.utils.mtfilter.decimate` on the
+        whole channel.
+
+        Runs have a single sample rate, so the decimated channel usually
+        goes into a new run.
+
+        :param dec_factor: decimation factor
+        :type dec_factor: integer
+        :param run_group: run to write the decimated channel to
+        :type run_group: :class:`mth5.mth5_groups.RunGroup`
+        :param channel_name: name of the new channel, defaults to the name
+                             of this channel
+        :type channel_name: string, optional
+        :param block_size: number of samples to read at a time, defaults to
+                           2**20
+        :type block_size: integer, optional
+        :param kwargs: keywords passed to `RunGroup.open_channel_writer`, 
+                       e.g. chunk_size or compression
+        :return: decimated channel
+        :rtype: [ :class:`mth5.mth5_groups.ElectricDatset` |
+                  :class:`mth5.mth5_groups.MagneticDatset` |
+                  :class:`mth5.mth5_groups.AuxiliaryDatset` ]
+        :raises MTH5Error: if the sample rate is not set
+
+        :Example: ::
+
+            >>> run_1hz = station.add_run('MT001b')
+            >>> hx = run_4096.get_channel('Hx')
+            >>> hx_1hz = hx.decimate(4096, run_1hz)
+            >>> hx_1hz.metadata.sample_rate
+            1.0
 
         """
+        from mth5.utils.mtfilter import Decimator
+
+        sample_rate = self.metadata.sample_rate
+        if sample_rate in [None, 0]:
+            msg = ("sample_rate is {0}, need a valid sample rate to "
+                   "decimate").format(sample_rate)
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        new_metadata = self._copy_metadata()
+        new_metadata.sample_rate = sample_rate / dec_factor
         
-        pass
-    
+        decimator = Decimator(dec_factor)
+        return self._stream_to_channel(decimator.process, decimator.flush,
+                                       run_group, channel_name, new_metadata,
+                                       block_size, **kwargs)
+
+    def apply_filter(self, sos, run_group=None, channel_name=None,
+                     block_size=2**20, inplace=False, filter_name='sos_filter',
+                     **kwargs):
+        """
+        Filter the channel with an IIR filter in second order sections,
+        see :class:`mth5.utils.mtfilter.SOSFilter`.  The data are read,
+        filtered and written in blocks of `block_size` samples with the
+        filter state carried between blocks, so memory use is bounded and
+        the output is the same as filtering the whole channel.
+
+        The filtered data are written to a new channel, of `run_group` or 
+        of the run of this channel.  If `inplace` is True the data of this
+        channel are overwritten, which needs a floating point dataset.  The
+        filter is added to `filter.name` of the channel metadata with 
+        `filter.applied` True.
+
+        :param sos: second order sections, stack several filters with
+                    numpy.vstack
+        :type sos: :class:`numpy.ndarray`
+        :param run_group: run to write the filtered channel to, defaults to
+                          None for the run of this channel
+        :type run_group: :class:`mth5.mth5_groups.RunGroup`, optional
+        :param channel_name: name of the new channel, defaults to the name
+                             of this channel, with '_filtered' added if
+                             the channel is written to the same run
+        :type channel_name: string, optional
+        :param block_size: number of samples to read at a time, defaults to
+                           2**20
+        :type block_size: integer, optional
+        :param inplace: overwrite the data of this channel, defaults to 
+                        False
+        :type inplace: bool, optional
+        :param filter_name: name of the filter in the channel metadata,
+                            defaults to 'sos_filter'
+        :type filter_name: string, optional
+        :param kwargs: keywords passed to `RunGroup.open_channel_writer`
+        :return: filtered channel
+        :rtype: [ :class:`mth5.mth5_groups.ElectricDatset` |
+                  :class:`mth5.mth5_groups.MagneticDatset` |
+                  :class:`mth5.mth5_groups.AuxiliaryDatset` ]
+        :raises MTH5Error: if filtering in place and the dataset is not
+                           floating point or a run_group is given
+
+        :Example: ::
+
+            >>> from mth5.utils import mtfilter
+            >>> sos = np.vstack([mtfilter.design_notch(60, 256),
+            ...                  mtfilter.design_low_pass(15, 55, 256)])
+            >>> ex_filtered = run.get_channel('Ex').apply_filter(
+            ...     sos, filter_name='notch_60hz_low_pass_15hz')
+            >>> ex_filtered.metadata.filter.name
+            ['notch_60hz_low_pass_15hz']
+            >>> run.get_channel('Ey').apply_filter(sos, inplace=True)
+
+        """
+        from mth5.utils.mtfilter import SOSFilter
+
+        sos_filter = SOSFilter(sos)
+        if not inplace:
+            parent = self.hdf5_dataset.parent
+            if run_group is None:
+                run_group = _get_wrapper(self, parent, RunGroup)
+            if channel_name is None and run_group.hdf5_group == parent:
+                channel_name = '{0}_filtered'.format(
+                    self.hdf5_dataset.name.split('/')[-1])
+            new_metadata = self._copy_metadata()
+            self._add_filter_name(new_metadata, filter_name)
+            return self._stream_to_channel(sos_filter.process, None,
+                                           run_group, channel_name,
+                                           new_metadata, block_size,
+                                           **kwargs)
+
+        if run_group is not None:
+            msg = ("Cannot filter {0} in place and write to run {1}, use "
+                   "inplace=False to write to a new channel").format(
+                       self.hdf5_dataset.name, run_group.hdf5_group.name)
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+        if self.hdf5_dataset.dtype.kind != 'f':
+            msg = ("Cannot filter {0} dataset {1} in place, use "
+                   "inplace=False to write the filtered data to a new "
+                   "channel").format(self.hdf5_dataset.dtype, 
+                                     self.hdf5_dataset.name)
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        for start in range(0, self.n_samples, int(block_size)):
+            stop = min(start + int(block_size), self.n_samples)
+            self.hdf5_dataset[start:stop] = sos_filter.process(
+                self.hdf5_dataset[start:stop])
+        self._add_filter_name(self.metadata, filter_name)
+        self.write_metadata()
+        self.hdf5_dataset.file.flush()
+
+        return self
+
+    @staticmethod
+    def _add_filter_name(channel_metadata, filter_name):
+        """
+        add an applied filter to the filter metadata of a channel
+        """
+        names = list(channel_metadata.filter.name or [])
+        applied = list(getattr(channel_metadata.filter, 'applied', None) or 
+                       [])
+        # a single applied value is for all the filters
+        if len(applied) != len(names):
+            applied = applied[:1] * len(names) if applied else \
+                [False] * len(names)
+        channel_metadata.filter.name = names + [filter_name]
+        channel_metadata.filter.applied = applied + [True]
+
+    def _stream_to_channel(self, process, flush, run_group, channel_name,
+                           channel_metadata, block_size, **kwargs):
+        """
+        Read the channel in blocks, pass each block through `process` and
+        append the output to a new channel of `run_group`.  `flush` returns
+        any samples left after the last block, can be None.
+        """
+        if channel_name is None:
+            channel_name = self.hdf5_dataset.name.split('/')[-1]
+        channel_metadata.time_period.end = channel_metadata.time_period.start
+        kwargs.setdefault('channel_dtype', 
+                          np.result_type(self.hdf5_dataset.dtype, np.float32))
+
+        with run_group.open_channel_writer(channel_name, self.metadata.type,
+                                           channel_metadata=channel_metadata,
+                                           **kwargs) as writer:
+            for start in range(0, self.n_samples, int(block_size)):
+                block = self.hdf5_dataset[start:start + int(block_size)]
+                writer.append(process(block))
+            if flush is not None:
+                writer.append(flush())
+        
+        return writer.channel
+
     
 
 @inherit_doc_string                
@@ -1664,6 +2869,239 @@ class AuxiliaryDataset(ChannelDataset):
         
         super().__init__(group, **kwargs)
         
+class ChannelWriter():
+    """
+    Append blocks of data to a resizable channel dataset.  The end time, 
+    the run summary table entry and the channel catalog entry of the 
+    channel are updated when the writer is flushed, every `flush_interval`
+    samples and on close, when the metadata is written.
+
+    In SWMR mode, see :func:`mth5.mth5.MTH5.start_swmr_write`, the writer
+    is flushed after each block so readers see the new samples.  Attributes 
+    cannot be written safely in SWMR mode, so only the table entries are
+    updated, the end time is in the run summary table and the channel 
+    catalog.  The channel metadata is written when the file is closed with
+    :func:`mth5.mth5.MTH5.close_mth5`.
+
+    Use :meth:`mth5.mth5_groups.RunGroup.open_channel_writer` to create a
+    writer.
+
+    :param channel: channel container with a resizable dataset
+    :type channel: [ :class:`mth5.mth5_groups.ElectricDatset` |
+                     :class:`mth5.mth5_groups.MagneticDatset` |
+                     :class:`mth5.mth5_groups.AuxiliaryDatset` ]
+    :param run_group: run the channel belongs to
+    :type run_group: :class:`mth5.mth5_groups.RunGroup`
+    :param flush_interval: number of samples between flushes, defaults to
+                           None to flush only on close
+    :type flush_interval: integer, optional
+
+    :Example: ::
+
+        >>> writer = run.open_channel_writer('Hx', 'magnetic',
+        ...                                  channel_metadata=hx_metadata)
+        >>> writer.append(numpy.random.rand(4096))
+        >>> writer.append(numpy.random.rand(4096))
+        >>> hx = writer.close()
+        >>> hx.n_samples
+        8192
+
+    """
+
+    logger = ClassLogger()
+
+    def __init__(self, channel, run_group, flush_interval=None):
+        self.channel = channel
+        self.run_group = run_group
+        self.flush_interval = flush_interval
+        self.closed = False
+        
+        self._n_unflushed = 0
+        self._summary_index = None
+        self._catalog = None
+        self._catalog_index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __str__(self):
+        return 'ChannelWriter for {0} ({1} samples)'.format(
+            self.channel.hdf5_dataset.name, self.n_samples)
+
+    def __repr__(self):
+        return self.__str__()
+
+    @property
+    def n_samples(self):
+        return self.channel.n_samples
+
+    def append(self, data):
+        """
+        Append a block of data to the end of the channel.
+
+        :param data: block of data
+        :type data: :class:`numpy.ndarray`
+        :return: number of samples in the channel
+        :rtype: integer
+        :raises MTH5Error: if the writer is closed
+
+        """
+        if self.closed:
+            msg = "Cannot append to a closed ChannelWriter"
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        data = np.asarray(data).ravel()
+        if data.size == 0:
+            return self.n_samples
+
+        dataset = self.channel.hdf5_dataset
+        n_start = dataset.shape[0]
+        dataset.resize((n_start + data.size,))
+        dataset[n_start:] = data
+        self._n_unflushed += data.size
+
+        if dataset.file.swmr_mode or (
+                self.flush_interval and 
+                self._n_unflushed >= self.flush_interval):
+            self.flush()
+
+        return self.n_samples
+
+    def flush(self):
+        """
+        Update the end time, the run summary table entry and the channel
+        catalog entry of the channel, and flush the file.
+
+        :raises MTH5Error: if the writer is closed
+
+        """
+        if self.closed:
+            msg = "Cannot flush a closed ChannelWriter"
+            self.logger.error(msg)
+            raise MTH5Error(msg)
+
+        self._update_end()
+        self._update_summary()
+        if self.channel.hdf5_dataset.file.swmr_mode:
+            self._defer_metadata()
+        self.channel.hdf5_dataset.file.flush()
+        self._n_unflushed = 0
+
+    def close(self):
+        """
+        Write the channel metadata and flush the file.  Closing more than
+        once has no effect.
+
+        :return: channel container
+        :rtype: [ :class:`mth5.mth5_groups.ElectricDatset` |
+                  :class:`mth5.mth5_groups.MagneticDatset` |
+                  :class:`mth5.mth5_groups.AuxiliaryDatset` ]
+
+        """
+        if not self.closed:
+            self._update_end()
+            if self.channel.hdf5_dataset.file.swmr_mode:
+                self._defer_metadata()
+            else:
+                self.channel.write_metadata()
+            self._update_summary()
+            self.channel.hdf5_dataset.file.flush()
+            self._n_unflushed = 0
+            self.closed = True
+
+        return self.channel
+
+    def _update_end(self):
+        """
+        Update `time_period.end` from the start time, sample rate and the
+        number of samples.  Only the end time attribute is written, and not
+        in SWMR mode where it is written when the file is closed.
+        """
+        sample_rate = self.channel.metadata.sample_rate
+        if sample_rate in [None, 0] or self.n_samples == 0:
+            return
+
+        start = MTime(self.channel.metadata.time_period.start)
+        end = start + datetime.timedelta(
+            seconds=(self.n_samples - 1) / sample_rate)
+        self.channel.metadata.time_period.end = end.iso_str
+        if not self.channel.hdf5_dataset.file.swmr_mode:
+            self.channel.hdf5_dataset.attrs['time_period.end'] = \
+                self.channel.metadata.time_period.end
+            if self.channel._written_metadata is not None:
+                self.channel._written_metadata['time_period.end'] = \
+                    self.channel.metadata.time_period.end
+
+    def _defer_metadata(self):
+        """
+        Keep the channel in the cache of the file to write its metadata 
+        once the file is out of SWMR mode, see 
+        :func:`WrapperCache.defer_metadata`.
+        """
+        if self.channel._wrapper_cache is None:
+            self.logger.warning(
+                "Metadata of %s cannot be written in SWMR mode, write it "
+                "with write_metadata once the file is opened again",
+                self.channel.hdf5_dataset.name)
+            return
+        self.channel._wrapper_cache.defer_metadata(self.channel)
+    
+    @staticmethod
+    def write_deferred_metadata(hdf5_file, deferred):
+        """
+        Write metadata from :func:`WrapperCache.pop_deferred_metadata` to
+        the file opened again out of SWMR mode, and update the channel 
+        catalog from it.
+        
+        :param hdf5_file: file open for writing, not in SWMR mode
+        :type hdf5_file: :class:`h5py.File`
+        :param deferred: metadata dictionary of each channel keyed by 
+                         dataset path
+        :type deferred: dictionary
+
+        """
+        catalog = None
+        for path, meta_dict in deferred.items():
+            dataset = hdf5_file[path]
+            write_attributes(dataset, meta_dict)
+            if catalog is None:
+                catalog = ChannelCatalog.from_file(dataset)
+            if catalog is not None:
+                catalog.update_channel(dataset)
+        
+    def _update_summary(self):
+        """
+        Update the entry of the channel in the run summary table and the
+        channel catalog.  The rows are located on the first update and the
+        indexes are kept for the next ones.
+        """
+        table = self.run_group.summary_table
+        if self._summary_index is None:
+            index = table.locate('component', 
+                                 self.channel.metadata.component)
+            if index.size > 0:
+                self._summary_index = int(index[0])
+        self._summary_index = table.add_row(self.channel.table_entry,
+                                            index=self._summary_index)
+        
+        if self._catalog is None:
+            self._catalog = ChannelCatalog.from_file(
+                self.channel.hdf5_dataset, self.channel._wrapper_cache)
+        if self._catalog is not None:
+            # the end time attribute is not written in SWMR mode
+            entry = ChannelCatalog.make_entry(self.channel.hdf5_dataset)
+            entry['end'] = MTime(
+                self.channel.metadata.time_period.end).epoch_ns
+            if self._catalog_index is None:
+                self._catalog_index = self._catalog.update_channel(
+                    self.channel.hdf5_dataset, entry=entry)
+            else:
+                self._catalog.add_row(entry, index=self._catalog_index)
+
 class MTH5Table():
     """
     Use the underlying NumPy basics, there are simple actions in this table, 
@@ -1671,17 +3109,49 @@ class MTH5Table():
     should try using a pandas table.  In this case entries in the table 
     are more difficult to change and datatypes need to be kept track of. 
     
+    Columns are read from the file once and kept in memory, time columns
+    already converted to numpy.datetime64.  The cache is dropped whenever
+    the table is written to through any MTH5Table of the same dataset, if
+    the dataset is changed directly with h5py call 
+    :func:`MTH5Table.clear_cache`.
     
+    For repeated queries an index can be made on a column with 
+    :func:`MTH5Table.create_index`, a hash index for equality tests or a 
+    sorted index for range tests.
+    
+    The dataset is grown geometrically when rows are appended, so its 
+    shape is the capacity of the table.  The number of rows in use is 
+    stored in the dataset attribute `n_rows`, tables without that attribute
+    use every row of the dataset.  :attr:`MTH5Table.values` only has the 
+    rows in use, use :func:`MTH5Table.add_rows` to add many rows with one 
+    write.
+    
+    Removed rows are blanked and their indexes kept in the dataset 
+    attribute `removed_rows` so the indexes of the other rows do not change.
+    Removed rows are never returned by :func:`MTH5Table.locate`, 
+    :func:`MTH5Table.compact` rewrites the table without them.
+    
+    :Example: ::
+        
+        >>> table = run.summary_table
+        >>> table.create_index('component')
+        >>> table.locate('component', 'ex')
+        array([0], dtype=int64)
+        >>> table.create_index('start', kind='sorted')
+        >>> table.locate('start', '2020-01-01T12:00:00', test='ge')
+        array([0, 1, 2, 3, 4], dtype=int64)
     
     """
+
+    logger = ClassLogger()
+    
+    # cache of the file the table is in, set by WrapperCache
+    _wrapper_cache = None
     
     def __init__(self, hdf5_dataset):
-        self.logger = logging.getLogger('{0}.{1}'.format(
-            __name__, self.__class__.__name__))
-        
         self.hdf5_reference = None
         if isinstance(hdf5_dataset, h5py.Dataset):
-            self.array = weakref.ref(hdf5_dataset)()
+            self.hdf5_dataset = weakref.ref(hdf5_dataset)()
             self.hdf5_reference = hdf5_dataset.ref
         else:
             msg = "Input must be a h5py.Dataset not {0}".format(
@@ -1689,6 +3159,18 @@ class MTH5Table():
             self.logger.error(msg)
             raise MTH5TableError(msg)
             
+        # cached columns and indexes, valid for self._generation
+        self._table_generation = _TABLE_GENERATIONS.get(hdf5_dataset.id)
+        if self._table_generation is None:
+            self._table_generation = _TableGeneration()
+            _TABLE_GENERATIONS[hdf5_dataset.id] = self._table_generation
+        self._generation = None
+        self._nrows = None
+        self._removed = None
+        self._columns = {}
+        self._index_kinds = {}
+        self._indexes = {}
+            
     def __str__(self):
         """
         return a string that shows the table in text form
@@ -1697,8 +3179,9 @@ class MTH5Table():
         :rtype: string
 
         """
+        rows = np.flatnonzero(self.valid_rows)
         # if the array is empty
-        if self.array.size == 0:
+        if rows.size == 0:
             length_dict = dict([(key, len(str(key))) 
                                  for key in list(self.dtype.names)])
             lines = [' | '.join(['index']+['{0:^{1}}'.format(name, 
@@ -1707,14 +3190,15 @@ class MTH5Table():
             lines.append('-' * len(lines[0]))
             return '\n'.join(lines)
 
-        length_dict = dict([(key, max([len(str(b)) for b in self.array[key]]))
+        length_dict = dict([(key, max([len(str(b)) 
+                                       for b in self.get_column(key)[rows]]))
                                 for key in list(self.dtype.names)])
         lines = [' | '.join(['index']+['{0:^{1}}'.format(name, 
                                                          length_dict[name]) 
                                        for name in list(self.dtype.names)])]
         lines.append('-' * len(lines[0]))
 
-        for ii, row in enumerate(self.array):
+        for ii, row in zip(rows.tolist(), self.values[rows]):
             line = ['{0:^5}'.format(ii)]
             for element, key in zip(row, list(self.dtype.names)):
                 if isinstance(element, (np.bytes_)):
@@ -1739,9 +3223,9 @@ class MTH5Table():
     
     def __eq__(self, other):
         if isinstance(other, MTH5Table): 
-            return self.array == other.array
+            return self.hdf5_dataset == other.hdf5_dataset
         elif isinstance(other, h5py.Dataset):
-            return self.array == other
+            return self.hdf5_dataset == other
         else:
             msg = "Cannot compare type={0}".format(type(other))
             self.logger.error(msg)
@@ -1751,12 +3235,37 @@ class MTH5Table():
         return not self.__eq__(other) 
 
     def __len__(self):
-        return self.array.shape[0]                    
+        return self.nrows
+            
+    @property
+    def array(self):
+        """
+        HDF5 dataset of the table, the same as `hdf5_dataset`.  The dataset
+        can have more rows than are in use, see :attr:`MTH5Table.nrows`, 
+        use :attr:`MTH5Table.values` to get the rows in use.
+        """
+        return self.hdf5_dataset
+    
+    @property
+    def values(self):
+        """
+        rows of the table in use as a read only numpy.ndarray, read from 
+        the file on first access and cached until the table is written to.
+        """
+        self._check_cache()
+        try:
+            return self._columns[None]
+        except KeyError:
+            pass
+        values = self.hdf5_dataset[0:self.nrows]
+        values.flags.writeable = False
+        self._columns[None] = values
+        return values
             
     @property
     def dtype(self):
         try:
-            return self.array.dtype
+            return self.hdf5_dataset.dtype
         except AttributeError as error:
             msg = '{0}, dataframe is not initiated yet'.format(error)
             self.logger.warning(msg)
@@ -1774,20 +3283,276 @@ class MTH5Table():
     
     @property
     def shape(self):
-        return self.array.shape
+        return tuple([self.nrows] + list(self.hdf5_dataset.shape[1:]))
     
     @property
     def nrows(self):
-        return self.array.shape[0]
+        """ number of rows in use, including removed rows until compacted """
+        self._check_cache()
+        if self._nrows is None:
+            capacity = self.capacity
+            self._nrows = min(int(self.hdf5_dataset.attrs.get('n_rows', 
+                                                              capacity)),
+                              capacity)
+        return self._nrows
+    
+    @property
+    def capacity(self):
+        """ number of rows allocated in the dataset """
+        return self.hdf5_dataset.shape[0]
+    
+    @property
+    def removed_rows(self):
+        """ sorted indexes of removed rows """
+        self._check_cache()
+        if self._removed is None:
+            removed = self.hdf5_dataset.attrs.get('removed_rows', [])
+            self._removed = np.array(removed, dtype=np.int64)
+            self._removed.flags.writeable = False
+        return self._removed
+    
+    @property
+    def valid_rows(self):
+        """ boolean mask of the rows in use that have not been removed """
+        self._check_cache()
+        try:
+            return self._columns[(None, 'valid')]
+        except KeyError:
+            pass
+        valid = np.ones(self.nrows, dtype=bool)
+        valid[self.removed_rows] = False
+        valid.flags.writeable = False
+        self._columns[(None, 'valid')] = valid
+        return valid
+    
+    def _set_removed_rows(self, removed):
+        """
+        write the indexes of removed rows to the dataset attributes
+        """
+        if removed.size == 0:
+            if 'removed_rows' in self.hdf5_dataset.attrs:
+                del self.hdf5_dataset.attrs['removed_rows']
+        else:
+            self.hdf5_dataset.attrs['removed_rows'] = removed.astype(np.int32)
+    
+    def _check_cache(self):
+        """
+        Drop cached columns and indexes if the table has been written to 
+        since they were made.
+        """
+        generation = self._table_generation.value
+        if generation != self._generation:
+            self._nrows = None
+            self._removed = None
+            self._columns.clear()
+            self._indexes.clear()
+            self._generation = generation
+            
+    def _metadata_changed(self):
+        """
+        tables do not have metadata, see :class:`WrapperCache`
+        """
+        return False
+            
+    def _mark_modified(self):
+        """
+        Bump the write generation of the dataset, which invalidates the 
+        cache of every MTH5Table of the dataset.
+        """
+        self._table_generation.value += 1
+            
+    def clear_cache(self):
+        """
+        Drop cached columns and indexes.  Only needed if the dataset was
+        changed directly with h5py, writes through 
+        :func:`MTH5Table.add_row` and :func:`MTH5Table.remove_row` clear the
+        cache themselves.
+        """
+        self._mark_modified()
+        self._check_cache()
+        
+    def refresh(self):
+        """
+        Refresh the dataset and drop cached columns and indexes to see 
+        rows written by a SWMR writer.
+        """
+        self.hdf5_dataset.refresh()
+        self.clear_cache()
+        
+    def _validate_column(self, column):
+        """
+        make sure the column is in the table
+        """
+        if self.dtype.names is None or column not in self.dtype.names:
+            msg = "Could not find column {0} in table, columns are {1}".format(
+                column, self.dtype.names)
+            self.logger.error(msg)
+            raise MTH5TableError(msg)
+            
+    def _get_cached(self, key, column):
+        """
+        get a cached column, key is the column name for the values as stored
+        and (column, 'test') for the values used in comparisons.
+        """
+        self._check_cache()
+        try:
+            return self._columns[key]
+        except KeyError:
+            pass
+        
+        self._validate_column(column)
+        
+        if key == column:
+            values = self._read_column(column)
+        else:
+            values = self._get_cached(column, column)
+            # use numpy datetime for testing against time.
+            if column in TIME_COLUMNS:
+                values = self._to_datetime64(values)
+        values.flags.writeable = False
+        self._columns[key] = values
+        return values
+    
+    def _read_column(self, column):
+        """
+        read the rows in use of a column from the file
+        """
+        return self.hdf5_dataset.fields(column)[0:self.nrows]
+    
+    def get_column(self, column):
+        """
+        Get the values of a column, read from the file on first access
+        and cached until the table is written to.
+        
+        :param column: column name
+        :type column: string
+        :return: column values, read only
+        :rtype: numpy.ndarray
+
+        """
+        return self._get_cached(column, column)
+        
+    def _get_test_array(self, column):
+        """
+        Get column values used for comparisons, time columns are 
+        numpy.datetime64.
+        """
+        return self._get_cached((column, 'test'), column)
+    
+    def create_index(self, column, kind='hash'):
+        """
+        Make an index on a column to speed up repeated calls to 
+        :func:`MTH5Table.locate`.  The index is built on the next query and
+        rebuilt after the table is written to.
+        
+        :param column: column name
+        :type column: string
+        :param kind: type of index
+            * 'hash': dictionary of value to rows, used for 'eq'
+            * 'sorted': sorted values searched by bisection, used for all 
+              tests
+        :type kind: string, defaults to 'hash'
+        
+        .. note:: Time columns can only have sorted indexes.
+
+        """
+        if kind not in ['hash', 'sorted']:
+            msg = "Index kind must be 'hash' or 'sorted' not {0}".format(kind)
+            self.logger.error(msg)
+            raise ValueError(msg)
+        if kind == 'hash' and column in TIME_COLUMNS:
+            msg = "Time column {0} can only have a sorted index".format(column)
+            self.logger.error(msg)
+            raise ValueError(msg)
+        self._validate_column(column)
+            
+        if self._index_kinds.get(column) != kind:
+            self._index_kinds[column] = kind
+            self._indexes.pop(column, None)
+            
+    def drop_index(self, column):
+        """
+        Remove the index of a column
+        
+        :param column: column name
+        :type column: string
+
+        """
+        self._index_kinds.pop(column, None)
+        self._indexes.pop(column, None)
+        
+    @property
+    def indexes(self):
+        """ dictionary of indexed columns and the kind of index """
+        return dict(self._index_kinds)
+        
+    def _get_index(self, column):
+        """
+        get the index of a column, built if needed.  A hash index is a 
+        dictionary of value to row indexes, a sorted index is the row order
+        that sorts the column and the sorted values, without NaN or NaT.
+        """
+        self._check_cache()
+        try:
+            return self._indexes[column]
+        except KeyError:
+            pass
+        
+        test_array = self._get_test_array(column)
+        valid = self.valid_rows
+        if self._index_kinds[column] == 'hash':
+            index = {}
+            rows = np.flatnonzero(valid)
+            for ii, key in zip(rows.tolist(), test_array[rows].tolist()):
+                index.setdefault(key, []).append(ii)
+            index = dict([(key, np.array(rows, dtype=np.int64)) 
+                          for key, rows in index.items()])
+        else:
+            # NaN and NaT are never equal to anything, leave them out
+            rows = np.flatnonzero((test_array == test_array) & valid)
+            order = rows[np.argsort(test_array[rows], kind='stable')]
+            index = (order, test_array[order])
+        self._indexes[column] = index
+        self.logger.debug("Built %s index on column %s with %s rows", 
+                          self._index_kinds[column], column, test_array.size)
+        return index
+    
+    def _locate_sorted(self, column, value, test):
+        """
+        locate rows by bisection of a sorted index
+        """
+        order, values = self._get_index(column)
+        if test == 'eq':
+            bounds = (np.searchsorted(values, value, 'left'),
+                      np.searchsorted(values, value, 'right'))
+        elif test == 'lt':
+            bounds = (0, np.searchsorted(values, value, 'left'))
+        elif test == 'le':
+            bounds = (0, np.searchsorted(values, value, 'right'))
+        elif test == 'gt':
+            bounds = (np.searchsorted(values, value, 'right'), values.size)
+        elif test == 'ge':
+            bounds = (np.searchsorted(values, value, 'left'), values.size)
+        elif test == 'be':
+            bounds = (np.searchsorted(values, value[0], 'left'),
+                      np.searchsorted(values, value[1], 'right'))
+        if bounds[1] <= bounds[0]:
+            return np.array([], dtype=np.int64)
+        return np.sort(order[bounds[0]:bounds[1]])
     
     def locate(self, column, value, test='eq'):
         """
         
         locate index where column is equal to value
-        :param column: DESCRIPTION
-        :type column: TYPE
-        :param value: DESCRIPTION
-        :type value: TYPE
+        
+        If the column has an index made with :func:`MTH5Table.create_index`
+        the index is used, otherwise the cached column is compared to the 
+        value.
+        
+        :param column: column name
+        :type column: string
+        :param value: value to test against
+        :type value: string, number or time stamp
         :type test: type of test to try
             * 'eq': equals
             * 'lt': less than
@@ -1795,24 +3560,36 @@ class MTH5Table():
             * 'gt': greater than
             * 'ge': greater than or equal to.
             * 'be': between or equal to
-            * 'bt': between
             
-        If be or bt input value as a list of 2 values
+        If be input value as a list of 2 values [lower, upper]
             
-        :return: DESCRIPTION
-        :rtype: TYPE
+        :return: row indexes that pass the test, in ascending order, removed
+                 rows are never included
+        :rtype: numpy.ndarray
 
         """
-        if isinstance(value, str):
-            value = np.bytes_(value)
-            
-        # use numpy datetime for testing against time.    
-        if column in ['start', 'end', 'start_date', 'end_date']:
-            test_array = self.array[column].astype(np.datetime64)
-            value = np.datetime64(value)
+        if test not in ['eq', 'lt', 'le', 'gt', 'ge', 'be']:
+            raise ValueError('Test {0} not understood'.format(test))
+        if test == 'be':
+            if not isinstance(value, (list, tuple, np.ndarray)):
+                msg = ("If testing for between value must be an iterable of" +
+                      " length 2.")
+                self.logger.error(msg)
+                raise ValueError(msg)
+            value = [self._test_value(column, v) for v in value]
         else:
-            test_array = self.array[column]
+            value = self._test_value(column, value)
+            
+        kind = self._index_kinds.get(column)
+        if kind == 'hash' and test == 'eq':
+            try:
+                return self._get_index(column)[value].copy()
+            except (KeyError, TypeError):
+                return np.array([], dtype=np.int64)
+        if kind == 'sorted':
+            return self._locate_sorted(column, value, test)
         
+        test_array = self._get_test_array(column)
         if test == 'eq':
             index_values = np.where(test_array == value)[0] 
         elif test == 'lt':
@@ -1824,19 +3601,141 @@ class MTH5Table():
         elif test == 'ge':
             index_values = np.where(test_array >= value)[0]
         elif test == 'be':
-            if not isinstance(value, (list, tuple, np.ndarray)):
-                msg = ("If testing for between value must be an iterable of" +
-                      " length 2.")
-                self.logger.error(msg)
-                raise ValueError(msg)
-                
-            index_values = np.where((test_array > value[0]) & 
-                                    (test_array < value[1]))[0]
-        else:
-            raise ValueError('Test {0} not understood'.format(test))
+            index_values = np.where((test_array >= value[0]) & 
+                                    (test_array <= value[1]))[0]
             
+        if self.removed_rows.size > 0:
+            index_values = index_values[self.valid_rows[index_values]]
         return index_values
+    
+    @staticmethod
+    def _test_value(column, value):
+        """
+        convert a value to the type of the test array of the column
+        """
+        if column in TIME_COLUMNS:
+            if isinstance(value, (bytes, np.bytes_)):
+                value = value.decode()
+            if not isinstance(value, MTime):
+                value = MTime(value)
+            return value.datetime64
+        if isinstance(value, str):
+            value = np.bytes_(value)
+        return value
+    
+    @staticmethod
+    def _to_datetime64(values):
+        """
+        convert a column of ISO time strings to numpy.datetime64[ns], empty
+        or bad entries like removed rows are NaT.
+        
+        Strings are parsed with MTimeArray, numpy cannot cast strings
+        with a time zone.  Integers are nanoseconds since 
+        1970-01-01T00:00:00 UTC.
+        """
+        if values.dtype.kind in ['i', 'u']:
+            return values.astype(np.int64).view('datetime64[ns]')
+        try:
+            return MTimeArray(values.astype(str)).datetime64
+        except (ValueError, MTTimeError):
+            pass
+        
+        times = np.full(values.shape, np.datetime64('NaT', 'ns'))
+        for ii, value in enumerate(values.tolist()):
+            try:
+                times[ii] = MTime(value.decode()).datetime64
+            except (ValueError, MTTimeError):
+                continue
+        return times
             
+    def _check_rows(self, rows):
+        """
+        make sure rows are a numpy.ndarray with the table data type
+        """
+        if not isinstance(rows, np.ndarray):
+            msg = ("Input must be an numpy.ndarray " + 
+                   "not {0}".format(type(rows)))
+            self.logger.error(msg)
+            raise TypeError(msg)
+        if not self.check_dtypes(rows.dtype):
+            msg = '{0}\nInput dtypes:\n{1}\n\nTable dtypes:\n{2}'.format(
+                'Data types are not equal:', rows.dtype, self.dtype)
+            self.logger.error(msg)
+            raise ValueError(msg)
+        
+    def _check_swmr_mode(self):
+        """
+        Attributes cannot be written in SWMR mode, so the number of rows and
+        the removed rows cannot change, only rows in use can be updated.
+        """
+        if self.hdf5_dataset.file.swmr_mode:
+            msg = ("Cannot add or remove rows of {0} in SWMR mode, only rows"
+                   " in the table can be updated").format(
+                       self.hdf5_dataset.name)
+            self.logger.error(msg)
+            raise MTH5TableError(msg)
+        
+    def _reserve(self, n_rows):
+        """
+        Make sure the dataset can hold n_rows, growing the capacity by 
+        doubling so appending one row at a time only resizes the dataset 
+        log(n) times.  Capacity is limited by the maximum shape of the 
+        dataset.
+        """
+        capacity = self.capacity
+        if n_rows <= capacity:
+            return
+        
+        max_rows = self.hdf5_dataset.maxshape[0]
+        if max_rows is not None and n_rows > max_rows:
+            msg = ("Cannot add rows, table would have {0} rows which is more "
+                   "than the maximum of {1}".format(n_rows, max_rows))
+            self.logger.error(msg)
+            raise MTH5TableError(msg)
+        
+        new_capacity = max(n_rows, 2 * capacity, 16)
+        if max_rows is not None:
+            new_capacity = min(new_capacity, max_rows)
+        self.hdf5_dataset.resize(
+            tuple([new_capacity] + list(self.hdf5_dataset.shape[1:])))
+        self.logger.debug('Resized table from %s to %s rows', capacity,
+                          new_capacity)
+        
+    def add_rows(self, rows):
+        """
+        Add many rows to the end of the table with a single write.
+        
+        rows must be of the same data type as the table
+        
+        :param rows: rows for the table
+        :type rows: numpy.ndarray
+        :return: indexes of the rows added
+        :rtype: numpy.ndarray
+        
+        :Example: ::
+            
+            >>> rows = np.zeros(1000, dtype=table.dtype)
+            >>> rows['id'] = ['MT{0:03}'.format(ii) for ii in range(1000)]
+            >>> table.add_rows(rows)
+            array([  0,   1,   2, ..., 997, 998, 999])
+
+        """
+        self._check_rows(rows)
+        rows = np.atleast_1d(rows)
+        start = self.nrows
+        end = start + rows.shape[0]
+        if end == start:
+            return np.array([], dtype=np.int64)
+        
+        self._check_swmr_mode()
+        self._reserve(end)
+        self.hdf5_dataset[start:end] = rows
+        self.hdf5_dataset.attrs.modify('n_rows', end)
+        self._mark_modified()
+        self.logger.debug('Added %s rows at index %s', rows.shape[0], start)
+        
+        return np.arange(start, end)
+        
     def add_row(self, row, index=None):
         """
         Add a row to the table.
@@ -1855,26 +3754,26 @@ class MTH5Table():
         :rtype: integer
 
         """
-        
-        if not isinstance(row, (np.ndarray)):
-            msg = ("Input must be an numpy.ndarray" + 
-                   "not {0}".format(type(row)))
-        if isinstance(row, np.ndarray):
-            if not self.check_dtypes(row.dtype):
-                msg = '{0}\nInput dtypes:\n{1}\n\nTable dtypes:\n{2}'.format(
-                    'Data types are not equal:', row.dtype, self.dtype)
-                self.logger.error(msg)
-                raise ValueError(msg)
-
         if index is None:
-            index = self.nrows
-            new_shape = tuple([self.nrows + 1] + [ii for ii in self.shape[1:]])
-            self.array.resize(new_shape)
+            return int(self.add_rows(row)[0])
+        
+        self._check_rows(row)
+        nrows = self.nrows
+        if not -nrows <= index < nrows:
+            raise IndexError('Index {0} is out of range for table with {1} '
+                             'rows'.format(index, nrows))
+        if index < 0:
+            index += nrows
         
         # add the row
-        self.array[index] = row
-        self.logger.debug('Added row as index {0} with values {1}'.format(
-            index, row))
+        removed = index in self.removed_rows
+        if removed:
+            self._check_swmr_mode()
+        self.hdf5_dataset[index] = row
+        if removed:
+            self._set_removed_rows(self.removed_rows[self.removed_rows != index])
+        self._mark_modified()
+        self.logger.debug('Added row as index %s with values %s', index, row)
         
         return index
         
@@ -1887,24 +3786,661 @@ class MTH5Table():
                   reference instead of index number that is the safest and
                   most robust method.
                   
-        :param index: DESCRIPTION
-        :type index: TYPE
-        :return: DESCRIPTION
-        :rtype: TYPE
+        :param index: index of the row to remove, or an array of indexes as
+                      returned by :func:`MTH5Table.locate`
+        :type index: integer or numpy.ndarray
+        :return: index of the rows removed
+        :rtype: integer or numpy.ndarray
+        
+        The row is set to a null row and its index is added to the removed 
+        rows, so the indexes of the other rows stay the same.  Removed rows 
+        are skipped by :func:`MTH5Table.locate` and can be dropped with 
+        :func:`MTH5Table.compact`.
+
+        """
+        indexes = np.atleast_1d(np.asarray(index, dtype=np.int64))
+        nrows = self.nrows
+        if ((indexes < -nrows) | (indexes >= nrows)).any():
+            msg = 'Could not find index {0} in shape {1}'.format(index, 
+                                                                 self.shape)
+            self.logger.error(msg)
+            raise IndexError(msg)
+        indexes = np.unique(np.where(indexes < 0, indexes + nrows, indexes))
+        if indexes.size == 0:
+            return index
+        self._check_swmr_mode()
+        
+        null_array = np.zeros((indexes.size,), dtype=self.dtype)
+        for name in self.dtype.names:
+            # h5py writes None as a null reference
+            if self.dtype[name].hasobject:
+                null_array[name] = None
+        self.hdf5_dataset[indexes.tolist()] = null_array
+        self._set_removed_rows(np.union1d(self.removed_rows, indexes))
+        self._mark_modified()
+        self.logger.debug('Removed rows %s', indexes)
+        
+        if np.ndim(index) == 0:
+            return int(indexes[0])
+        return indexes
+    
+    def compact(self):
+        """
+        Rewrite the table without removed rows, in one write, and shrink the
+        dataset to the rows left.  Row indexes change, so indexes from 
+        :func:`MTH5Table.locate` need to be found again.
+        
+        .. note:: Like deleting any HDF5 object this does not reduce the 
+                  file size.
         
-        This isn't as easy as just deleteing an element.
-        Need to delete the element from the weakly referenced array and then
-        set the summary table dataset to the new array.  
+        :return: old index of each row of the compacted table
+        :rtype: numpy.ndarray
         
-        So set to a null array for now until a more clever option is found.
+        :Example: ::
+            
+            >>> table.remove_row(1)
+            >>> table.compact()
+            array([0, 2, 3])
+
+        """
+        keep = np.flatnonzero(self.valid_rows)
+        if self.removed_rows.size == 0 and keep.size == self.capacity:
+            return keep
+        
+        n_rows = self.nrows
+        self.replace_rows(self.values[keep])
+        self.logger.debug('Compacted table from %s to %s rows', n_rows, 
+                          keep.size)
+        
+        return keep
+    
+    def replace_rows(self, rows):
+        """
+        Replace every row of the table with rows in one write, the dataset
+        is resized to the number of rows.
+        
+        :param rows: new rows of the table
+        :type rows: numpy.ndarray
+
+        """
+        self._check_rows(rows)
+        self._check_swmr_mode()
+        rows = np.atleast_1d(rows)
+        n_rows = rows.shape[0]
+        max_rows = self.hdf5_dataset.maxshape[0]
+        if max_rows is not None and n_rows > max_rows:
+            msg = ("Cannot replace rows, table would have {0} rows which is "
+                   "more than the maximum of {1}".format(n_rows, max_rows))
+            self.logger.error(msg)
+            raise MTH5TableError(msg)
+        
+        self.hdf5_dataset.resize(
+            tuple([n_rows] + list(self.hdf5_dataset.shape[1:])))
+        if n_rows > 0:
+            self.hdf5_dataset[0:n_rows] = rows
+        self.hdf5_dataset.attrs.modify('n_rows', n_rows)
+        self._set_removed_rows(np.array([], dtype=np.int64))
+        self._mark_modified()
+
+class ChannelCatalog(MTH5Table):
+    """
+    Catalog of every channel in the file, one row per channel, stored in
+    ``/Survey/Stations/Channel_Catalog``.  A row is added or updated when 
+    channel metadata is written and removed when the channel, run or 
+    station is removed, so an inventory of the file is a single read of 
+    the catalog instead of walking every station and run.
+    
+    Start and end are stored as nanoseconds since 1970-01-01T00:00:00 UTC.
+    Station, run, channel and component names can be up to 64 characters, 
+    longer names are not cut short, they raise an MTH5Error.
+    
+    :Example: ::
+        
+        >>> catalog = mth5_obj.channel_catalog
+        >>> catalog.query(component='Hx', sample_rate=4096, 
+        ...               start='2020-07-01', end='2020-08-01')
+          station    run channel component  ...  n_samples
+        0   MT001 MT001a      Hx        Hx  ...   14745600
+    
+    """
+    
+    name = 'Channel_Catalog'
+    path = '/Survey/Stations/Channel_Catalog'
+    catalog_dtype = np.dtype([('station', 'S64'),
+                              ('run', 'S64'),
+                              ('channel', 'S64'),
+                              ('component', 'S64'),
+                              ('measurement_type', 'S12'),
+                              ('sample_rate', np.float64),
+                              ('start', np.int64),
+                              ('end', np.int64),
+                              ('n_samples', np.int64),
+                              ('hdf5_reference', h5py.ref_dtype)])
+    
+    # row of each (station, run, channel), see `_locate_channel`
+    _channel_rows = None
+    _channel_rows_generation = None
+    
+    @classmethod
+    def from_file(cls, hdf5_obj, wrapper_cache=None):
+        """
+        Get the catalog of the file an HDF5 object is in.  Use the cache 
+        of the file so the catalog is read once, and not each time a 
+        channel is added.
+        
+        :param hdf5_obj: any object in the file
+        :type hdf5_obj: [ :class:`h5py.Group` | :class:`h5py.Dataset` ]
+        :param wrapper_cache: cache of the file, defaults to None to make
+                              a new catalog
+        :type wrapper_cache: :class:`mth5.mth5_groups.WrapperCache`, 
+                             optional
+        :return: channel catalog or None if the file does not have one
+        :rtype: :class:`mth5.mth5_groups.ChannelCatalog`
 
         """
-        null_array = np.empty((1,), dtype=self.dtype)
         try:
-            return self.add_row(null_array, index=index)
+            dataset = hdf5_obj.file[cls.path]
+        except KeyError:
+            return None
+        if wrapper_cache is None:
+            return cls(dataset)
+        return wrapper_cache.get(dataset, cls)
+        
+    @staticmethod
+    def split_path(hdf5_path):
+        """
+        Split the path of a station, run or channel into names
+        
+        :param hdf5_path: path of the HDF5 object
+        :type hdf5_path: string
+        :return: names below ``/Survey/Stations``
+        :rtype: list
+        
+        >>> ChannelCatalog.split_path('/Survey/Stations/MT001/MT001a/Ex')
+        ['MT001', 'MT001a', 'Ex']
+
+        """
+        return hdf5_path.strip('/').split('/')[2:]
+    
+    @classmethod
+    def check_names(cls, dtype, names):
+        """
+        Make sure names fit in the string columns of a catalog, names are 
+        never cut short so channels can be found by name.
+        
+        :param dtype: data type of the catalog
+        :type dtype: :class:`numpy.dtype`
+        :param names: names of each column
+        :type names: dictionary of column name to list of names
+        :raises MTH5Error: if a name is longer than its column
+
+        """
+        for column, values in names.items():
+            size = dtype[column].itemsize
+            for value in values:
+                if isinstance(value, str):
+                    value = value.encode()
+                if len(value) <= size:
+                    continue
+                msg = ("{0} name {1} is longer than the {2} characters of "
+                       "the channel catalog").format(column, value.decode(), 
+                                                     size)
+                if dtype != cls.catalog_dtype:
+                    msg += (", rebuild the summaries to make a catalog for "
+                            "longer names")
+                cls.logger.error(msg)
+                raise MTH5Error(msg)
+    
+    @classmethod
+    def make_entry(cls, hdf5_dataset):
+        """
+        Make a catalog entry for a channel from the dataset attributes
+        
+        :param hdf5_dataset: dataset of the channel
+        :type hdf5_dataset: :class:`h5py.Dataset`
+        :return: catalog entry
+        :rtype: numpy.ndarray
+
+        """
+        station, run, channel = cls.split_path(hdf5_dataset.name)
+        attrs = hdf5_dataset.attrs
+        component = get_attribute(attrs, 'component', '')
+        cls.check_names(cls.catalog_dtype, {'station': [station], 
+                                            'run': [run], 
+                                            'channel': [channel],
+                                            'component': [component]})
+        
+        def get_ns(key):
+            try:
+                return MTime(get_attribute(attrs, key)).epoch_ns
+            except (TypeError, ValueError, MTTimeError):
+                return 0
+        
+        return np.array([(station,
+                          run,
+                          channel,
+                          component,
+                          get_attribute(attrs, 'type', ''),
+                          get_attribute(attrs, 'sample_rate', np.nan),
+                          get_ns('time_period.start'),
+                          get_ns('time_period.end'),
+                          hdf5_dataset.size,
+                          hdf5_dataset.ref)],
+                        dtype=cls.catalog_dtype)
+    
+    def _read_column(self, column):
+        """
+        columns come from one read of the whole catalog
+        """
+        return self.values[column]
+    
+    def _isin(self, column, values):
+        """
+        boolean mask of rows where the column is one of the values
+        """
+        values = np.atleast_1d(values)
+        if self.dtype[column].kind == 'S':
+            values = np.array([np.bytes_(v) if isinstance(v, str) else v 
+                               for v in values.tolist()])
+        return np.isin(self.get_column(column), values)
+    
+    def locate_channels(self, station=None, run=None, channel=None):
+        """
+        locate the rows of channels by station, run and channel name
+        
+        :param station: station name, defaults to None for all stations
+        :type station: string, optional
+        :param run: run name, defaults to None for all runs
+        :type run: string, optional
+        :param channel: channel name, defaults to None for all channels
+        :type channel: string, optional
+        :return: row indexes
+        :rtype: numpy.ndarray
+
+        """
+        mask = self.valid_rows
+        for column, value in [('station', station), ('run', run),
+                              ('channel', channel)]:
+            if value is not None:
+                mask = mask & self._isin(column, value)
+        return np.flatnonzero(mask)
+        
+    def update_channel(self, hdf5_dataset, entry=None):
+        """
+        Add or update the entry of a channel
+        
+        :param hdf5_dataset: dataset of the channel
+        :type hdf5_dataset: :class:`h5py.Dataset`
+        :param entry: catalog entry, defaults to None to make it from the
+                      dataset attributes with :func:`make_entry`
+        :type entry: numpy.ndarray, optional
+        :return: row index of the channel, None if the dataset is not a
+                 channel of a run
+        :rtype: integer
+
+        """
+        names = self.split_path(hdf5_dataset.name)
+        if (len(names) != 3 or 
+            not hdf5_dataset.name.startswith('/Survey/Stations/')):
+            return None
+        if entry is None:
+            entry = self.make_entry(hdf5_dataset)
+        if self.dtype != self.catalog_dtype:
+            self.check_names(self.dtype, {
+                'station': [names[0]], 'run': [names[1]], 
+                'channel': [names[2]], 
+                'component': entry['component'].tolist()})
+        key = tuple([name.encode() for name in names])
+        index = self.add_row(entry, index=self._locate_channel(key))
+        # the write was made through this catalog, so the rows are current
+        self._channel_rows[key] = index
+        self._channel_rows_generation = self._table_generation.value
+        return index
+    
+    def _locate_channel(self, key):
+        """
+        Row of a channel from a dictionary of (station, run, channel) to 
+        row, made from the catalog once and kept up to date by 
+        `update_channel`, so adding a channel does not read the catalog
+        again.  The dictionary is made again if the catalog was changed 
+        any other way.
+        """
+        generation = self._table_generation.value
+        if (self._channel_rows is None or 
+                self._channel_rows_generation != generation):
+            rows = np.flatnonzero(self.valid_rows).tolist()
+            columns = [self.get_column(column)[rows].tolist() 
+                       for column in ['station', 'run', 'channel']]
+            self._channel_rows = {}
+            for row, row_key in zip(rows, zip(*columns)):
+                self._channel_rows.setdefault(row_key, row)
+            self._channel_rows_generation = generation
+        return self._channel_rows.get(key)
+    
+    def remove_channels(self, station=None, run=None, channel=None):
+        """
+        Remove the entries of channels, of a run or of a station
+        
+        :param station: station name, defaults to None for all stations
+        :type station: string, optional
+        :param run: run name, defaults to None for all runs
+        :type run: string, optional
+        :param channel: channel name, defaults to None for all channels
+        :type channel: string, optional
+        :return: row indexes removed
+        :rtype: numpy.ndarray
+
+        """
+        return self.remove_row(self.locate_channels(station, run, channel))
+    
+    def query(self, station=None, run=None, channel=None, component=None,
+              measurement_type=None, sample_rate=None, start=None, end=None):
+        """
+        Find channels in the catalog.  Each keyword can be a single value or
+        a list of values, channels that match all the keywords are returned.
+        
+        :param station: station names, defaults to None
+        :type station: string or list, optional
+        :param run: run names, defaults to None
+        :type run: string or list, optional
+        :param channel: channel names, defaults to None
+        :type channel: string or list, optional
+        :param component: components, defaults to None
+        :type component: string or list, optional
+        :param measurement_type: [ electric | magnetic | auxiliary ], 
+                                 defaults to None
+        :type measurement_type: string or list, optional
+        :param sample_rate: sample rates, defaults to None
+        :type sample_rate: float or list, optional
+        :param start: only channels recording at or after this time, 
+                      defaults to None
+        :type start: [ string | :class:`mth5.utils.mttime.MTime` ], optional
+        :param end: only channels recording at or before this time, 
+                    defaults to None
+        :type end: [ string | :class:`mth5.utils.mttime.MTime` ], optional
+        :return: matching channels indexed by catalog row
+        :rtype: :class:`pandas.DataFrame`
+        
+        :Example: ::
             
-        except IndexError as error:
-            msg = 'Could not find index {0} in shape {1}'.format(index, 
-                                                                 self.shape())
-            self.logger.exception(msg)
-            raise IndexError(f'{error}\n{msg}')
+            >>> catalog.query(component='Hx', sample_rate=4096, 
+            ...               start='2020-07-01', end='2020-08-01')
+
+        """
+        mask = self.valid_rows
+        for column, value in [('station', station), ('run', run),
+                              ('channel', channel), ('component', component),
+                              ('measurement_type', measurement_type),
+                              ('sample_rate', sample_rate)]:
+            if value is not None:
+                mask = mask & self._isin(column, value)
+        if start is not None:
+            mask = mask & (self._get_test_array('end') >= 
+                           self._test_value('end', start))
+        if end is not None:
+            mask = mask & (self._get_test_array('start') <= 
+                           self._test_value('start', end))
+            
+        return self.to_dataframe(np.flatnonzero(mask))
+    
+    def to_dataframe(self, index=None):
+        """
+        Catalog as a pandas DataFrame, strings are decoded and times are 
+        UTC time stamps.
+        
+        :param index: rows to include, defaults to None for all channels
+        :type index: numpy.ndarray, optional
+        :return: catalog indexed by row
+        :rtype: :class:`pandas.DataFrame`
+
+        """
+        # pandas is only imported when needed, it is slow to import.
+        import pandas as pd
+        
+        if index is None:
+            index = np.flatnonzero(self.valid_rows)
+        rows = self.values[index]
+        
+        data = {}
+        for column in self.dtype.names:
+            if self.dtype[column].kind == 'S':
+                data[column] = rows[column].astype(str)
+            elif column in TIME_COLUMNS:
+                data[column] = pd.to_datetime(rows[column], utc=True)
+            else:
+                data[column] = rows[column]
+        return pd.DataFrame(data, index=index)
+
+# =============================================================================
+# Containers of HDF5 objects
+# =============================================================================
+def get_wrapper_class(hdf5_obj):
+    """
+    Get the container class for an HDF5 object from its attributes, groups 
+    and channels use 'mth5_type' and tables use 'type'.
+    
+    :param hdf5_obj: HDF5 group or dataset
+    :type hdf5_obj: [ :class:`h5py.Group` | :class:`h5py.Dataset` ]
+    :return: container class or None if the object is not an MTH5 object
+    
+    """
+    mth5_type = get_attribute(hdf5_obj.attrs, 'mth5_type')
+    if mth5_type is not None:
+        mth5_type = str(mth5_type).lower()
+        if isinstance(hdf5_obj, h5py.Dataset):
+            return {'electric': ElectricDataset,
+                    'magnetic': MagneticDataset,
+                    'auxiliary': AuxiliaryDataset}.get(mth5_type,
+                                                       ChannelDataset)
+        return {'survey': SurveyGroup,
+                'reports': ReportsGroup,
+                'standards': StandardsGroup,
+                'filters': FiltersGroup,
+                'masterstation': MasterStationGroup,
+                'station': StationGroup,
+                'run': RunGroup}.get(mth5_type)
+    
+    table_type = get_attribute(hdf5_obj.attrs, 'type')
+    if table_type == 'summary table':
+        return MTH5Table
+    if table_type == 'channel catalog':
+        return ChannelCatalog
+    return None
+    
+class WrapperCache():
+    """
+    Least recently used cache of the containers of the HDF5 groups and 
+    datasets of one open file, kept by :class:`mth5.mth5.MTH5`.  Containers
+    are keyed by the path of the HDF5 object so that getting the same 
+    station, run or channel again returns the same container and its 
+    metadata and summary table are only read once.  Containers made by a 
+    cached container use the same cache.
+    
+    The containers of a group or dataset are removed when it is removed 
+    from the file and every container is removed when the file is closed.
+    A container is made again if its HDF5 object is closed or is not the 
+    object at the path anymore, or if its metadata was changed and not 
+    written, so the metadata of a container from the cache is the metadata 
+    in the file.
+    
+    The cache also keeps the channels written in SWMR mode whose metadata 
+    is written when the file is closed, see 
+    :func:`WrapperCache.defer_metadata`.
+    
+    :param max_size: number of containers to keep, defaults to 1024
+    :type max_size: integer, optional
+    
+    :Example: ::
+        
+        >>> station = mth5_obj.stations_group.get_station('MT001')
+        >>> station is mth5_obj.stations_group.get_station('MT001')
+        True
+    
+    """
+    
+    logger = ClassLogger()
+    
+    def __init__(self, max_size=1024):
+        self.max_size = max_size
+        self._wrappers = OrderedDict()
+        self._deferred = {}
+        
+    def __len__(self):
+        return len(self._wrappers)
+    
+    @staticmethod
+    def _hdf5_object(wrapper):
+        if isinstance(wrapper, BaseGroup):
+            return wrapper.hdf5_group
+        return wrapper.hdf5_dataset
+    
+    @staticmethod
+    def make(hdf5_obj, wrapper_class=None):
+        """
+        Make the container of an HDF5 object without caching it.
+        
+        :param hdf5_obj: HDF5 group or dataset
+        :type hdf5_obj: [ :class:`h5py.Group` | :class:`h5py.Dataset` ]
+        :param wrapper_class: container class, defaults to None to use 
+                              :func:`get_wrapper_class`
+        :type wrapper_class: class, optional
+        :return: container of the HDF5 object, the HDF5 object if it is not
+                 an MTH5 object
+
+        """
+        if wrapper_class is None:
+            wrapper_class = get_wrapper_class(hdf5_obj)
+            if wrapper_class is None:
+                return hdf5_obj
+        return wrapper_class(hdf5_obj)
+        
+    def get(self, hdf5_obj, wrapper_class=None):
+        """
+        Get the container of an HDF5 object, made if it is not cached.
+        
+        :param hdf5_obj: HDF5 group or dataset
+        :type hdf5_obj: [ :class:`h5py.Group` | :class:`h5py.Dataset` ]
+        :param wrapper_class: container class, defaults to None to use 
+                              :func:`get_wrapper_class`
+        :type wrapper_class: class, optional
+        :return: container of the HDF5 object, the HDF5 object if it is not
+                 an MTH5 object
+
+        """
+        key = hdf5_obj.name
+        wrapper = self._wrappers.get(key)
+        if wrapper is not None:
+            cached_obj = self._hdf5_object(wrapper)
+            if ((wrapper_class is None or isinstance(wrapper, wrapper_class))
+                    and cached_obj.id.valid and cached_obj.id == hdf5_obj.id
+                    and not wrapper._metadata_changed()):
+                self._wrappers.move_to_end(key)
+                return wrapper
+            del self._wrappers[key]
+        
+        wrapper = self.make(hdf5_obj, wrapper_class)
+        if wrapper is not hdf5_obj:
+            self.add(wrapper)
+        return wrapper
+    
+    def add(self, wrapper):
+        """
+        Add a container, replaces the cached container of the same HDF5
+        object.  Containers of HDF5 objects without a path are not cached.
+        
+        :param wrapper: group or dataset container
+        
+        """
+        wrapper._wrapper_cache = self
+        key = self._hdf5_object(wrapper).name
+        if key is None:
+            return
+        self._wrappers[key] = wrapper
+        self._wrappers.move_to_end(key)
+        while len(self._wrappers) > self.max_size:
+            self._wrappers.popitem(last=False)
+            
+    def refresh(self):
+        """
+        Refresh the cached containers, see 
+        :func:`mth5.mth5_groups.BaseGroup.refresh`.
+
+        """
+        for wrapper in list(self._wrappers.values()):
+            wrapper.refresh()
+            
+    def remove(self, hdf5_path):
+        """
+        Remove the cached containers of an HDF5 object and of every object
+        below it.
+        
+        :param hdf5_path: path of the HDF5 group or dataset
+        :type hdf5_path: string
+
+        """
+        prefix = hdf5_path.rstrip('/') + '/'
+        for key in [key for key in self._wrappers 
+                    if key == hdf5_path or key.startswith(prefix)]:
+            del self._wrappers[key]
+        self.logger.debug("Removed cached containers of %s", hdf5_path)
+            
+    def clear(self):
+        """
+        Remove every cached container, channels with deferred metadata are
+        kept.
+
+        """
+        self._wrappers.clear()
+        
+    def defer_metadata(self, channel):
+        """
+        Keep a channel written in SWMR mode, where attributes cannot be 
+        written, to write its metadata once the file is out of SWMR mode.
+        
+        :param channel: channel container
+        :type channel: [ :class:`mth5.mth5_groups.ElectricDatset` |
+                         :class:`mth5.mth5_groups.MagneticDatset` |
+                         :class:`mth5.mth5_groups.AuxiliaryDatset` ]
+
+        """
+        self._deferred[channel.hdf5_dataset.name] = channel
+        
+    def pop_deferred_metadata(self):
+        """
+        Get the metadata of the channels from :func:`defer_metadata` and 
+        forget the channels.
+        
+        :return: metadata dictionary of each channel keyed by dataset path
+        :rtype: dictionary
+
+        """
+        deferred = dict([(path, 
+                          channel.metadata.to_dict()[
+                              channel.metadata._class_name.lower()])
+                         for path, channel in self._deferred.items()])
+        self._deferred.clear()
+        return deferred
+
+def _get_wrapper(container, hdf5_obj, wrapper_class=None):
+    """
+    Get the container of an HDF5 object from the cache of `container`, 
+    made without caching if `container` is not cached.
+    """
+    if container._wrapper_cache is None:
+        return WrapperCache.make(hdf5_obj, wrapper_class)
+    return container._wrapper_cache.get(hdf5_obj, wrapper_class)
+
+def _add_wrapper(container, wrapper):
+    """
+    Add a container to the cache of `container` if it is cached.
+    """
+    if container._wrapper_cache is not None:
+        container._wrapper_cache.add(wrapper)
+
+def _remove_wrappers(container, hdf5_path):
+    """
+    Remove the cached containers below a path from the cache of 
+    `container` if it is cached.
+    """
+    if container._wrapper_cache is not None:
+        container._wrapper_cache.remove(hdf5_path)
@@ -0,0 +1,336 @@
+# -*- coding: utf-8 -*-
+"""
+Read many channels of MTH5 files in parallel with worker processes.
+
+h5py objects cannot be pickled and h5py does not read in parallel, so a
+channel is pointed to with a :class:`ChannelLocator`, the file name, the
+path of the channel dataset and the samples to read.  :func:`read_many`
+sends locators to a pool of worker processes that open each file read only
+once and read into a shared memory block, so the data is not pickled back
+to the main process.  The block is copied once into memory of the main
+process before it is released, see :func:`read_many` for the memory used.
+
+    >>> from mth5.parallel import ChannelLocator, read_many
+    >>> locators = [ChannelLocator.from_channel(run.get_channel(comp))
+    ...             for run in runs for comp in ['Ex', 'Ey', 'Hx', 'Hy']]
+    >>> arrays = read_many(locators, max_workers=8)
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import logging
+import os
+
+import h5py
+import numpy as np
+
+from mth5.utils.exceptions import MTH5Error
+
+logger = logging.getLogger(__name__)
+
+# arrays in shared memory start on multiples of this many bytes
+ALIGNMENT = 64
+
+# files opened by a worker process, kept open for the next locators
+_WORKER_FILES = {}
+
+# =============================================================================
+# Channel locator
+# =============================================================================
+class ChannelLocator():
+    """
+    Picklable pointer to the samples of a channel in an MTH5 file.
+
+    :param filename: MTH5 file name
+    :type filename: string or :class:`pathlib.Path`
+    :param path: path of the channel dataset in the file, like
+                 ``/Survey/Stations/MT001/MT001a/Ex``
+    :type path: string
+    :param start: index of the first sample, defaults to None for the first
+    :type start: integer, optional
+    :param stop: index after the last sample, defaults to None for the end
+    :type stop: integer, optional
+
+    :Example: ::
+
+        >>> locator = ChannelLocator('test.mth5',
+        ...                          '/Survey/Stations/MT001/MT001a/Ex',
+        ...                          start=0, stop=4096)
+        >>> locator.read()
+
+    """
+
+    def __init__(self, filename, path, start=None, stop=None):
+        self.filename = str(filename)
+        self.path = path
+        self.start = start
+        self.stop = stop
+
+    def __str__(self):
+        return '{0}:{1}[{2}:{3}]'.format(
+            self.filename, self.path,
+            '' if self.start is None else self.start,
+            '' if self.stop is None else self.stop)
+
+    def __repr__(self):
+        return 'ChannelLocator({0})'.format(self.__str__())
+
+    def __eq__(self, other):
+        if not isinstance(other, ChannelLocator):
+            return False
+        return ((self.filename, self.path, self.start, self.stop) ==
+                (other.filename, other.path, other.start, other.stop))
+
+    def __hash__(self):
+        return hash((self.filename, self.path, self.start, self.stop))
+
+    @classmethod
+    def from_channel(cls, channel, start=None, stop=None):
+        """
+        Make a locator for a channel container.  Use
+        :func:`mth5.mth5.MTH5.from_reference` to get the channel of an HDF5
+        reference.
+
+        :param channel: channel container
+        :type channel: [ :class:`mth5.mth5_groups.ElectricDataset` |
+                         :class:`mth5.mth5_groups.MagneticDataset` |
+                         :class:`mth5.mth5_groups.AuxiliaryDataset` ]
+        :param start: index of the first sample, defaults to None
+        :type start: integer, optional
+        :param stop: index after the last sample, defaults to None
+        :type stop: integer, optional
+        :return: locator of the channel
+        :rtype: :class:`mth5.parallel.ChannelLocator`
+
+        :Example: ::
+
+            >>> ex = run.get_channel('Ex')
+            >>> start = ex.get_index_from_time('2020-01-01T00:00:00')
+            >>> ChannelLocator.from_channel(ex, start, start + 4096)
+
+        """
+        dataset = channel.hdf5_dataset
+        return cls(dataset.file.filename, dataset.name, start=start,
+                   stop=stop)
+
+    @property
+    def selection(self):
+        """ slice of the samples to read """
+        return slice(self.start, self.stop)
+
+    def read(self, hdf5_obj=None):
+        """
+        Read the samples.
+
+        :param hdf5_obj: open file to read from, defaults to None to open
+                         the file read only
+        :type hdf5_obj: :class:`h5py.File`, optional
+        :return: samples
+        :rtype: :class:`numpy.ndarray`
+
+        """
+        if hdf5_obj is None:
+            with h5py.File(self.filename, 'r') as hdf5_obj:
+                return self.read(hdf5_obj)
+        return hdf5_obj[self.path][self.selection]
+
+# =============================================================================
+# Reading
+# =============================================================================
+def _open_file(filename, swmr=False):
+    """
+    Open a file read only, as a SWMR reader if `swmr` is True
+    """
+    if swmr:
+        return h5py.File(filename, 'r', libver='latest', swmr=True)
+    return h5py.File(filename, 'r')
+
+def _open_worker_file(filename, swmr=False):
+    """
+    Open a file read only in a worker process, files stay open for the next
+    locators.
+    """
+    hdf5_obj = _WORKER_FILES.get(filename)
+    if not hdf5_obj:
+        hdf5_obj = _open_file(filename, swmr=swmr)
+        _WORKER_FILES[filename] = hdf5_obj
+    return hdf5_obj
+
+def _read_tasks(shm_name, tasks, swmr=False):
+    """
+    Read locators into a shared memory block, run in a worker process.
+
+    :param shm_name: name of the shared memory block
+    :type shm_name: string
+    :param tasks: (filename, path, selection, offset, shape, dtype) of each
+                  locator
+    :type tasks: list of tuples
+    :return: number of locators read
+    :rtype: integer
+
+    """
+    from multiprocessing import shared_memory
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    out = None
+    try:
+        for filename, path, selection, offset, shape, dtype in tasks:
+            dataset = _open_worker_file(filename, swmr=swmr)[path]
+            if swmr:
+                dataset.refresh()
+            out = np.ndarray(shape, dtype=dtype, buffer=shm.buf,
+                             offset=offset)
+            if out.size > 0:
+                dataset.read_direct(out, source_sel=selection)
+            out = None
+    finally:
+        # the block cannot be closed while an array still uses it
+        out = None
+        shm.close()
+    return len(tasks)
+
+def _layout(locators, swmr=False):
+    """
+    Get the shape and data type of each locator and its offset in the
+    shared memory block.
+
+    :return: tasks and the size of the block in bytes
+    :rtype: tuple (list, integer)
+
+    """
+    tasks = []
+    offset = 0
+    files = {}
+    try:
+        for locator in locators:
+            if not isinstance(locator, ChannelLocator):
+                msg = "Input must be a ChannelLocator not {0}".format(
+                    type(locator))
+                logger.error(msg)
+                raise MTH5Error(msg)
+            try:
+                if locator.filename not in files:
+                    files[locator.filename] = _open_file(locator.filename,
+                                                         swmr=swmr)
+                dataset = files[locator.filename][locator.path]
+            except (OSError, KeyError) as error:
+                msg = "Cannot read {0}: {1}".format(locator, error)
+                logger.error(msg)
+                raise MTH5Error(msg)
+
+            n_samples = len(range(*locator.selection.indices(
+                dataset.shape[0])))
+            shape = (n_samples, ) + dataset.shape[1:]
+            selection = (locator.selection, )
+            tasks.append((locator.filename, locator.path, selection, offset,
+                          shape, dataset.dtype.str))
+            nbytes = int(np.prod(shape)) * dataset.dtype.itemsize
+            offset += -(-nbytes // ALIGNMENT) * ALIGNMENT
+    finally:
+        for hdf5_obj in files.values():
+            hdf5_obj.close()
+    return tasks, offset
+
+def read_many(locators, max_workers=None, swmr=False):
+    """
+    Read many channels with a pool of worker processes.  Each worker opens
+    the files read only and reads into one shared memory block, which is
+    copied to one array in the main process.  Locators are split into a
+    few batches per worker so that small reads are not dominated by the
+    cost of sending tasks.
+
+    The returned arrays are views of that copy, not of the shared memory, 
+    so they stay valid after the block is released.  While copying, the 
+    peak memory is about twice the size of the data read, so split very
+    large reads into several calls.  With `max_workers` 0 the channels are
+    read directly into their arrays.
+
+    Workers are started with the 'spawn' method, so they do not inherit
+    the HDF5 state of this process, and scripts need the usual 
+    ``if __name__ == '__main__':`` guard.  Files should not be open for 
+    writing while they are read, in this or another process, unless they 
+    are written in SWMR mode and `swmr` is True, see 
+    :func:`mth5.mth5.MTH5.start_swmr_write`.
+
+    :param locators: channels to read
+    :type locators: list of :class:`mth5.parallel.ChannelLocator`
+    :param max_workers: number of worker processes, defaults to None for
+                        the number of CPUs. 0 reads in this process.
+    :type max_workers: integer, optional
+    :param swmr: open the files as SWMR readers, defaults to False
+    :type swmr: bool, optional
+    :return: samples of each locator, in the same order
+    :rtype: list of :class:`numpy.ndarray`
+    :raises MTH5Error: if a file or channel cannot be read, errors of the
+                       worker processes are raised as MTH5Error
+
+    :Example: ::
+
+        >>> catalog = mth5_obj.query_channels(sample_rate=256)
+        >>> locators = [ChannelLocator(mth5_obj.filename,
+        ...             '/Survey/Stations/{0}/{1}/{2}'.format(
+        ...             row.station, row.run, row.channel))
+        ...             for row in catalog.itertuples()]
+        >>> arrays = read_many(locators)
+
+    """
+    locators = list(locators)
+    tasks, nbytes = _layout(locators, swmr=swmr)
+    if len(tasks) == 0:
+        return []
+
+    if max_workers == 0 or nbytes == 0:
+        arrays = []
+        files = {}
+        try:
+            for filename, path, selection, offset, shape, dtype in tasks:
+                if filename not in files:
+                    files[filename] = _open_file(filename, swmr=swmr)
+                arrays.append(files[filename][path][selection])
+        finally:
+            for hdf5_obj in files.values():
+                hdf5_obj.close()
+        return arrays
+
+    # only imported when needed, they are slow to import
+    from concurrent.futures import ProcessPoolExecutor
+    import multiprocessing
+    from multiprocessing import shared_memory
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = min(max_workers, len(tasks))
+    n_batches = min(len(tasks), 4 * max_workers)
+    batches = [tasks[ii::n_batches] for ii in range(n_batches)]
+
+    shm = shared_memory.SharedMemory(create=True, size=nbytes)
+    try:
+        with ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context('spawn')) as executor:
+            futures = [executor.submit(_read_tasks, shm.name, batch, swmr)
+                       for batch in batches]
+            for future in futures:
+                try:
+                    future.result()
+                except MTH5Error:
+                    raise
+                except Exception as error:
+                    msg = "Worker could not read channels: {0}: {1}".format(
+                        type(error).__name__, error)
+                    logger.error(msg)
+                    raise MTH5Error(msg) from error
+
+        # copy out of shared memory so it can be released.  Arrays on the
+        # block itself would be left pointing at unmapped memory when it is
+        # closed, so the copy is needed even though it doubles the peak
+        # memory for a moment
+        block = np.frombuffer(shm.buf, dtype=np.uint8, count=nbytes).copy()
+    finally:
+        shm.close()
+        shm.unlink()
+    logger.debug("Read %s locators, %s bytes with %s workers", len(tasks),
+                 nbytes, max_workers)
+
+    return [np.ndarray(shape, dtype=dtype, buffer=block, offset=offset)
+            for filename, path, selection, offset, shape, dtype in tasks]
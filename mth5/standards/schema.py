@@ -17,17 +17,22 @@ Created on Wed Apr 29 11:11:31 2020
 # =============================================================================
 # Imports
 # =============================================================================
+import hashlib
 import logging
+import os
+import pickle
 import sys
 import re
+import tempfile
 
 from pathlib import Path
-from copy import deepcopy
+from functools import lru_cache, wraps
+from types import MappingProxyType
 from collections import OrderedDict
-from collections.abc import MutableMapping
+from collections.abc import Mapping, MutableMapping
 from operator import itemgetter
 
-from mth5.standards import CSV_FN_PATHS
+from mth5.standards import CSV_FN_PATHS, CSV_PATH
 from mth5.utils.exceptions import MTSchemaError
 
 logger = logging.getLogger(__name__)
@@ -41,6 +46,44 @@ ACCEPTED_STYLES = ['name', 'url', 'email', 'number', 'date', 'free form',
 REQUIRED_KEYS = ['attribute', 'type', 'required', 'units', 'style', 
                  'description', 'options', 'alias', 'example']
 
+# binary cache of the standards dictionaries, change the version if the
+# format of the dictionaries changes.
+CACHE_VERSION = 2
+
+def get_cache_dir():
+    """
+    Directory for cached files of the user, ``$XDG_CACHE_HOME/mth5`` or
+    ``~/.cache/mth5``, ``%LOCALAPPDATA%\\mth5`` on Windows and 
+    ``~/Library/Caches/mth5`` on macOS.
+    
+    :return: cache directory, may not exist yet
+    :rtype: pathlib.Path
+
+    """
+    if sys.platform.startswith('win'):
+        base = os.environ.get('LOCALAPPDATA')
+        if base is None:
+            base = Path.home().joinpath('AppData', 'Local')
+    elif sys.platform == 'darwin':
+        base = Path.home().joinpath('Library', 'Caches')
+    else:
+        base = os.environ.get('XDG_CACHE_HOME')
+        if not base:
+            base = Path.home().joinpath('.cache')
+    return Path(base).joinpath('mth5')
+
+def get_cache_fn():
+    """
+    Standards cache file in the user cache directory, one for each install
+    of mth5 named by the csv directory.
+    
+    :return: cache file, may not exist yet
+    :rtype: pathlib.Path
+
+    """
+    return get_cache_dir().joinpath('standards_cache_{0}.pickle'.format(
+        hashlib.sha1(str(CSV_PATH).encode()).hexdigest()[:12]))
+
 # =============================================================================
 # Helper functions
 # =============================================================================
@@ -118,21 +161,21 @@ def validate_attribute(name):
         
     if '/' in name:
         name = name.replace('/', '.')
-        logger.debug("replaced '/' with '.' in {0}".format(original))
+        logger.debug("replaced '/' with '.' in %s", original)
         
     if re.search('[A-Z].*?', name):
-        logger.debug('found capital letters in attribute {0}'.format(original))
-        logger.debug('spliting {0} by capital letters'.format(original))
+        logger.debug('found capital letters in attribute %s', original)
+        logger.debug('spliting %s by capital letters', original)
         name = '_'.join(re.findall('.[^A-Z]*', name))
         name = name.replace('._', '.')
         name = name.lower()
-        logger.debug('converting {0} to lower case'.format(original))
+        logger.debug('converting %s to lower case', original)
 
 
         
     if original != name:
-        msg = 'input name {0} converted to {1} following MTH5 standards'
-        logger.debug(msg.format(original, name))
+        logger.debug('input name %s converted to %s following MTH5 standards',
+                     original, name)
         
     return name
         
@@ -434,7 +477,8 @@ def get_level_fn(level):
 
 def from_csv(csv_fn):
     """
-    Read in CSV file as a dictionary
+    Read in CSV file as a dictionary.  Each file is only read and validated
+    once, after that a copy of the validated dictionary is returned.
 
     :param csv_fn: csv file to read metadata standards from
     :type csv_fn: pathlib.Path or string
@@ -450,6 +494,19 @@ def from_csv(csv_fn):
     if not isinstance(csv_fn, Path):
         csv_fn = Path(csv_fn)
 
+    return _read_csv(str(csv_fn.resolve())).copy()
+
+@lru_cache(maxsize=None)
+def _read_csv(csv_fn):
+    """
+    Read and validate a CSV file, cached so each file is parsed once.
+
+    :param csv_fn: full path to csv file
+    :type csv_fn: string
+    :return: read only dictionary of the contents of the file
+    :rtype: :class:`mth5.standards.schema.ReadOnlyBaseDict`
+
+    """
     with open(csv_fn, 'r') as fid:
         logger.debug('reading {0}'.format(csv_fn))
         lines = fid.readlines()
@@ -467,7 +524,7 @@ def from_csv(csv_fn):
 
         attribute_dict[key_name] = validate_value_dict(line_dict)
 
-    return BaseDict(**attribute_dict)
+    return ReadOnlyBaseDict(attribute_dict)
 
 def to_csv(level_dict, csv_fn):
     """
@@ -540,7 +597,8 @@ def to_latex(level_dict, level, max_entries=7, first_table_len=7):
     
     lines = []
     for name, v_dict in level_dict.items():
-        if not v_dict['options'] in [None, 'none', 'None', []]:
+        v_dict = dict(v_dict)
+        if not v_dict['options'] in [None, 'none', 'None', [], ()]:
             v_dict['description'] += '.  Options: {0}'.format(
                 v_dict['options'])
         line = [r'\entry{{{0}}}'.format(name) +
@@ -598,6 +656,8 @@ class BaseDict(MutableMapping):
         self.update(dict(*args, **kwargs))
         
     def __setitem__(self, key, value):
+        if not isinstance(value, dict) and isinstance(value, Mapping):
+            value = dict(value)
         self.__dict__[key] = validate_value_dict(value)
         
     def __getitem__(self, key):
@@ -653,7 +713,7 @@ class BaseDict(MutableMapping):
         :Example: :: 
             
             >>> s_obj = Standards()
-            >>> run_dict = s_obj.run_dict
+            >>> run_dict = s_obj.run_dict.copy()
             >>> run_dict.add_dict(s_obj.declination_dict, 'declination')
             
         """
@@ -663,6 +723,16 @@ class BaseDict(MutableMapping):
             logger.error(msg)
             raise TypeError(msg)
             
+        # already validated, so only copy the attribute dictionaries
+        if isinstance(add_dict, BaseDict):
+            for key, value in add_dict.__dict__.items():
+                if keys and key not in keys:
+                    continue
+                if name:
+                    key = '{0}.{1}'.format(name, key)
+                self.__dict__[key] = _copy_value_dict(value)
+            return
+            
         if keys:
             small_dict = {}
             for key, value in add_dict.items():
@@ -677,8 +747,200 @@ class BaseDict(MutableMapping):
         self.update(**add_dict)
             
     def copy(self):
-        return deepcopy(self)
+        """
+        Copy of the dictionary, the attribute dictionaries are already
+        validated so they are copied without validating again.
+        
+        :return: copy of the dictionary that can be changed
+        :rtype: :class:`mth5.standards.schema.BaseDict`
+
+        """
+        new_dict = BaseDict()
+        for key, value in self.__dict__.items():
+            new_dict.__dict__[key] = _copy_value_dict(value)
+        return new_dict
+    
+
+class ReadOnlyBaseDict(BaseDict):
+    """
+    A BaseDict that cannot be changed.  These are made once for each level
+    of the standards and shared, so use `copy` to get a dictionary that can
+    be changed.  The options and alias lists are stored as tuples so they 
+    cannot be changed either.
     
+    :param base_dict: validated dictionary of attribute dictionaries
+    :type base_dict: dictionary or :class:`mth5.standards.schema.BaseDict`
+    
+    """
+    
+    def __init__(self, base_dict=None):
+        if base_dict is not None:
+            if isinstance(base_dict, BaseDict):
+                base_dict = base_dict.__dict__
+            for key, value in base_dict.items():
+                self.__dict__[key] = _freeze_value_dict(value)
+        
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        return MappingProxyType(value)
+    
+    def __setitem__(self, key, value):
+        msg = 'Standards dictionary is read only, use copy() to change it.'
+        logger.error(msg)
+        raise MTSchemaError(msg)
+        
+    def __delitem__(self, key):
+        msg = 'Standards dictionary is read only, use copy() to change it.'
+        logger.error(msg)
+        raise MTSchemaError(msg)
+        
+    def add_dict(self, add_dict, name=None, keys=None):
+        msg = 'Standards dictionary is read only, use copy() to change it.'
+        logger.error(msg)
+        raise MTSchemaError(msg)
+        
+def _copy_value_dict(value_dict):
+    """
+    copy an attribute dictionary including the options and alias lists
+    """
+    return dict([(key, list(value) if isinstance(value, (list, tuple)) 
+                  else value) for key, value in value_dict.items()])
+
+def _freeze_value_dict(value_dict):
+    """
+    copy an attribute dictionary with the options and alias lists as tuples
+    """
+    return dict([(key, tuple(value) if isinstance(value, list) else value)
+                 for key, value in value_dict.items()])
+
+def _standards_property(func):
+    """
+    Make a standards level property that is only built once for all
+    `Standards` objects and returned as a read only dictionary.
+    """
+    name = func.__name__
+    
+    @wraps(func)
+    def wrapper(self):
+        try:
+            return _STANDARDS_REGISTRY[name]
+        except KeyError:
+            level_dict = func(self)
+            if not isinstance(level_dict, ReadOnlyBaseDict):
+                level_dict = ReadOnlyBaseDict(level_dict)
+            _STANDARDS_REGISTRY[name] = level_dict
+            return level_dict
+    
+    return property(wrapper)
+
+# standards level dictionaries that have been built, by property name
+_STANDARDS_REGISTRY = {}
+
+def get_csv_key(csv_fn_list=CSV_FN_PATHS):
+    """
+    Name, modification time and size of each of the standards csv files, 
+    used to check if the standards cache is up to date without reading the
+    files.
+    
+    :param csv_fn_list: csv files, defaults to CSV_FN_PATHS
+    :type csv_fn_list: list of pathlib.Path, optional
+    :return: (name, modification time in ns, size) of each file, None for 
+             the time and size of files that do not exist
+    :rtype: tuple
+
+    """
+    key = []
+    for csv_fn in csv_fn_list:
+        try:
+            stat = csv_fn.stat()
+            key.append((csv_fn.name, stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            key.append((csv_fn.name, None, None))
+    return tuple(key)
+
+def load_standards_cache(cache_fn=None):
+    """
+    Load the standards dictionaries from the binary cache if it was made 
+    from the current csv files.
+    
+    :param cache_fn: cache file, defaults to None which uses `get_cache_fn`
+    :type cache_fn: pathlib.Path, optional
+    :return: True if the cache was loaded
+    :rtype: bool
+
+    """
+    try:
+        if cache_fn is None:
+            cache_fn = get_cache_fn()
+        with open(cache_fn, 'rb') as fid:
+            cache = pickle.load(fid)
+    except (OSError, RuntimeError, KeyError, EOFError,
+            pickle.UnpicklingError, AttributeError, ImportError) as error:
+        logger.debug('Could not load standards cache {0}: {1}'.format(
+            cache_fn, error))
+        return False
+    
+    if (not isinstance(cache, dict) or 
+            cache.get('version') != CACHE_VERSION or 
+            cache.get('key') != get_csv_key()):
+        logger.debug('Standards cache {0} is out of date'.format(cache_fn))
+        return False
+    
+    for name, level_dict in cache['levels'].items():
+        _STANDARDS_REGISTRY[name] = ReadOnlyBaseDict(level_dict)
+    logger.debug('Loaded standards cache {0}'.format(cache_fn))
+    return True
+
+def save_standards_cache(cache_fn=None):
+    """
+    Build all the standards dictionaries and save them to the binary cache.
+    The cache is only an optimization, if it cannot be written, for 
+    instance a read only home directory, the error is logged and nothing is
+    written.
+    
+    :param cache_fn: cache file, defaults to None which uses `get_cache_fn`
+    :type cache_fn: pathlib.Path, optional
+    :return: True if the cache was written
+    :rtype: bool
+
+    """
+    standards = Standards()
+    levels = {}
+    for name in Standards.level_names():
+        levels[name] = dict(getattr(standards, name).__dict__)
+    cache = {'version': CACHE_VERSION, 'key': get_csv_key(), 
+             'levels': levels}
+    
+    temp_fn = None
+    try:
+        if cache_fn is None:
+            cache_fn = get_cache_fn()
+        cache_fn = Path(cache_fn)
+        cache_fn.parent.mkdir(parents=True, exist_ok=True)
+        # write to a temporary file first so other processes never read a
+        # partial cache
+        fid, temp_fn = tempfile.mkstemp(dir=cache_fn.parent, 
+                                        suffix='.tmp')
+        with os.fdopen(fid, 'wb') as temp_fid:
+            pickle.dump(cache, temp_fid, protocol=pickle.HIGHEST_PROTOCOL)
+        os.chmod(temp_fn, 0o644)
+        os.replace(temp_fn, cache_fn)
+        temp_fn = None
+    except Exception as error:
+        logger.debug('Could not write standards cache {0}: {1}'.format(
+            cache_fn, error))
+        return False
+    finally:
+        # the temporary file is left if writing failed
+        if temp_fn is not None:
+            try:
+                os.remove(temp_fn)
+            except OSError:
+                pass
+    
+    logger.debug('Wrote standards cache {0}'.format(cache_fn))
+    return True
+
     
 class Standards():
     """
@@ -687,6 +949,13 @@ class Standards():
 
     The thought is that only the csv files need to be changed if there is
     a change in standards.
+    
+    Each csv file is read once and each level dictionary is built once, 
+    these are shared by all Standards objects and are read only.  Use 
+    `copy()` to get a dictionary that can be changed.
+    
+    >>> s = Standards()
+    >>> run_dict = s.run_dict.copy()
 
     """
 
@@ -697,79 +966,87 @@ class Standards():
 
         self.logger = logger
         self.logger.debug('Initiating Standards')
+        
+    @classmethod
+    def level_names(cls):
+        """
+        names of the standards level dictionary properties
+        """
+        return sorted([name for name in dir(cls) if name.endswith('_dict') 
+                       and isinstance(getattr(cls, name), property)])
 
-    @property
+    @_standards_property
     def declination_dict(self):
         return from_csv(get_level_fn('declination'))
 
-    @property
+    @_standards_property
     def instrument_dict(self):
         return from_csv(get_level_fn('instrument'))
 
-    @property
+    @_standards_property
     def rating_dict(self):
         return from_csv(get_level_fn('rating'))
 
-    @property
+    @_standards_property
     def data_quality_dict(self):
         dq_dict = from_csv(get_level_fn('data_quality'))
         dq_dict.add_dict(self.rating_dict.copy(), 'rating')
         return dq_dict
 
-    @property
+    @_standards_property
     def citation_dict(self):
         return from_csv(get_level_fn('citation'))
 
-    @property
+    @_standards_property
     def copyright_dict(self):
         return from_csv(get_level_fn('copyright'))
 
-    @property
+    @_standards_property
     def person_dict(self):
         return from_csv(get_level_fn('person'))
 
-    @property
+    @_standards_property
     def software_dict(self):
         return from_csv(get_level_fn('software'))
 
-    @property
+    @_standards_property
     def diagnostic_dict(self):
         return from_csv(get_level_fn('diagnostic'))
 
-    @property
+    @_standards_property
     def battery_dict(self):
         return from_csv(get_level_fn('battery'))
     
-    @property
+    @_standards_property
     def orientation_dict(self):
         return from_csv(get_level_fn('orientation'))
 
-    @property
+    @_standards_property
     def timing_system_dict(self):
         return from_csv(get_level_fn('timing_system'))
     
-    @property
+    @_standards_property
     def time_period_dict(self):
         return from_csv(get_level_fn('time_period'))
 
-    @property
+    @_standards_property
     def filtered_dict(self):
         """This one is for the channel metadata to define applied or not"""
         return from_csv(get_level_fn('filtered'))
     
-    @property
+    @_standards_property
     def filter_dict(self):
         """This one is for the actual filter metadata"""
         return from_csv(get_level_fn('filter'))
 
-    @property
+    @_standards_property
     def location_dict(self):
         location_dict = from_csv(get_level_fn('location'))
         location_dict.add_dict(self.declination_dict.copy(), 'declination')
         
         return location_dict
 
-    @property
+    @_standards_property
     def provenance_dict(self):
         provenance_dict = from_csv(get_level_fn('provenance'))
         provenance_dict.add_dict(self.software_dict.copy(), 'software')
@@ -777,7 +1054,7 @@ class Standards():
         return provenance_dict
 
 
-    @property
+    @_standards_property
     def datalogger_dict(self):
         dl_dict = self.instrument_dict.copy()
         dl_dict.add_dict(self.timing_system_dict.copy(),'timing_system')
@@ -785,7 +1062,7 @@ class Standards():
         dl_dict.add_dict(self.battery_dict.copy(), 'power_source')
         return dl_dict
 
-    @property
+    @_standards_property
     def electrode_dict(self):
         elec_dict = from_csv(get_level_fn('instrument'))
         for key, v_dict in self.location_dict.items():
@@ -793,7 +1070,7 @@ class Standards():
                 elec_dict.update({key: v_dict})
         return elec_dict
 
-    @property
+    @_standards_property
     def survey_dict(self):
         survey_dict = from_csv(get_level_fn('survey'))
         survey_dict.add_dict(self.person_dict.copy(), 'acquired_by', 
@@ -809,7 +1086,7 @@ class Standards():
         survey_dict.add_dict(self.copyright_dict.copy(), None)
         return survey_dict
 
-    @property
+    @_standards_property
     def station_dict(self):
         station_dict = from_csv(get_level_fn('station'))
         station_dict.add_dict(self.location_dict.copy(), 'location')
@@ -824,7 +1101,7 @@ class Standards():
         station_dict.add_dict(self.time_period_dict.copy(), 'time_period')
         return station_dict
 
-    @property
+    @_standards_property
     def run_dict(self):
         run_dict = from_csv(get_level_fn('run'))
         run_dict.add_dict(self.datalogger_dict.copy(), 'data_logger')
@@ -838,7 +1115,7 @@ class Standards():
         return run_dict
         
 
-    @property
+    @_standards_property
     def channel_dict(self):
         channel_dict = from_csv(get_level_fn('channel'))
         channel_dict.add_dict(self.data_quality_dict.copy(), 'data_quality')
@@ -850,11 +1127,11 @@ class Standards():
                 channel_dict.update({'{0}.{1}'.format('location', key): v_dict})
         return channel_dict
 
-    @property
+    @_standards_property
     def auxiliary_dict(self):
         return self.channel_dict
 
-    @property
+    @_standards_property
     def electric_dict(self):
         electric_dict = from_csv(get_level_fn('electric'))
         electric_dict.add_dict(from_csv(get_level_fn('channel')))
@@ -865,7 +1142,7 @@ class Standards():
         electric_dict.add_dict(self.time_period_dict.copy(), 'time_period')
         return electric_dict
 
-    @property
+    @_standards_property
     def magnetic_dict(self):
         magnetic_dict = from_csv(get_level_fn('magnetic'))
         magnetic_dict.add_dict(self.channel_dict.copy())
@@ -873,10 +1150,14 @@ class Standards():
     
     @property
     def ATTR_DICT(self):
+        # the standards cache is read or written on first use, never when
+        # mth5 is imported
+        if not _STANDARDS_REGISTRY:
+            if not load_standards_cache():
+                save_standards_cache()
         keys = [fn.stem for fn in CSV_FN_PATHS]
-        return dict([(key, deepcopy(getattr(self, '{0}_dict'.format(key))))
+        return dict([(key, getattr(self, '{0}_dict'.format(key)).copy())
                   for key in keys])
-        self.logger.debug("Successfully made ATTR_DICT")
         
     def summarize_standards(self, levels=['survey', 'station', 'run', 
                                           'auxiliary', 'electric',
@@ -9,15 +9,21 @@
 #==============================================================================
 # Imports
 #==============================================================================
+import sys
 import numpy as np
-import pandas as pd
 import xarray as xr
-import logging
 
 from mth5 import metadata
-from mth5.utils.mttime import MTime
+from mth5.utils.mttime import MTime, MTimeArray, NS_PER_SECOND
+from mth5.utils.mth5logger import ClassLogger
 
 #==============================================================================
+def _is_data_frame(value):
+    """
+    Check if value is a pandas.DataFrame without importing pandas
+    """
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(value, pd.DataFrame)
 
 #==============================================================================
 class MTTS(object):
@@ -41,9 +47,19 @@ class MTTS(object):
 
         >>> MTTS.ts.data[0:256]
 
-    Also, the data can be indexed by time (note needs to be exact time):
+    The time axis is regular and implicit, only the start time and sample
+    rate are stored and the time of each sample is computed when needed, 
+    see `time_index` and `get_slice`:
+
+        >>> MTTS.get_slice('2017-05-04 12:32:00.0078125', 
+        ...                '2017-05-05 12:35:00')
 
-        >>> MTTS.ts['2017-05-04 12:32:00.0078125':'2017-05-05 12:35:00]
+    To index by time with xarray, store the time coordinate first, this
+    costs 8 bytes per sample:
+
+        >>> MTTS.materialize_time()
+        >>> MTTS.ts.sel(time=slice('2017-05-04 12:32:00.0078125',
+        ...                        '2017-05-05 12:35:00'))
 
     Input ts as a numpy.ndarray or Pandas DataFrame
 
@@ -97,10 +113,10 @@ class MTTS(object):
 
     """
 
+    logger = ClassLogger()
+
     def __init__(self, channel_type, data=None, channel_metadata=None,
                  **kwargs):
-        self.logger = logging.getLogger('{0}.{1}'.format(__name__, 
-                                                         self._class_name))
         if channel_type in ['electric']:
             self.metadata = metadata.Electric()
         elif channel_type in ['magnetic']:
@@ -121,6 +137,11 @@ class MTTS(object):
                 raise MTTSError(msg)
             self.metadata = channel_metadata
             
+        # regular time axis, the time of each sample is computed from these
+        # when needed instead of being stored, see `time_index`
+        self._start_ns = None
+        self._sample_rate = None
+        
         self._ts = xr.DataArray([1], coords=[('time', [1])])
         self.update_xarray_metadata()
         if data is not None:
@@ -144,6 +165,13 @@ class MTTS(object):
     
     @property
     def ts(self):
+        """
+        time series as an xarray.DataArray with dimension 'time'.  
+        
+        The time coordinate is not stored unless `materialize_time` has been
+        called or an xarray.DataArray with a time coordinate was input.  Use
+        `time_index` to get the time of each sample.
+        """
         return self._ts
 
     @ts.setter
@@ -153,37 +181,94 @@ class MTTS(object):
         column name 'data'
         """
         if isinstance(ts_arr, np.ndarray):
-            dt = self._make_dt_coordinates(self.start, 
-                                           self.sample_rate,
-                                           ts_arr.size)
-            self._ts = xr.DataArray(ts_arr, coords=[('time', dt)])
+            self._set_regular_axis(self.start, self.sample_rate)
+            self._ts = xr.DataArray(ts_arr, dims=['time'])
             self.update_xarray_metadata()
 
-        elif isinstance(ts_arr, pd.core.frame.DataFrame):
+        elif _is_data_frame(ts_arr):
             try:
-                dt = self._make_dt_index(self.start_time_utc, 
-                                         self.sample_rate,
-                                         ts_arr['data'].size)
-                self._ts = xr.DataArray(ts_arr['data'],
-                                        coords=[('time', dt)])
-
-            except AttributeError:
+                data = ts_arr['data'].to_numpy()
+            except KeyError:
                 msg = ("Data frame needs to have a column named `data` " +\
                        "where the time series data is stored")
                 self.logger.error(msg)
                 raise MTTSError(msg)
+            self._set_regular_axis(self.start, self.sample_rate)
+            self._ts = xr.DataArray(data, dims=['time'])
+            self.update_xarray_metadata()
                 
         elif isinstance(ts_arr, xr.DataArray):
             # TODO: need to validate the input xarray
             self._ts = ts_arr
             meta_dict = dict([(k, v) for k, v in ts_arr.attrs.items()])
             self.metadata.from_dict({self.metadata.type: meta_dict})
+            if self._has_time_coordinate():
+                times = ts_arr.time.values.astype('datetime64[ns]').astype(
+                    np.int64)
+                self._start_ns = int(times[0])
+                if times.size > 1:
+                    self._sample_rate = np.round(
+                        NS_PER_SECOND / float(times[1] - times[0]), 6)
+                else:
+                    self._sample_rate = self.metadata.sample_rate
+            else:
+                self._set_regular_axis(self.metadata.time_period.start,
+                                       self.metadata.sample_rate)
             
         else:
             msg = ("Data type {0} not supported".format(type(ts_arr)) +\
                    ", ts needs to be a numpy.ndarray, pandas DataFrame, " +\
                    "or xarray.DataArray.")
-            raise MTTSError()
+            self.logger.error(msg)
+            raise MTTSError(msg)
+            
+    def _set_regular_axis(self, start, sample_rate):
+        """
+        set the start time and sample rate of the regular time axis
+        """
+        if start is None:
+            start = '1980-01-01T00:00:00'
+        if not isinstance(start, MTime):
+            start = MTime(start)
+        if sample_rate in [0, None]:
+            msg = (f"Need to input a valid sample rate. Not {sample_rate}, " +
+                   "assuming a sample rate of 1")
+            self.logger.warning(msg)
+            sample_rate = 1.0
+        self._start_ns = start.epoch_ns
+        self._sample_rate = sample_rate
+        
+    def _has_time_coordinate(self):
+        """
+        check if the time coordinate is stored in the xarray
+        """
+        return 'time' in self._ts.coords and self._check_for_index()
+        
+    @property
+    def time_index(self):
+        """
+        time of each sample as numpy.datetime64[ns], computed from the start
+        time and sample rate unless the time coordinate is stored
+        """
+        if self._has_time_coordinate():
+            return self._ts.time.values
+        return self._make_dt_coordinates(self.start, self.sample_rate, 
+                                         self.n_samples)
+    
+    def materialize_time(self):
+        """
+        Store the time coordinate in the xarray so that it can be indexed 
+        by time, e.g. MTTS.ts.sel(time=slice(start, end)).  
+        
+        Costs 8 bytes per sample.
+        
+        :return: time series with time coordinate
+        :rtype: xarray.DataArray
+        
+        """
+        if not self._has_time_coordinate() and self._check_for_index():
+            self._ts = self._ts.assign_coords(time=self.time_index)
+        return self._ts
         
     def update_xarray_metadata(self):
         """
@@ -224,15 +309,15 @@ class MTTS(object):
     @property
     def sample_rate(self):
         """sample rate in samples/second"""
-        if self._check_for_index():
-            sr = 1E9/self._ts.coords.indexes['time'][0].freq.nanos
+        if self._check_for_index() and self._sample_rate:
+            sr = self._sample_rate
         else:
             self.logger.info("Data has not been set yet, " +
                              " sample rate is from metadata")
             sr = self.metadata.sample_rate
             if sr is None:
                 sr = 0.0
-        return np.round(sr, 0)
+        return sr
 
     @sample_rate.setter
     def sample_rate(self, sample_rate):
@@ -251,8 +336,10 @@ class MTTS(object):
     @property
     def start(self):
         """MTime object"""
-        if self._check_for_index():
-            return MTime(self._ts.coords.indexes['time'][0].isoformat())
+        if self._check_for_index() and self._start_ns is not None:
+            start = MTime()
+            start.epoch_ns = self._start_ns
+            return start
         else:
             self.logger.info("Data not set yet, pulling start time from " +
                              "metadata.time_period.start")
@@ -276,13 +363,15 @@ class MTTS(object):
 
         self.metadata.time_period.start = start_time.iso_str
         if self._check_for_index():
-            if start_time == MTime(self.ts.coords.indexes['time'][0].isoformat()):
+            if start_time.epoch_ns == self._start_ns:
                 return
-            else:
-                new_dt = self._make_dt_coordinates(start_time,
+            self._start_ns = start_time.epoch_ns
+            if self._has_time_coordinate():
+                self._ts = self._ts.assign_coords(
+                    time=self._make_dt_coordinates(start_time,
                                                    self.sample_rate,
-                                                   self.n_samples)
-                self.ts.coords['time'] = new_dt
+                                                   self.n_samples))
+            self.metadata.time_period.end = self.end_time_utc
 
         # make a time series that the data can be indexed by
         else:
@@ -311,8 +400,13 @@ class MTTS(object):
     @property
     def end(self):
         """MTime object"""
-        if self._check_for_index():
-            return MTime(self._ts.coords.indexes['time'][-1].isoformat())
+        if self._has_time_coordinate():
+            return MTime(self._ts.time.values[-1])
+        elif self._check_for_index() and self._start_ns is not None:
+            end = MTime()
+            end.epoch_ns = self._start_ns + int(round(
+                (self.n_samples - 1) * NS_PER_SECOND / self.sample_rate))
+            return end
         else:
             self.logger.info("Data not set yet, pulling end time from " +
                              "metadata.time_period.end")
@@ -331,24 +425,7 @@ class MTTS(object):
         the new start time.
         """
         self.logger.warning("Cannot set `end`. If you want a slice, then " +
-                            "use MTTS.ts.sel['time'=slice(start, end)]")
-
-        # if not isinstance(end_time, MTime):
-        #     end_time = MTime(end_time)
-
-        # self.metadata.time_period.end = end_time.iso_str
-        # if self._check_for_index():
-        #     if start_time == MTime(self.ts.coords.indexes['time'][0].isoformat()):
-        #         return
-        #     else:
-        #         new_dt = self._make_dt_coordinates(start_time,
-        #                                            self.sample_rate,
-        #                                            self.n_samples)
-        #         self.ts.coords['time'] = new_dt
-
-        # # make a time series that the data can be indexed by
-        # else:
-        #     self.logger.warning("No data, just updating metadata start")
+                            "use MTTS.get_slice(start, end)")
 
     @property
     def end_time_epoch_sec(self):
@@ -381,6 +458,8 @@ class MTTS(object):
 
         :param start_time: start time in time format
         :type start_time: string
+        :return: time of each sample
+        :rtype: numpy.ndarray of datetime64[ns]
         """
         if len(self.ts) == 0:
             return
@@ -402,92 +481,243 @@ class MTTS(object):
             msg = (f"Need to input a valid n_samples. Not {n_samples}")
             self.logger.error(msg)
             raise ValueError(msg)
-        
-        if not isinstance(start_time, MTime):
-            start_time = MTime(start_time)
 
-        dt_freq = '{0:.0f}N'.format(1.0E9 / (sample_rate))
+        return MTimeArray.from_sample_rate(start_time, n_samples, 
+                                           sample_rate).datetime64
+    
+    def _sample_ns(self, index):
+        """
+        time of sample index in epoch nanoseconds on the regular time axis,
+        the same values as `time_index`
+        """
+        return self._start_ns + int(round(index * 
+                                          (NS_PER_SECOND / self.sample_rate)))
+
+    def _regular_index(self, time_ns, side='left'):
+        """
+        Index of a time on the regular time axis following 
+        numpy.searchsorted, 'left' gives the first sample >= time and 
+        'right' the first sample > time.
+        """
+        index = int(np.floor((time_ns - self._start_ns) * self.sample_rate /
+                             NS_PER_SECOND))
+        # correct for rounding of the sample times
+        if side == 'left':
+            while self._sample_ns(index) < time_ns:
+                index += 1
+            while self._sample_ns(index - 1) >= time_ns:
+                index -= 1
+        else:
+            while self._sample_ns(index) <= time_ns:
+                index += 1
+            while self._sample_ns(index - 1) > time_ns:
+                index -= 1
+        return index
+
+    def get_slice_index(self, start, end):
+        """
+        Get the sample indices of a slice given a start and end time.  
+
+        Computed from the start time and sample rate for a regular time axis,
+        or with a binary search if the time coordinate is stored.
+
+        :param start: start time of the slice
+        :type start: [ str | :class:`mth5.utils.mttime.MTime` ]
+        :param end: end time of the slice
+        :type end: [ str | :class:`mth5.utils.mttime.MTime` ]
+        :return: start index (first sample >= start) and end index 
+                 (one past the last sample <= end), clipped to the data
+        :rtype: tuple (int, int)
 
-        dt_index = pd.date_range(start=start_time.iso_str.split('+', 1)[0],
-                                 periods=n_samples,
-                                 freq=dt_freq)
+        """
+        if not isinstance(start, MTime):
+            start = MTime(start)
+        if not isinstance(end, MTime):
+            end = MTime(end)
 
-        return dt_index
+        if self._has_time_coordinate():
+            times = self._ts.time.values
+            start_index = int(np.searchsorted(times, start.datetime64, 
+                                              side='left'))
+            end_index = int(np.searchsorted(times, end.datetime64,
+                                            side='right'))
+        else:
+            start_index = self._regular_index(start.epoch_ns, side='left')
+            end_index = self._regular_index(end.epoch_ns, side='right')
+            
+        return (min(max(start_index, 0), self.n_samples), 
+                min(max(end_index, 0), self.n_samples))
     
     def get_slice(self, start, end):
         """
         Get a slice from the time series given a start and end time.
         
-        Looks for >= start & <= end
-        
-        Uses loc to be exact with milliseconds
+        Looks for >= start & <= end.  The indices are found with 
+        `get_slice_index` and the slice is a view of the data, no samples
+        are copied.
         
-        :param start: DESCRIPTION
-        :type start: TYPE
-        :param end: DESCRIPTION
-        :type end: TYPE
-        :return: DESCRIPTION
-        :rtype: TYPE
+        :param start: start time of the slice
+        :type start: [ str | :class:`mth5.utils.mttime.MTime` ]
+        :param end: end time of the slice
+        :type end: [ str | :class:`mth5.utils.mttime.MTime` ]
+        :return: slice of the time series
+        :rtype: xarray.DataArray
+        :raises MTTSError: if there is no data between start and end
 
         """
+        start_index, end_index = self.get_slice_index(start, end)
+        if end_index <= start_index:
+            msg = "No data between {0} and {1}, data is {2} to {3}".format(
+                start, end, self.start, self.end)
+            self.logger.error(msg)
+            raise MTTSError(msg)
         
-        if not isinstance(start, MTime):
-            start = MTime(start)
-        if not isinstance(end, MTime):
-            end = MTime(end)
-            
-        new_ts = self.ts.loc[(self.ts.indexes['time'] >= start.iso_no_tz) & 
-                             (self.ts.indexes['time'] <= end.iso_no_tz)]
-        new_ts.attrs['time_period.start'] = new_ts.coords.indexes['time'][0].isoformat()
-        new_ts.attrs['time_period.end'] = new_ts.coords.indexes['time'][-1].isoformat()
+        new_ts = self._ts.isel(time=slice(start_index, end_index))
+        new_ts.attrs = dict(self._ts.attrs)
+        if self._has_time_coordinate():
+            new_ts.attrs['time_period.start'] = MTime(
+                new_ts.time.values[0]).iso_str
+            new_ts.attrs['time_period.end'] = MTime(
+                new_ts.time.values[-1]).iso_str
+        else:
+            for key, index in [('time_period.start', start_index), 
+                               ('time_period.end', end_index - 1)]:
+                sample_time = MTime()
+                sample_time.epoch_ns = self._sample_ns(index)
+                new_ts.attrs[key] = sample_time.iso_str
 
         return new_ts
     
     # decimate data
     def resample(self, dec_factor=1, inplace=False):
         """
-        decimate the data by using scipy.signal.decimate
+        Decimate the data by an integer factor with an anti-alias filter, 
+        see :func:`mth5.utils.mtfilter.decimate`.  Large factors are done
+        in stages.
 
         :param dec_factor: decimation factor
         :type dec_factor: int
-
-        * refills ts.data with decimated data and replaces sample_rate
+        :param inplace: replace the data of this time series, defaults to 
+                        False
+        :type inplace: boolean
+        :return: decimated time series if inplace is False
+        :rtype: :class:`mth5.timeseries.MTTS`
+        
+        * the first sample of the decimated data is at the start time, the
+          new sample rate is sample_rate / dec_factor
 
         """
+        from mth5.utils.mtfilter import decimate
         
-        new_dt_freq = '{0:.0f}N'.format(1E9 / (self.sample_rate / dec_factor))
-        
-        new_ts = self.ts.resample(time=new_dt_freq).nearest(tolerance=new_dt_freq)
-        new_ts.attrs['sample_rate'] = self.sample_rate / dec_factor
-        self.metadata.sample_rate = new_ts.attrs['sample_rate']
+        new_sample_rate = self.sample_rate / dec_factor
+        data = decimate(self._ts.values, dec_factor)
         
         if inplace:
-            self.ts = new_ts
+            start = self.start
+            self._ts = xr.DataArray(data, dims=['time'], 
+                                    attrs=dict(self._ts.attrs))
+            self._set_regular_axis(start, new_sample_rate)
+            self.update_xarray_metadata()
             
         else:
-            new_ts.attrs.update(self.metadata.to_dict()[self.metadata._class_name])
-            #return new_ts
-            return MTTS(self.metadata.type, data=new_ts,
-                        metadata=self.metadata)
+            new_metadata = type(self.metadata)()
+            new_metadata.from_dict(self.metadata.to_dict())
+            new_metadata.sample_rate = new_sample_rate
+            new_metadata.time_period.start = self.start_time_utc
+            return MTTS(self.metadata.type, data=data,
+                        channel_metadata=new_metadata)
+        
+    def apply_filter(self, sos, inplace=True):
+        """
+        Filter the data with an IIR filter in second order sections, see
+        :class:`mth5.utils.mtfilter.SOSFilter`.
+
+        :param sos: second order sections
+        :type sos: :class:`numpy.ndarray`
+        :param inplace: replace the data of this time series, defaults to 
+                        True
+        :type inplace: boolean
+        :return: filtered time series if inplace is False
+        :rtype: :class:`mth5.timeseries.MTTS`
+
+        """
+        from mth5.utils.mtfilter import sos_filter
         
+        filtered = self._ts.copy(data=sos_filter(self._ts.values, sos))
+        if inplace:
+            self._ts = filtered
+        else:
+            new_metadata = type(self.metadata)()
+            new_metadata.from_dict(self.metadata.to_dict())
+            return MTTS(self.metadata.type, data=filtered, 
+                        channel_metadata=new_metadata)
 
-    def low_pass_filter(self, low_pass_freq=15, cutoff_freq=55):
+    def low_pass_filter(self, low_pass_freq=15, cutoff_freq=55, 
+                        inplace=True):
         """
         low pass the data
 
         :param low_pass_freq: low pass corner in Hz
         :type low_pass_freq: float
 
-        :param cutoff_freq: cut off frequency in Hz
+        :param cutoff_freq: cut off frequency in Hz, the filter attenuates
+                            by at least 40 dB here
         :type cutoff_freq: float
+        
+        :param inplace: replace the data of this time series, defaults to 
+                        True
+        :type inplace: boolean
 
-        * filters ts.data
+        * filters ts.data, see :func:`mth5.utils.mtfilter.design_low_pass`
+        """
+        from mth5.utils.mtfilter import design_low_pass
+        
+        return self.apply_filter(design_low_pass(low_pass_freq, cutoff_freq,
+                                                 self.sample_rate),
+                                 inplace=inplace)
+    
+    def band_pass_filter(self, low_freq, high_freq, order=4, inplace=True):
         """
-        pass
-        # self.ts = mtfilter.low_pass(self.ts.data,
-        #                             low_pass_freq,
-        #                             cutoff_freq,
-        #                             self.sample_rate)
+        band pass the data
+
+        :param low_freq: low corner in Hz
+        :type low_freq: float
+        :param high_freq: high corner in Hz
+        :type high_freq: float
+        :param order: filter order, defaults to 4
+        :type order: integer
+        :param inplace: replace the data of this time series, defaults to 
+                        True
+        :type inplace: boolean
+
+        * filters ts.data, see :func:`mth5.utils.mtfilter.design_band_pass`
+        """
+        from mth5.utils.mtfilter import design_band_pass
+        
+        return self.apply_filter(design_band_pass(low_freq, high_freq,
+                                                  self.sample_rate, order),
+                                 inplace=inplace)
+    
+    def notch_filter(self, notch_freq=60, quality=30, inplace=True):
+        """
+        remove a single frequency, like power line noise
+
+        :param notch_freq: frequency to remove in Hz, defaults to 60
+        :type notch_freq: float
+        :param quality: quality factor, notch_freq / bandwidth, defaults to 
+                        30
+        :type quality: float
+        :param inplace: replace the data of this time series, defaults to 
+                        True
+        :type inplace: boolean
+
+        * filters ts.data, see :func:`mth5.utils.mtfilter.design_notch`
+        """
+        from mth5.utils.mtfilter import design_notch
+        
+        return self.apply_filter(design_notch(notch_freq, self.sample_rate, 
+                                              quality),
+                                 inplace=inplace)
         
     # def plot_spectra(self, spectra_type='welch', **kwargs):
     #     """
@@ -280,6 +280,17 @@ def to_numpy_type(value):
 
     else:
         raise TypeError("Type {0} not understood".format(type(value)))
+
+def from_numpy_type(value):
+    """
+    Convert an attribute read from HDF5 back to python, the opposite of
+    `to_numpy_type`.  Arrays become lists and byte strings are decoded.
+    """
+    if isinstance(value, np.ndarray):
+        return [from_numpy_type(v) for v in value.tolist()]
+    if isinstance(value, (bytes, np.bytes_)):
+        return value.decode()
+    return value
         
 # =============================================================================
 # Helper function to be sure everything is encoded properly
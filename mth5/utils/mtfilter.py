@@ -0,0 +1,493 @@
+# -*- coding: utf-8 -*-
+"""
+Filters for MT time series.
+
+Anti-alias decimation is done with zero-phase FIR filters applied with a
+polyphase filter (scipy.signal.upfirdn), only the output samples are
+computed.  Large decimation factors are split into stages, each with a
+short filter, which is much cheaper than one long filter.  Filter designs
+are cached per decimation factor.
+
+:class:`Decimator` works on blocks of data and keeps the filter history
+between blocks, so a long channel can be decimated block by block from an
+HDF5 file and the output is the same as decimating the whole array.
+
+    >>> decimated = decimate(data, 4096)
+
+    >>> decimator = Decimator(4096)
+    >>> for block in blocks:
+    ...     out = decimator.process(block)
+    >>> out = decimator.flush()
+
+Low pass, band pass and notch filters are IIR designs in second order
+sections, cached per set of parameters.  :class:`SOSFilter` applies them
+to blocks of data, carrying the filter state from one block to the next,
+so the result is the same as filtering the whole array in one go.
+
+    >>> sos = np.vstack([design_notch(60, 256), 
+    ...                  design_low_pass(15, 55, 256)])
+    >>> sos_filter = SOSFilter(sos)
+    >>> for block in blocks:
+    ...     out = sos_filter.process(block)
+
+scipy is only imported when a filter is designed or applied.
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+from functools import lru_cache
+
+import numpy as np
+
+from mth5.utils.mth5logger import ClassLogger
+
+# largest decimation factor of a single stage
+MAX_STAGE_FACTOR = 10
+# half length of the FIR filter per unit of decimation factor, the same as
+# scipy.signal.decimate(ftype='fir')
+HALF_LENGTH_FACTOR = 10
+# =============================================================================
+# Filter design
+# =============================================================================
+def _read_only(array):
+    """
+    Make a cached filter design read only, it is shared
+    """
+    array.setflags(write=False)
+    return array
+
+def prime_factors(n):
+    """
+    Prime factors of n in ascending order
+
+    :param n: integer > 0
+    :type n: integer
+    :return: prime factors
+    :rtype: list of integers
+
+    """
+    factors = []
+    divisor = 2
+    while divisor * divisor <= n:
+        while n % divisor == 0:
+            factors.append(divisor)
+            n //= divisor
+        divisor += 1
+    if n > 1:
+        factors.append(n)
+    return factors
+
+def get_decimation_stages(dec_factor, max_stage_factor=MAX_STAGE_FACTOR):
+    """
+    Split a decimation factor into stages no larger than max_stage_factor
+    where possible, largest stage first.  A prime factor larger than
+    max_stage_factor is a stage of its own.
+
+    :param dec_factor: total decimation factor
+    :type dec_factor: integer
+    :param max_stage_factor: largest factor of a single stage, defaults to
+                             MAX_STAGE_FACTOR
+    :type max_stage_factor: integer, optional
+    :return: decimation factor of each stage, the product is dec_factor
+    :rtype: list of integers
+    :raises ValueError: if dec_factor is not a positive integer
+
+    :Example: ::
+
+        >>> get_decimation_stages(4096)
+        [8, 8, 8, 8]
+
+    """
+    if int(dec_factor) != dec_factor or dec_factor < 1:
+        raise ValueError(
+            'Decimation factor must be a positive integer not {0}'.format(
+                dec_factor))
+    dec_factor = int(dec_factor)
+    if dec_factor == 1:
+        return []
+
+    stages = []
+    for factor in sorted(prime_factors(dec_factor), reverse=True):
+        # put each factor on the smallest stage it fits in
+        candidates = [ii for ii, stage in enumerate(stages)
+                      if stage * factor <= max_stage_factor]
+        if candidates:
+            index = min(candidates, key=lambda ii: stages[ii])
+            stages[index] *= factor
+        else:
+            stages.append(factor)
+    return sorted(stages, reverse=True)
+
+@lru_cache(maxsize=None)
+def design_decimation_filter(dec_factor, half_length=None):
+    """
+    Design a zero-phase low pass FIR filter for decimation by dec_factor.
+
+    The design is the same as scipy.signal.decimate(ftype='fir'): a Hamming
+    windowed sinc with cutoff at the new Nyquist frequency and
+    2 * 10 * dec_factor + 1 taps.  The design is normalized by the sample
+    rate, so it depends only on the decimation factor, and is cached.
+    The returned array is read only because it is shared.
+
+    :param dec_factor: decimation factor
+    :type dec_factor: integer
+    :param half_length: half the number of taps - 1, defaults to
+                        10 * dec_factor
+    :type half_length: integer, optional
+    :return: filter coefficients
+    :rtype: :class:`numpy.ndarray`
+
+    """
+    from scipy import signal
+
+    if half_length is None:
+        half_length = HALF_LENGTH_FACTOR * dec_factor
+    return _read_only(signal.firwin(2 * half_length + 1, 1. / dec_factor,
+                                    window='hamming'))
+
+# =============================================================================
+# Decimation
+# =============================================================================
+class DecimationStage():
+    """
+    Single decimation stage that filters and downsamples blocks of data,
+    keeping the samples needed by the filter between blocks.
+
+    Output sample k is centered on input sample k * dec_factor, the data
+    are padded with zeros before the first and after the last sample, which
+    is the same as scipy.signal.resample_poly.
+
+    :param dec_factor: decimation factor
+    :type dec_factor: integer
+    :param taps: symmetric FIR filter with an odd number of taps, defaults
+                 to design_decimation_filter(dec_factor)
+    :type taps: :class:`numpy.ndarray`, optional
+
+    """
+
+    def __init__(self, dec_factor, taps=None):
+        self.dec_factor = int(dec_factor)
+        if taps is None:
+            taps = design_decimation_filter(self.dec_factor)
+        self.taps = taps
+        self.half_length = (taps.size - 1) // 2
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the filter history, start a new series
+        """
+        # zeros before the first sample
+        self._buffer = np.zeros(self.half_length)
+        # input index of the first sample in the buffer
+        self._offset = -self.half_length
+        # number of output samples so far
+        self._n_out = 0
+
+    def process(self, data, final=False):
+        """
+        Filter and downsample a block of data.
+
+        :param data: next block of samples
+        :type data: :class:`numpy.ndarray`
+        :param final: True for the last block, pads the end with zeros so
+                      every output sample is returned
+        :type final: boolean
+        :return: decimated samples that can be computed so far
+        :rtype: :class:`numpy.ndarray`
+
+        """
+        from scipy import signal
+
+        buffer = np.concatenate([self._buffer,
+                                 np.asarray(data, dtype=np.float64)])
+        n_input = self._offset + buffer.size
+        if final:
+            buffer = np.concatenate([buffer, np.zeros(self.half_length)])
+
+        # last output sample that has all of its inputs
+        if final:
+            last = (n_input - 1) // self.dec_factor
+        else:
+            last = (n_input - 1 - self.half_length) // self.dec_factor
+        n_out = last - self._n_out + 1
+        if n_out < 1:
+            self._buffer = buffer
+            return np.zeros(0)
+
+        # position in the buffer of the first input of the next output
+        start = self._n_out * self.dec_factor - self.half_length - self._offset
+        stop = start + (n_out - 1) * self.dec_factor + self.taps.size
+        segment = buffer[start:stop]
+
+        # full convolution index (taps.size - 1) + m * dec_factor is output
+        # m, pad the front so those land on multiples of dec_factor
+        pad = (-(self.taps.size - 1)) % self.dec_factor
+        if pad:
+            segment = np.concatenate([np.zeros(pad), segment])
+        first = (self.taps.size - 1 + pad) // self.dec_factor
+        out = signal.upfirdn(self.taps, segment, up=1,
+                             down=self.dec_factor)[first:first + n_out]
+
+        # keep the inputs the next output needs
+        next_start = ((self._n_out + n_out) * self.dec_factor -
+                      self.half_length - self._offset)
+        self._buffer = buffer[next_start:]
+        self._offset += next_start
+        self._n_out += n_out
+
+        return out
+
+class Decimator():
+    """
+    Multi-stage anti-alias decimation of blocks of data.
+
+    Each stage is a :class:`DecimationStage`, the stages are from
+    :func:`get_decimation_stages`.  Feed blocks of any size to `process` and
+    call `flush` after the last block.  The concatenated output is the same
+    as :func:`decimate` on the whole array.
+
+    :param dec_factor: total decimation factor
+    :type dec_factor: integer
+    :param max_stage_factor: largest factor of a single stage
+    :type max_stage_factor: integer, optional
+
+    :Example: ::
+
+        >>> decimator = Decimator(64)
+        >>> out = [decimator.process(block) for block in blocks]
+        >>> out.append(decimator.flush())
+        >>> decimated = np.concatenate(out)
+
+    """
+
+    logger = ClassLogger()
+
+    def __init__(self, dec_factor, max_stage_factor=MAX_STAGE_FACTOR):
+        self.dec_factor = int(dec_factor)
+        self.stages = [DecimationStage(factor) for factor in
+                       get_decimation_stages(dec_factor, max_stage_factor)]
+        self.logger.debug('Decimation by %s in stages %s', self.dec_factor,
+                          [stage.dec_factor for stage in self.stages])
+
+    def process(self, data, final=False):
+        """
+        Decimate a block of data.
+
+        :param data: next block of samples
+        :type data: :class:`numpy.ndarray`
+        :param final: True for the last block
+        :type final: boolean
+        :return: decimated samples that can be computed so far
+        :rtype: :class:`numpy.ndarray`
+
+        """
+        out = np.asarray(data, dtype=np.float64)
+        for stage in self.stages:
+            out = stage.process(out, final=final)
+        return out
+
+    def flush(self):
+        """
+        Return the remaining decimated samples after the last block and
+        reset the decimator.
+
+        :return: remaining decimated samples
+        :rtype: :class:`numpy.ndarray`
+
+        """
+        out = self.process(np.zeros(0), final=True)
+        self.reset()
+        return out
+
+    def reset(self):
+        """
+        Clear the filter history of every stage
+        """
+        for stage in self.stages:
+            stage.reset()
+
+def decimate(data, dec_factor, max_stage_factor=MAX_STAGE_FACTOR):
+    """
+    Anti-alias filter and downsample data by an integer factor.
+
+    :param data: samples
+    :type data: :class:`numpy.ndarray`
+    :param dec_factor: decimation factor
+    :type dec_factor: integer
+    :param max_stage_factor: largest factor of a single stage
+    :type max_stage_factor: integer, optional
+    :return: ceil(data.size / dec_factor) samples, the first is at the time
+             of the first input sample
+    :rtype: :class:`numpy.ndarray`
+
+    """
+    if int(dec_factor) == 1:
+        return np.array(data, dtype=np.float64)
+    return Decimator(dec_factor, max_stage_factor).process(data, final=True)
+
+# =============================================================================
+# IIR filters
+# =============================================================================
+@lru_cache(maxsize=None)
+def design_low_pass(low_pass_freq, cutoff_freq, sample_rate, gpass=3,
+                    gstop=40):
+    """
+    Design a Butterworth low pass filter of the lowest order that passes
+    low_pass_freq with at most gpass dB loss and attenuates cutoff_freq by
+    at least gstop dB.  Designs are cached.
+
+    :param low_pass_freq: edge of the pass band in Hz
+    :type low_pass_freq: float
+    :param cutoff_freq: edge of the stop band in Hz, must be larger than
+                        low_pass_freq
+    :type cutoff_freq: float
+    :param sample_rate: sample rate in samples per second
+    :type sample_rate: float
+    :param gpass: maximum loss in the pass band in dB, defaults to 3
+    :type gpass: float, optional
+    :param gstop: minimum attenuation in the stop band in dB, defaults to 40
+    :type gstop: float, optional
+    :return: second order sections, shape (n_sections, 6)
+    :rtype: :class:`numpy.ndarray`
+    :raises ValueError: if the frequencies are not below the Nyquist 
+                        frequency or cutoff_freq <= low_pass_freq
+
+    """
+    from scipy import signal
+
+    nyquist = sample_rate / 2.
+    if not 0 < low_pass_freq < cutoff_freq:
+        raise ValueError(
+            'Need 0 < low_pass_freq < cutoff_freq, not {0} and {1}'.format(
+                low_pass_freq, cutoff_freq))
+    if low_pass_freq >= nyquist:
+        raise ValueError(
+            'low_pass_freq {0} must be below the Nyquist frequency {1}'.format(
+                low_pass_freq, nyquist))
+    # the stop band can not go past Nyquist
+    cutoff_freq = min(cutoff_freq, 0.999 * nyquist)
+
+    order, wn = signal.buttord(low_pass_freq, cutoff_freq, gpass, gstop,
+                               fs=sample_rate)
+    return _read_only(signal.butter(order, wn, btype='lowpass', 
+                                    output='sos', fs=sample_rate))
+
+@lru_cache(maxsize=None)
+def design_band_pass(low_freq, high_freq, sample_rate, order=4):
+    """
+    Design a Butterworth band pass filter.  Designs are cached.
+
+    :param low_freq: low corner in Hz
+    :type low_freq: float
+    :param high_freq: high corner in Hz
+    :type high_freq: float
+    :param sample_rate: sample rate in samples per second
+    :type sample_rate: float
+    :param order: filter order, defaults to 4
+    :type order: integer, optional
+    :return: second order sections, shape (n_sections, 6)
+    :rtype: :class:`numpy.ndarray`
+    :raises ValueError: if the corners are not 0 < low < high < Nyquist
+
+    """
+    from scipy import signal
+
+    if not 0 < low_freq < high_freq < sample_rate / 2.:
+        raise ValueError(
+            'Need 0 < low_freq < high_freq < {0}, not {1} and {2}'.format(
+                sample_rate / 2., low_freq, high_freq))
+    return _read_only(signal.butter(order, [low_freq, high_freq],
+                                    btype='bandpass', output='sos',
+                                    fs=sample_rate))
+
+@lru_cache(maxsize=None)
+def design_notch(notch_freq, sample_rate, quality=30):
+    """
+    Design a notch filter, e.g. for power line noise.  Designs are cached.
+
+    :param notch_freq: frequency to remove in Hz
+    :type notch_freq: float
+    :param sample_rate: sample rate in samples per second
+    :type sample_rate: float
+    :param quality: quality factor, notch_freq / bandwidth, defaults to 30
+    :type quality: float, optional
+    :return: second order sections, shape (1, 6)
+    :rtype: :class:`numpy.ndarray`
+    :raises ValueError: if notch_freq is not below the Nyquist frequency
+
+    """
+    from scipy import signal
+
+    if not 0 < notch_freq < sample_rate / 2.:
+        raise ValueError(
+            'notch_freq {0} must be between 0 and {1}'.format(
+                notch_freq, sample_rate / 2.))
+    b, a = signal.iirnotch(notch_freq, quality, fs=sample_rate)
+    return _read_only(signal.tf2sos(b, a))
+
+class SOSFilter():
+    """
+    Apply an IIR filter in second order sections to blocks of data, the
+    filter state is carried between blocks.
+
+    The filter is causal.  The state is initialized to the steady state of
+    the first sample, which avoids a step response at the start of the 
+    data.
+
+    :param sos: second order sections, several filters can be stacked with
+                numpy.vstack
+    :type sos: :class:`numpy.ndarray`
+
+    :Example: ::
+
+        >>> sos_filter = SOSFilter(design_low_pass(15, 55, 256))
+        >>> filtered = np.concatenate([sos_filter.process(block) 
+        ...                            for block in blocks])
+
+    """
+
+    def __init__(self, sos):
+        # copy, scipy does not accept the read only cached designs
+        self.sos = np.array(sos, dtype=np.float64, ndmin=2)
+        self.reset()
+
+    def reset(self):
+        """
+        Clear the filter state, start a new series
+        """
+        self._zi = None
+
+    def process(self, data):
+        """
+        Filter a block of data.
+
+        :param data: next block of samples
+        :type data: :class:`numpy.ndarray`
+        :return: filtered samples, same size as data
+        :rtype: :class:`numpy.ndarray`
+
+        """
+        from scipy import signal
+
+        data = np.asarray(data, dtype=np.float64)
+        if data.size == 0:
+            return data
+        if self._zi is None:
+            self._zi = signal.sosfilt_zi(self.sos) * data[0]
+        out, self._zi = signal.sosfilt(self.sos, data, zi=self._zi)
+        return out
+
+def sos_filter(data, sos):
+    """
+    Filter data with second order sections, see :class:`SOSFilter`.
+
+    :param data: samples
+    :type data: :class:`numpy.ndarray`
+    :param sos: second order sections
+    :type sos: :class:`numpy.ndarray`
+    :return: filtered samples
+    :rtype: :class:`numpy.ndarray`
+
+    """
+    return SOSFilter(sos).process(data)
@@ -2,16 +2,29 @@
 """
 Root logging
 
+MTH5 behaves like a library, importing it only adds a
+:class:`logging.NullHandler` to the ``mth5`` logger.  To get the console
+and rotating file handlers defined in ``logging_config.yaml`` call
+:func:`configure_logging` explicitly
+
+    >>> import mth5
+    >>> mth5.configure_logging()
+
+or with ``use_queue=True`` to write the log files from a background thread
+so that logging calls do not block on disk.
+
 Created on Mon May 18 15:34:05 2020
 
 @author: jpeacock
 """
 
+import atexit
 import logging
 import logging.config
+import logging.handlers
 import os
+import queue
 from pathlib import Path
-import yaml
 
 FORMATTER = logging.Formatter("%(asctime)s — %(name)s — %(levelname)s — %(message)s")
 CONF_PATH = Path(os.path.dirname(os.path.abspath(__file__)))
@@ -20,10 +33,17 @@ CONF_FILE = Path.joinpath(CONF_PATH, 'logging_config.yaml')
 if not CONF_FILE.exists():
     CONF_FILE = None
 
+# listener for queue based logging, see configure_logging
+_QUEUE_LISTENER = None
+
 class MTH5Logger():
     @staticmethod
-    def load_config():
-        config_file = Path(CONF_FILE)
+    def load_config(config_file=None):
+        import yaml
+
+        if config_file is None:
+            config_file = CONF_FILE
+        config_file = Path(config_file)
         with open(config_file, 'r') as fid:
             config_dict = yaml.safe_load(fid)
         logging.config.dictConfig(config_dict)
@@ -39,4 +59,110 @@ class MTH5Logger():
             logger.addHandler(fn_handler)
             
         return logger
-   
\ No newline at end of file
+
+
+class ClassLogger():
+    """
+    Descriptor that provides a logger named ``module.ClassName`` for a class
+    and its subclasses.
+
+    The logger is looked up once per class and cached, instead of calling
+    :func:`logging.getLogger` with a formatted name every time an object is
+    made.  Setting ``self.logger`` on an instance still overrides it.
+
+    :Example: ::
+
+        >>> class Foo():
+        ...     logger = ClassLogger()
+        >>> Foo().logger.name
+        '__main__.Foo'
+
+    """
+    _loggers = {}
+
+    def __get__(self, instance, owner=None):
+        if owner is None:
+            owner = type(instance)
+        try:
+            return self._loggers[owner]
+        except KeyError:
+            logger = logging.getLogger('{0}.{1}'.format(owner.__module__,
+                                                        owner.__name__))
+            self._loggers[owner] = logger
+            return logger
+
+
+def stop_queue_listener():
+    """
+    Stop the queue listener started by ``configure_logging(use_queue=True)``,
+    flushing any records still in the queue.
+    """
+    global _QUEUE_LISTENER
+    if _QUEUE_LISTENER is not None:
+        _QUEUE_LISTENER.stop()
+        _QUEUE_LISTENER = None
+
+
+def configure_logging(config_file=CONF_FILE, level=None, use_queue=False):
+    """
+    Configure logging for MTH5, this is not done on import.
+
+    Loads the YAML logging configuration (console plus rotating debug and
+    error files by default).  If there is no configuration file, falls back
+    to a debug file and a console handler.
+
+    :param config_file: YAML logging configuration file
+    :type config_file: string or :class:`pathlib.Path`, optional
+    :param level: level of the ``mth5`` logger, defaults to the configuration
+    :type level: string or integer, optional
+    :param use_queue: move the file handlers of the root logger behind a
+                      :class:`logging.handlers.QueueHandler` so records are
+                      written by a background thread, defaults to False
+    :type use_queue: boolean, optional
+    :return: the queue listener if use_queue is True, otherwise None
+    :rtype: :class:`logging.handlers.QueueListener`
+
+    :Example: ::
+
+        >>> import mth5
+        >>> mth5.configure_logging(level='INFO', use_queue=True)
+
+    """
+    global _QUEUE_LISTENER
+    stop_queue_listener()
+
+    root = logging.getLogger()
+    if config_file is not None:
+        MTH5Logger.load_config(config_file)
+    else:
+        logging.basicConfig(filename='mth5_debug.log',
+                            format=FORMATTER._fmt,
+                            level=logging.INFO)
+        st = logging.StreamHandler()
+        st.setFormatter(FORMATTER)
+        st.setLevel(logging.INFO)
+        root.addHandler(st)
+
+    logger = logging.getLogger('mth5')
+    if level is not None:
+        logger.setLevel(level)
+
+    file_handlers = [h for h in root.handlers
+                     if isinstance(h, logging.FileHandler)]
+
+    if use_queue and file_handlers:
+        log_queue = queue.Queue(-1)
+        for handler in file_handlers:
+            root.removeHandler(handler)
+        root.addHandler(logging.handlers.QueueHandler(log_queue))
+        _QUEUE_LISTENER = logging.handlers.QueueListener(
+            log_queue, *file_handlers, respect_handler_level=True)
+        _QUEUE_LISTENER.start()
+
+    logger.info('Started MTH5')
+    for handler in file_handlers:
+        logger.info('Log file can be found at %s', handler.baseFilename)
+
+    return _QUEUE_LISTENER
+
+atexit.register(stop_queue_listener)
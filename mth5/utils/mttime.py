@@ -6,13 +6,24 @@ Created on Wed May 13 19:10:46 2020
 """
 
 import datetime
-import logging
+import re
 import numpy as np
 
 from dateutil import parser as dtparser
 from dateutil.tz.tz import tzutc
 
 from mth5.utils.exceptions import MTTimeError
+from mth5.utils.mth5logger import ClassLogger
+
+# ISO 8601 strings in UTC are parsed without dateutil, anything else falls
+# back to dateutil.parser
+ISO_PATTERN = re.compile(
+    r'^(\d{4})-(\d{2})-(\d{2})'
+    r'(?:[T ](\d{2}):(\d{2})(?::(\d{2})(?:\.(\d{1,9}))?)?)?'
+    r'(Z|[+-]00:?00)?$')
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+NS_PER_SECOND = 1000000000
+NS_PER_MICROSECOND = 1000
 #==============================================================================
 # convenience date-time container
 #==============================================================================
@@ -38,6 +49,12 @@ class MTime():
         315532800.0
 
 
+    or epoch nanoseconds (int), which keeps sub-microsecond precision:
+
+        >>> t = MTime('2020-01-01T00:00:00.000000001')
+        >>> t.epoch_ns
+        1577836800000000001
+
     Convenience getters/setters are provided as properties for the different
     parts of time.
 
@@ -46,13 +63,17 @@ class MTime():
         >>> t.year
         2020
 
+    .. seealso:: :class:`MTimeArray` for arrays of times.
+
     """
 
+    logger = ClassLogger()
+
     def __init__(self, time=None):
 
-        self.logger = logging.getLogger('{0}.{1}'.format(
-            __name__, self.__class__.__name__))
-        self.dt_object = self.now()
+        self._dt_object = None
+        # nanoseconds not represented by datetime, 0 - 999
+        self._ns = 0
         
         if time is not None:
             if isinstance(time, str):
@@ -64,9 +85,14 @@ class MTime():
                                   "seconds in UTC")
                 self.epoch_seconds = time
             elif isinstance(time, (np.datetime64)):
-                self.logger.debug("Input time is a np.datetime64 " + 
-                                  "dt_object set to datetime64.tolist().")
-                self.dt_object = self.validate_tzinfo(time.tolist())
+                self.logger.debug("Input time is a np.datetime64, " + 
+                                  "setting epoch nanoseconds")
+                self.epoch_ns = int(time.astype('datetime64[ns]').astype(
+                    np.int64))
+            
+            elif isinstance(time, MTime):
+                self._dt_object = time.dt_object
+                self._ns = time._ns
             
             elif isinstance(time, (datetime.datetime)):
                 self.logger.debug("Input time is a np.datetime64 " + 
@@ -80,7 +106,7 @@ class MTime():
         else:
             self.logger.debug("Initiated with None, dt_object is set to "+
                               "default time 1980-01-01 00:00:00")
-            self.from_str('1980-01-01 00:00:00')
+            self.from_str('1980-01-01T00:00:00')
 
     def __str__(self):
         return self.iso_str
@@ -93,7 +119,7 @@ class MTime():
             return bool(self.dt_object == other)
 
         elif isinstance(other, MTime):
-            return bool(self.dt_object == other.dt_object)
+            return bool(self.epoch_ns == other.epoch_ns)
 
         elif isinstance(other, str):
             return bool(self.iso_str == other)
@@ -114,7 +140,7 @@ class MTime():
             return bool(self.dt_object < other)
 
         elif isinstance(other, MTime):
-            return bool(self.dt_object < other.dt_object)
+            return bool(self.epoch_ns < other.epoch_ns)
 
         elif isinstance(other, str):
             return bool(self.iso_str < other)
@@ -133,7 +159,7 @@ class MTime():
             return bool(self.dt_object <= other)
 
         elif isinstance(other, MTime):
-            return bool(self.dt_object <= other.dt_object)
+            return bool(self.epoch_ns <= other.epoch_ns)
 
         elif isinstance(other, str):
             return bool(self.iso_str <= other)
@@ -154,7 +180,7 @@ class MTime():
             return bool(self.dt_object >= other)
 
         elif isinstance(other, MTime):
-            return bool(self.dt_object >= other.dt_object)
+            return bool(self.epoch_ns >= other.epoch_ns)
 
         elif isinstance(other, str):
             return bool(self.iso_str >= other)
@@ -170,7 +196,8 @@ class MTime():
     def __add__(self, other):
         """
         add time only using datetime.timedelta, otherwise it does not make 
-        sense to at 2 times together.  
+        sense to at 2 times together.  The sum is made in epoch nanoseconds
+        so nanoseconds of the time are kept.
         
         """
         if not isinstance(other, datetime.timedelta):
@@ -181,7 +208,11 @@ class MTime():
             self.logger.error(msg)
             raise MTTimeError(msg)
         
-        return MTime(self.dt_object + other)
+        new_time = MTime(self)
+        new_time.epoch_ns = self.epoch_ns + (
+            (other.days * 86400 + other.seconds) * NS_PER_SECOND +
+            other.microseconds * NS_PER_MICROSECOND)
+        return new_time
     
     def __sub__(self, other):
         """
@@ -196,13 +227,10 @@ class MTime():
         
         if isinstance(other, type(self)):
             other_seconds = other.epoch_seconds
-        elif isinstance(other, (str)):
-            other_dt = self.validate_tzinfo(dtparser.parse(other))
-            other_seconds = other_dt.timestamp()
+        elif isinstance(other, (str, np.datetime64)):
+            other_seconds = MTime(other).epoch_seconds
         elif isinstance(other, (float, int)):
             other_seconds = float(other)
-        elif isinstance(other, (np.datetime64)):
-            other_seconds = other.astype(np.float)
         elif isinstance(other, (datetime.datetime)):
             other_seconds = other.timestamp()
             
@@ -216,6 +244,15 @@ class MTime():
         
         return self.time_difference(other)
 
+    @property
+    def dt_object(self):
+        return self._dt_object
+
+    @dt_object.setter
+    def dt_object(self, value):
+        self._dt_object = value
+        self._ns = 0
+
     @property
     def iso_str(self):
         return self.dt_object.isoformat()
@@ -236,7 +273,47 @@ class MTime():
         dt = dt.replace(tzinfo=datetime.timezone.utc)
         self.dt_object = dt
 
+    @property
+    def epoch_ns(self):
+        """
+        Time as integer nanoseconds since 1970-01-01T00:00:00 UTC, the same
+        value as numpy datetime64[ns] and :class:`MTimeArray`
+        """
+        delta = self.dt_object - EPOCH
+        return ((delta.days * 86400 + delta.seconds) * NS_PER_SECOND +
+                delta.microseconds * NS_PER_MICROSECOND + self._ns)
+
+    @epoch_ns.setter
+    def epoch_ns(self, ns):
+        microseconds, remainder = divmod(int(ns), NS_PER_MICROSECOND)
+        self.dt_object = EPOCH + datetime.timedelta(microseconds=microseconds)
+        self._ns = remainder
+
+    @property
+    def datetime64(self):
+        """time as numpy.datetime64 with nanosecond precision"""
+        return np.datetime64(self.epoch_ns, 'ns')
+
     def from_str(self, dt_str):
+        """
+        Set the time from a string.  ISO 8601 strings in UTC, the format
+        MTH5 writes, are parsed directly, anything else is handed to
+        dateutil.
+
+        :param dt_str: date-time string
+        :type dt_str: string
+        :raises MTTimeError: if the string cannot be parsed
+
+        """
+        match = ISO_PATTERN.match(dt_str)
+        if match is not None:
+            try:
+                self._from_iso_match(match)
+                return
+            except ValueError:
+                # let dateutil have a go and raise a proper error
+                pass
+
         try:
             self.dt_object = self.validate_tzinfo(dtparser.parse(dt_str))
         except dtparser.ParserError as error:
@@ -246,6 +323,19 @@ class MTime():
             self.logger.error(msg)
             raise MTTimeError(msg)
 
+    def _from_iso_match(self, match):
+        """
+        Set the time from a match of :data:`ISO_PATTERN`
+        """
+        (year, month, day, hour, minute, second,
+         fraction, _) = match.groups()
+        fraction = (fraction or '').ljust(9, '0')
+        self.dt_object = datetime.datetime(
+            int(year), int(month), int(day), int(hour or 0), int(minute or 0),
+            int(second or 0), int(fraction[0:6]), 
+            tzinfo=datetime.timezone.utc)
+        self._ns = int(fraction[6:])
+
     def validate_tzinfo(self, dt_object):
         """
         make sure the timezone is UTC
@@ -333,6 +423,244 @@ class MTime():
         """
         self.dt_object = self.validate_tzinfo(datetime.datetime.utcnow())
 
+class MTimeArray():
+    """
+    Array of times stored as int64 nanoseconds since 1970-01-01T00:00:00 UTC,
+    the same representation as numpy datetime64[ns].
+
+    Parsing, comparisons and arithmetic are vectorized, which is much faster
+    than a list of :class:`MTime` objects when handling thousands of run
+    start and end times or sample times.
+
+    Input can be another MTimeArray, an array of datetime64, an array of
+    epoch seconds (floats, like MTime), or a list of strings, datetime or
+    MTime objects.  Use :meth:`from_ns` for epoch nanoseconds.
+
+        >>> t = MTimeArray(['2020-01-01T00:00:00', '2020-01-01T00:00:01'])
+        >>> t.ns
+        array([1577836800000000000, 1577836801000000000])
+        >>> t > '2020-01-01T00:00:00.5'
+        array([False,  True])
+        >>> t + datetime.timedelta(seconds=1)
+        MTimeArray(['2020-01-01T00:00:01.000000000',
+                    '2020-01-01T00:00:02.000000000'])
+
+    Comparisons return boolean arrays, adding or subtracting a time delta
+    returns a new MTimeArray and subtracting times returns
+    numpy.timedelta64[ns] differences (self - other).
+
+    """
+
+    logger = ClassLogger()
+
+    def __init__(self, times=None):
+        if times is None:
+            self.ns = np.zeros(0, dtype=np.int64)
+        else:
+            self.ns = self._to_ns(times)
+
+    @classmethod
+    def from_ns(cls, ns):
+        """
+        Make an MTimeArray from epoch nanoseconds without conversion
+
+        :param ns: nanoseconds since 1970-01-01T00:00:00 UTC
+        :type ns: array of integers
+        :rtype: :class:`MTimeArray`
+
+        """
+        obj = cls()
+        obj.ns = np.atleast_1d(np.asarray(ns, dtype=np.int64))
+        return obj
+
+    @classmethod
+    def from_sample_rate(cls, start, n_samples, sample_rate):
+        """
+        Make evenly sampled times
+
+        :param start: time of the first sample
+        :type start: [ str | :class:`MTime` | np.datetime64 ]
+        :param n_samples: number of samples
+        :type n_samples: integer
+        :param sample_rate: sample rate in samples per second
+        :type sample_rate: float
+        :rtype: :class:`MTimeArray`
+
+        """
+        if not isinstance(start, MTime):
+            start = MTime(start)
+        offsets = np.round(np.arange(n_samples) *
+                           (NS_PER_SECOND / sample_rate)).astype(np.int64)
+        return cls.from_ns(start.epoch_ns + offsets)
+
+    def _to_ns(self, times):
+        """
+        Convert input times to an int64 array of epoch nanoseconds
+        """
+        if isinstance(times, MTimeArray):
+            return times.ns.copy()
+
+        if isinstance(times, (str, datetime.datetime, MTime, np.datetime64,
+                              int, float)):
+            times = [times]
+
+        times = np.asarray(times)
+        if times.dtype.kind == 'M':
+            return times.astype('datetime64[ns]').astype(np.int64)
+
+        elif times.dtype.kind in ['i', 'u', 'f']:
+            return np.round(times.astype(np.float64) *
+                            NS_PER_SECOND).astype(np.int64)
+
+        elif times.dtype.kind == 'U':
+            try:
+                return self._parse_iso(times)
+            except ValueError:
+                pass
+
+        return np.array([MTime(t).epoch_ns for t in times.tolist()],
+                        dtype=np.int64)
+
+    @staticmethod
+    def _parse_iso(times):
+        """
+        Parse ISO strings in UTC with numpy after removing the time zone.
+        Raises ValueError if any string does not match :data:`ISO_PATTERN`.
+        """
+        naive = []
+        for time_str in times.ravel().tolist():
+            match = ISO_PATTERN.match(time_str)
+            if match is None:
+                raise ValueError('{0} is not an ISO string'.format(time_str))
+            naive.append(time_str[0:match.start(8)] if match.group(8)
+                         else time_str)
+        times = np.array(naive).reshape(times.shape)
+        return times.astype('datetime64[ns]').astype(np.int64)
+
+    def _coerce(self, other):
+        """
+        Convert the other side of a comparison to nanoseconds, scalar or
+        array
+        """
+        if isinstance(other, MTimeArray):
+            return other.ns
+        elif isinstance(other, MTime):
+            return other.epoch_ns
+        try:
+            ns = self._to_ns(other)
+        except (TypeError, ValueError, MTTimeError) as error:
+            msg = ('Cannot compare {0} of type {1} with MTimeArray Object, '
+                   '{2}'.format(other, type(other), error))
+            self.logger.error(msg)
+            raise MTTimeError(msg)
+        if np.ndim(other) == 0:
+            return ns[0]
+        return ns
+
+    @staticmethod
+    def _to_timedelta_ns(other):
+        """
+        Convert a time delta to nanoseconds, returns None if other is not a
+        time delta.
+        """
+        if isinstance(other, datetime.timedelta):
+            return (other // datetime.timedelta(microseconds=1) *
+                    NS_PER_MICROSECOND)
+        other_array = np.asarray(other)
+        if other_array.dtype.kind == 'm':
+            return other_array.astype('timedelta64[ns]').astype(np.int64)
+        return None
+
+    def __len__(self):
+        return self.ns.size
+
+    def __iter__(self):
+        for ns in self.ns.tolist():
+            mtime = MTime()
+            mtime.epoch_ns = ns
+            yield mtime
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            mtime = MTime()
+            mtime.epoch_ns = int(self.ns[index])
+            return mtime
+        return MTimeArray.from_ns(self.ns[index])
+
+    def __str__(self):
+        return str(self.iso_str)
+
+    def __repr__(self):
+        return 'MTimeArray({0})'.format(np.datetime_as_string(
+            self.datetime64).tolist())
+
+    def __eq__(self, other):
+        return self.ns == self._coerce(other)
+
+    def __ne__(self, other):
+        return self.ns != self._coerce(other)
+
+    def __lt__(self, other):
+        return self.ns < self._coerce(other)
+
+    def __le__(self, other):
+        return self.ns <= self._coerce(other)
+
+    def __gt__(self, other):
+        return self.ns > self._coerce(other)
+
+    def __ge__(self, other):
+        return self.ns >= self._coerce(other)
+
+    def __add__(self, other):
+        delta = self._to_timedelta_ns(other)
+        if delta is None:
+            msg = ("Adding times does not make sense, must use " +
+                   "datetime.timedelta or numpy.timedelta64 to add time.")
+            self.logger.error(msg)
+            raise MTTimeError(msg)
+        return MTimeArray.from_ns(self.ns + delta)
+
+    def __radd__(self, other):
+        return self.__add__(other)
+
+    def __sub__(self, other):
+        delta = self._to_timedelta_ns(other)
+        if delta is not None:
+            return MTimeArray.from_ns(self.ns - delta)
+        return (self.ns - self._coerce(other)).astype('timedelta64[ns]')
+
+    @property
+    def datetime64(self):
+        """times as numpy.datetime64[ns], a view of the data"""
+        return self.ns.view('datetime64[ns]')
+
+    @property
+    def epoch_seconds(self):
+        """times as float epoch seconds"""
+        return self.ns / NS_PER_SECOND
+
+    @property
+    def iso_str(self):
+        """times as ISO formatted strings with UTC time zone"""
+        return [f'{t}+00:00' for t in 
+                np.datetime_as_string(self.datetime64, unit='us')]
+
+    def searchsorted(self, time, side='left'):
+        """
+        Find the index where a time would be inserted to keep order, assumes
+        the times are sorted.
+
+        :param time: time or times to look for
+        :type time: any input accepted by MTimeArray
+        :param side: 'left' or 'right', see numpy.searchsorted
+        :type side: string
+        :return: index or indices
+        :rtype: integer or array of integers
+
+        """
+        return np.searchsorted(self.ns, self._coerce(time), side=side)
+
 def get_now_utc():
     """
     Get the current time in UTC format
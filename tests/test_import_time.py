@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Guard the start up cost of importing mth5.mth5.
+
+Heavy dependencies (pandas, xarray, obspy, scipy, yaml) should only be
+imported when they are needed, not when a worker just opens a file to read
+samples.  Importing should not create any log files either.
+Uses ``python -X importtime`` in a fresh interpreter so that modules already
+imported by the test session do not hide anything.
+
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+package_path = Path(__file__).parent.parent
+
+# modules that should not be imported by import mth5.mth5
+LAZY_MODULES = ['pandas', 'xarray', 'obspy', 'scipy', 'yaml']
+
+# generous upper bound on the cumulative import time of mth5.mth5 in seconds,
+# meant to catch a heavy dependency sneaking back in, not to benchmark.
+MAX_IMPORT_TIME = 5.0
+# =============================================================================
+# Helpers
+# =============================================================================
+def import_times(module):
+    """
+    Import a module in a fresh interpreter with -X importtime and parse the
+    output.
+
+    :param module: name of the module to import
+    :type module: string
+    :return: cumulative import time in microseconds keyed by module name
+             and the files left in the working directory
+    :rtype: tuple (dictionary, list)
+
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [str(package_path)] +
+        [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p])
+    # run from a temporary directory so the log files end up there
+    with tempfile.TemporaryDirectory() as cwd:
+        proc = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                               f'import {module}'],
+                              stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              env=env, cwd=cwd, universal_newlines=True,
+                              check=True)
+        files = sorted(os.listdir(cwd))
+
+    times = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        try:
+            _, cumulative, name = line[len('import time:'):].split('|')
+            times[name.strip()] = int(cumulative)
+        except ValueError:
+            # header line
+            continue
+    return times, files
+
+# =============================================================================
+# Tests
+# =============================================================================
+class TestImportTime(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.times, cls.files = import_times('mth5.mth5')
+
+    def test_mth5_imported(self):
+        self.assertIn('mth5.mth5', self.times)
+
+    def test_lazy_modules(self):
+        for lazy_module in LAZY_MODULES:
+            with self.subTest(module=lazy_module):
+                self.assertNotIn(lazy_module, self.times)
+
+    def test_no_log_files(self):
+        self.assertListEqual(self.files, [])
+
+    def test_import_time(self):
+        self.assertLess(self.times['mth5.mth5'] / 1E6, MAX_IMPORT_TIME)
+
+# =============================================================================
+# Run
+# =============================================================================
+if __name__ == '__main__':
+    unittest.main()
@@ -75,6 +75,43 @@ class TestBase(unittest.TestCase):
         self.assertEqual([True, False], 
                          self.base_object._validate_type(['true', 'False'],
                                                          bool))
+
+    def test_compiled_validator(self):
+        self.base_object.add_base_attribute(self.extra_name,
+                                            self.extra_value,
+                                            self.extra_v_dict)
+        self.base_object.extra_attribute = 12
+        self.assertEqual(self.base_object.extra_attribute, '12')
+        self.base_object.extra_attribute = 'None'
+        self.assertIsNone(self.base_object.extra_attribute)
+        with self.assertRaises(MTSchemaError):
+            self.base_object.extra_attribute = '11'
+        
+        # changing the standards should change the validator
+        int_v_dict = dict(self.extra_v_dict, type=int, style='number',
+                          options=[])
+        self.base_object.add_base_attribute(self.extra_name, 5, int_v_dict)
+        self.base_object.extra_attribute = '11'
+        self.assertEqual(self.base_object.extra_attribute, 11)
+
+    def test_to_dict_accessors(self):
+        for meta_class in [metadata.Station, metadata.Run, metadata.Electric,
+                           metadata.Magnetic]:
+            meta_obj = meta_class()
+            meta_obj.time_period.start = '2020-01-01T12:00:00'
+            meta_obj.comments = 'None'
+            meta_dict = meta_obj.to_dict()[meta_obj._class_name.lower()]
+            self.assertListEqual(list(meta_dict.keys()),
+                                 sorted(meta_obj._attr_dict.keys()))
+            for name, value in meta_dict.items():
+                try:
+                    self.assertEqual(value, meta_obj.get_attr_from_name(name))
+                except AttributeError:
+                    self.assertIsNone(value)
+                
+            new_obj = meta_class()
+            new_obj.from_dict(meta_obj.to_dict())
+            self.assertEqual(new_obj.to_dict(), meta_obj.to_dict())
         
 class TestLocation(unittest.TestCase):
     def setUp(self):
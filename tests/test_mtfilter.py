@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for mtfilter
+
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import unittest
+import numpy as np
+from scipy import signal
+
+from mth5.utils import mtfilter
+# =============================================================================
+# Tests
+# =============================================================================
+class TestDecimationStages(unittest.TestCase):
+    def test_stages(self):
+        self.assertListEqual(mtfilter.get_decimation_stages(4096),
+                             [8, 8, 8, 8])
+        self.assertListEqual(mtfilter.get_decimation_stages(30), [6, 5])
+        self.assertListEqual(mtfilter.get_decimation_stages(34), [17, 2])
+        self.assertListEqual(mtfilter.get_decimation_stages(1), [])
+
+    def test_stages_fail(self):
+        self.assertRaises(ValueError, mtfilter.get_decimation_stages, 2.5)
+        self.assertRaises(ValueError, mtfilter.get_decimation_stages, 0)
+
+    def test_design_cached(self):
+        taps = mtfilter.design_decimation_filter(8)
+        self.assertIs(taps, mtfilter.design_decimation_filter(8))
+        self.assertEqual(taps.size, 161)
+        self.assertFalse(taps.flags.writeable)
+
+class TestDecimate(unittest.TestCase):
+    def setUp(self):
+        self.data = np.random.default_rng(0).standard_normal(10007)
+
+    def test_single_stage(self):
+        for dec_factor in [2, 3, 8, 10]:
+            with self.subTest(dec_factor=dec_factor):
+                taps = np.array(mtfilter.design_decimation_filter(dec_factor))
+                self.assertTrue(np.allclose(
+                    mtfilter.decimate(self.data, dec_factor),
+                    signal.resample_poly(self.data, 1, dec_factor,
+                                         window=taps)))
+
+    def test_blocks(self):
+        for dec_factor, block_size in [(3, 100), (64, 1000), (100, 7)]:
+            with self.subTest(dec_factor=dec_factor, block_size=block_size):
+                decimator = mtfilter.Decimator(dec_factor)
+                out = [decimator.process(self.data[ii:ii + block_size])
+                       for ii in range(0, self.data.size, block_size)]
+                out.append(decimator.flush())
+                out = np.concatenate(out)
+                whole = mtfilter.decimate(self.data, dec_factor)
+                self.assertEqual(out.size, 
+                                 int(np.ceil(self.data.size / dec_factor)))
+                self.assertTrue(np.allclose(out, whole))
+
+    def test_anti_alias(self):
+        t = np.arange(2**16) / 4096.
+        data = np.sin(2 * np.pi * 1000 * t) + np.sin(2 * np.pi * 2 * t)
+        out = mtfilter.decimate(data, 64)
+        expected = np.sin(2 * np.pi * 2 * t[::64])
+        self.assertLess(np.abs(out - expected)[20:-20].max(), 0.01)
+
+class TestSOSFilter(unittest.TestCase):
+    def setUp(self):
+        self.sample_rate = 256
+        t = np.arange(2**14) / self.sample_rate
+        self.signal = np.sin(2 * np.pi * 2 * t)
+        self.data = (self.signal + np.sin(2 * np.pi * 60 * t) +
+                     np.sin(2 * np.pi * 100 * t))
+        self.sos = np.vstack([
+            mtfilter.design_notch(60, self.sample_rate),
+            mtfilter.design_low_pass(15, 55, self.sample_rate)])
+
+    def test_design_cached(self):
+        sos = mtfilter.design_low_pass(15, 55, self.sample_rate)
+        self.assertIs(sos, mtfilter.design_low_pass(15, 55, 
+                                                    self.sample_rate))
+        self.assertFalse(sos.flags.writeable)
+        self.assertEqual(sos.shape[1], 6)
+
+    def test_design_fail(self):
+        self.assertRaises(ValueError, mtfilter.design_low_pass, 55, 15, 256)
+        self.assertRaises(ValueError, mtfilter.design_low_pass, 200, 300, 
+                          256)
+        self.assertRaises(ValueError, mtfilter.design_band_pass, 10, 200, 
+                          256)
+        self.assertRaises(ValueError, mtfilter.design_notch, 128, 256)
+
+    def test_response(self):
+        _, response = signal.sosfreqz(self.sos, worN=[2, 60, 100],
+                                      fs=self.sample_rate)
+        response = np.abs(response)
+        self.assertGreater(response[0], 0.99)
+        self.assertLess(response[1], 1E-3)
+        self.assertLess(response[2], 1E-2)
+
+        _, response = signal.sosfreqz(
+            mtfilter.design_band_pass(1, 10, self.sample_rate),
+            worN=[0.01, 3, 60], fs=self.sample_rate)
+        response = np.abs(response)
+        self.assertLess(response[0], 1E-3)
+        self.assertGreater(response[1], 0.9)
+        self.assertLess(response[2], 1E-3)
+
+    def test_blocks(self):
+        whole = mtfilter.sos_filter(self.data, self.sos)
+        sos_filter = mtfilter.SOSFilter(self.sos)
+        blocks = np.concatenate([sos_filter.process(self.data[ii:ii + 333])
+                                 for ii in range(0, self.data.size, 333)])
+        self.assertTrue(np.allclose(whole, blocks))
+        # after the transient only the 2 Hz signal is left, delayed
+        self.assertLess(np.abs(whole[1024:]).max(), 1.05)
+
+# =============================================================================
+# Run
+# =============================================================================
+if __name__ == '__main__':
+    unittest.main()
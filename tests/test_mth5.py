@@ -10,12 +10,17 @@ Created on Thu Jun 18 16:54:19 2020
 # Imports
 # =============================================================================
 
+import gc
 import unittest
 from pathlib import Path
 import numpy as np
 
-from mth5 import mth5
+from mth5 import mth5, metadata
 from mth5.standards import schema
+from mth5.helpers import write_attributes
+from mth5 import mth5_groups
+from mth5.mth5_groups import MTH5Table, ChannelCatalog
+from mth5.utils import mtfilter
 from mth5.utils.exceptions import MTH5Error, MTH5TableError
 
 fn_path = Path(__file__).parent
@@ -106,12 +111,710 @@ class TestMTH5(unittest.TestCase):
         new_run.remove_channel('Ex')
         self.assertNotIn('Ex', new_run.groups_list)
         
+    def test_time_slice(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        ex = new_run.add_channel('Ex', 'electric',
+                                 np.arange(4096 * 4, dtype=np.float32))
+        ex.metadata.sample_rate = 4096
+        ex.metadata.time_period.start = '2020-01-01T00:00:00'
+        ex.write_metadata()
+
+        ex_slice = ex.time_slice('2020-01-01T00:00:01',
+                                 '2020-01-01T00:00:02')
+        self.assertEqual(ex_slice.n_samples, 4097)
+        self.assertEqual(ex_slice.ts.values[0], 4096)
+        self.assertEqual(ex_slice.ts.values[-1], 8192)
+        self.assertEqual(ex_slice.start, '2020-01-01T00:00:01+00:00')
+
+        ex_slice = ex.time_slice('2020-01-01T00:00:02', n_samples=10)
+        self.assertListEqual(ex_slice.ts.values.tolist(),
+                             list(range(8192, 8202)))
+
+        self.assertRaises(MTH5Error, ex.time_slice, '2020-01-02T00:00:00',
+                          n_samples=10)
+
+    def test_time_slice_between_samples(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        ex = new_run.add_channel('Ex', 'electric',
+                                 np.arange(64, dtype=np.float32))
+        ex.metadata.sample_rate = 8
+        ex.metadata.time_period.start = '2020-01-01T00:00:00'
+        ex.write_metadata()
+
+        # samples are every 0.125 s, 0.1 is between samples 0 and 1 and
+        # 0.49 is between samples 3 and 4
+        ex_slice = ex.time_slice('2020-01-01T00:00:00.1',
+                                 '2020-01-01T00:00:00.49')
+        self.assertListEqual(ex_slice.ts.values.tolist(), [1, 2, 3])
+        self.assertEqual(ex.get_index_from_time('2020-01-01T00:00:00.1'), 1)
+        self.assertEqual(ex.get_index_from_time('2020-01-01T00:00:00.05',
+                                                rounding='ceil'), 1)
+        self.assertEqual(ex.get_index_from_time('2020-01-01T00:00:00.125',
+                                                rounding='ceil'), 1)
+        self.assertEqual(ex.get_index_from_time('2020-01-01T00:00:00.124',
+                                                rounding='floor'), 0)
+
+    def test_run_to_array(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        for ii, comp in enumerate(['Ex', 'Ey', 'Hx']):
+            ch_type = 'electric' if comp.startswith('E') else 'magnetic'
+            ch = new_run.add_channel(comp, ch_type,
+                                     np.arange(64, dtype=np.float32) + ii)
+            ch.metadata.sample_rate = 8
+            ch.metadata.time_period.start = '2020-01-01T00:00:00'
+            ch.write_metadata()
+
+        run_ds = new_run.to_array(['Ex', 'Hx'],
+                                  start='2020-01-01T00:00:01',
+                                  end='2020-01-01T00:00:02')
+        self.assertListEqual(list(run_ds.data_vars), ['Ex', 'Hx'])
+        self.assertEqual(run_ds.time.size, 9)
+        self.assertListEqual(run_ds['Ex'].values.tolist(),
+                             list(range(8, 17)))
+        self.assertListEqual(run_ds['Hx'].values.tolist(),
+                             list(range(10, 19)))
+
+        # window between samples, first sample is at 0.125 s
+        run_ds = new_run.to_array(['Ex'],
+                                  start='2020-01-01T00:00:00.1',
+                                  end='2020-01-01T00:00:00.49')
+        self.assertListEqual(run_ds['Ex'].values.tolist(), [1, 2, 3])
+        self.assertEqual(run_ds.time.values[0],
+                         np.datetime64('2020-01-01T00:00:00.125'))
+        self.assertEqual(run_ds.attrs['time_period.start'],
+                         '2020-01-01T00:00:00.125000+00:00')
+        self.assertEqual(run_ds.attrs['time_period.end'],
+                         '2020-01-01T00:00:00.375000+00:00')
+
+        run_ds = new_run.to_array()
+        self.assertEqual(run_ds.to_array().shape, (3, 64))
+
+        self.assertRaises(MTH5Error, new_run.to_array, ['Ex'],
+                          '2020-01-01T00:00:06', '2020-01-01T00:00:09')
+
+    def test_run_to_array_time_axis(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        ex = new_run.add_channel('Ex', 'electric',
+                                 np.zeros(4096 * 4, dtype=np.float32))
+        ex.metadata.sample_rate = 4096
+        ex.metadata.time_period.start = '2020-01-01T00:00:00'
+        ex.write_metadata()
+
+        # 244140.625 ns per sample, times are rounded but do not drift
+        times = new_run.to_array().time.values.astype(np.int64)
+        offsets = times - times[0]
+        self.assertEqual(offsets[1], 244141)
+        self.assertEqual(offsets[4096], 10**9)
+        self.assertEqual(offsets[-1], round((4096 * 4 - 1) * 1E9 / 4096))
+
+    def test_channel_writer(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        ex_metadata = metadata.Electric()
+        ex_metadata.sample_rate = 8
+        ex_metadata.time_period.start = '2020-01-01T00:00:00'
+        with new_run.open_channel_writer('Ex', 'electric',
+                                         channel_metadata=ex_metadata,
+                                         chunk_size=16) as writer:
+            for ii in range(4):
+                writer.append(np.arange(16, dtype=np.float32) + 16 * ii)
+            self.assertEqual(writer.n_samples, 64)
+
+        ex = new_run.get_channel('Ex')
+        ex.read_metadata()
+        self.assertEqual(ex.hdf5_dataset.chunks, (16,))
+        self.assertListEqual(ex.hdf5_dataset[()].tolist(), list(range(64)))
+        self.assertEqual(ex.metadata.time_period.end,
+                         '2020-01-01T00:00:07.875000+00:00')
+        index = new_run.summary_table.locate('component', 'Ex')
+        self.assertEqual(index.size, 1)
+        self.assertEqual(
+            new_run.summary_table.values['n_samples'][index[0]], 64)
+
+        self.assertRaises(MTH5Error, writer.append, np.arange(4))
+        self.assertRaises(MTH5Error, new_run.open_channel_writer, 'Ex',
+                          'electric')
+
+    def test_channel_writer_flush_interval(self):
+        new_run = self.mth5_obj.add_station('MT001').add_run('MT001a')
+        ex_metadata = metadata.Electric()
+        ex_metadata.sample_rate = 8
+        ex_metadata.time_period.start = '2020-01-01T00:00:00'
+        writer = new_run.open_channel_writer('Ex', 'electric',
+                                             channel_metadata=ex_metadata,
+                                             chunk_size=16, 
+                                             flush_interval=32)
+        writer.append(np.arange(16))
+        self.assertListEqual(
+            new_run.summary_table.values['n_samples'].tolist(), [0])
+        writer.append(np.arange(16))
+        self.assertListEqual(
+            new_run.summary_table.values['n_samples'].tolist(), [32])
+        self.assertListEqual(
+            self.mth5_obj.query_channels().n_samples.tolist(), [32])
+        writer.append(np.arange(8))
+        writer.close()
+        self.assertListEqual(
+            new_run.summary_table.values['n_samples'].tolist(), [40])
+        self.assertListEqual(
+            self.mth5_obj.query_channels().n_samples.tolist(), [40])
+        self.assertRaises(MTH5Error, writer.flush)
+
+    def test_add_channel_compression(self):
+        self.mth5_obj.close_mth5()
+        self.mth5_obj = mth5.MTH5(compression='gzip', compression_opts=4,
+                                  shuffle=True)
+        self.mth5_obj.open_mth5(self.fn, mode='w')
+        self.assertEqual(self.mth5_obj.dataset_options['compression'], 'gzip')
+
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        data = np.random.randint(-2**20, 2**20, 4096, dtype=np.int32)
+        ex = new_run.add_channel('Ex', 'electric', data)
+        self.assertEqual(ex.hdf5_dataset.compression, 'gzip')
+        self.assertEqual(ex.hdf5_dataset.compression_opts, 4)
+        self.assertTrue(ex.hdf5_dataset.shuffle)
+        self.assertEqual(ex.hdf5_dataset.attrs['compression'], 'gzip')
+        self.assertEqual(ex.hdf5_dataset.attrs['compression_opts'], '4')
+
+        ey = new_run.add_channel('Ey', 'electric', data, compression='lzf',
+                                 fletcher32=True)
+        self.assertEqual(ey.hdf5_dataset.compression, 'lzf')
+        self.assertTrue(ey.hdf5_dataset.fletcher32)
+
+        hz = new_run.add_channel('Hz', 'magnetic', data, scaleoffset=0)
+        self.assertEqual(hz.hdf5_dataset.scaleoffset, 0)
+        self.assertListEqual(hz.hdf5_dataset[()].tolist(), data.tolist())
+
+        hx = new_run.add_channel('Hx', 'magnetic', data, compression='none')
+        self.assertIsNone(hx.hdf5_dataset.compression)
+
+        self.assertRaises(MTH5Error, new_run.add_channel, 'Hy', 'magnetic',
+                          data, compression='zip')
+
+    def test_lazy_metadata(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        ex = new_run.add_channel('Ex', 'electric', np.arange(16))
+        ex.metadata.sample_rate = 8
+        ex.write_metadata()
+
+        # containers are cached, clear to get new ones
+        self.mth5_obj.wrapper_cache.clear()
+        ex = new_run.get_channel('Ex')
+        self.assertIsNone(ex._metadata)
+        self.assertEqual(ex.metadata.sample_rate, 8)
+        self.assertEqual(ex.metadata.mth5_type, 'Electric')
+
+        run = new_station.get_run('MT001a')
+        self.assertIsNone(run._metadata)
+        self.assertEqual(run.metadata.id, 'MT001a')
+
+    def test_mth5_attributes_not_in_standards(self):
+        new_run = self.mth5_obj.add_station('MT001').add_run('MT001a')
+        ex = new_run.add_channel('Ex', 'electric', np.arange(16))
+        self.assertEqual(ex.metadata.mth5_type, 'Electric')
+        self.assertEqual(new_run.metadata.mth5_type, 'Run')
+        # the shared standards are not changed
+        for meta_obj in [metadata.Electric(), metadata.Run()]:
+            meta_dict = meta_obj.to_dict()[meta_obj._class_name.lower()]
+            self.assertNotIn('mth5_type', meta_dict)
+            self.assertNotIn('hdf5_reference', meta_dict)
+
+    def test_write_attributes_changed_only(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        meta_dict = new_station.metadata.to_dict()['station']
+        self.assertListEqual(
+            write_attributes(new_station.hdf5_group, meta_dict), [])
+
+        meta_dict['location.latitude'] = 40.5
+        meta_dict['channels_recorded'] = ['Ex', 'Hy']
+        self.assertListEqual(
+            sorted(write_attributes(new_station.hdf5_group, meta_dict)),
+            ['channels_recorded', 'location.latitude'])
+        self.assertEqual(
+            new_station.hdf5_group.attrs['location.latitude'], 40.5)
+
+    def test_channel_decimate(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        data = np.random.randint(-2**10, 2**10, 10000, dtype=np.int32)
+        ex = new_run.add_channel('Ex', 'electric', data)
+        ex.metadata.sample_rate = 256
+        ex.metadata.time_period.start = '2020-01-01T00:00:00'
+        ex.write_metadata()
+
+        decimated_run = new_station.add_run('MT001b')
+        ex_decimated = ex.decimate(16, decimated_run, block_size=1000)
+        self.assertEqual(ex_decimated.metadata.sample_rate, 16)
+        self.assertEqual(ex_decimated.n_samples, 625)
+        self.assertEqual(ex_decimated.hdf5_dataset.dtype, np.float64)
+        self.assertEqual(ex_decimated.metadata.time_period.end,
+                         '2020-01-01T00:00:39+00:00')
+        self.assertTrue(np.allclose(ex_decimated.hdf5_dataset[()],
+                                    mtfilter.decimate(data, 16)))
+        self.assertIn('Ex', (decimated_run.summary_table.values['component']
+                             .astype(np.unicode_).tolist()))
+
+    def test_channel_apply_filter(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        t = np.arange(10000) / 256.
+        data = (np.sin(2 * np.pi * 2 * t) + 
+                np.sin(2 * np.pi * 60 * t)).astype(np.float32)
+        ex = new_run.add_channel('Ex', 'electric', data)
+        ex.metadata.sample_rate = 256
+        ex.write_metadata()
+        hx = new_run.add_channel('Hx', 'magnetic', 
+                                 np.arange(100, dtype=np.int32))
+        sos = np.vstack([mtfilter.design_notch(60, 256),
+                         mtfilter.design_low_pass(15, 55, 256)])
+
+        # a new channel in the same run by default
+        ex_filtered = ex.apply_filter(sos, block_size=1000, 
+                                      filter_name='notch_low_pass')
+        self.assertEqual(ex_filtered.hdf5_dataset.name, 
+                         '/Survey/Stations/MT001/MT001a/Ex_filtered')
+        self.assertTrue(np.allclose(ex_filtered.hdf5_dataset[()],
+                                    mtfilter.sos_filter(data, sos),
+                                    atol=1E-6))
+        self.assertListEqual(ex.hdf5_dataset[()].tolist(), data.tolist())
+        self.assertIsNone(ex.metadata.filter.name)
+        self.assertListEqual(
+            new_run.summary_table.values['n_samples'].tolist(), 
+            [10000, 100, 10000])
+
+        ex.apply_filter(sos, block_size=1000, inplace=True)
+        self.assertTrue(np.allclose(ex.hdf5_dataset[()],
+                                    mtfilter.sos_filter(data, sos),
+                                    atol=1E-6))
+        self.assertRaises(MTH5Error, hx.apply_filter, sos, inplace=True)
+
+        filtered_run = new_station.add_run('MT001b')
+        self.assertRaises(MTH5Error, hx.apply_filter, sos, filtered_run,
+                          inplace=True)
+        hx_filtered = hx.apply_filter(sos, filtered_run, block_size=30)
+        self.assertEqual(hx_filtered.hdf5_dataset.name, 
+                         '/Survey/Stations/MT001/MT001b/Hx')
+        self.assertEqual(hx_filtered.n_samples, 100)
+        self.assertTrue(np.allclose(hx_filtered.hdf5_dataset[()],
+                                    mtfilter.sos_filter(np.arange(100), sos)))
+
+        # the filter is recorded in the metadata in the file
+        self.mth5_obj.wrapper_cache.clear()
+        for channel, name in [(new_run.get_channel('Ex_filtered'), 
+                               'notch_low_pass'), 
+                              (new_run.get_channel('Ex'), 'sos_filter'),
+                              (filtered_run.get_channel('Hx'), 
+                               'sos_filter')]:
+            self.assertListEqual(channel.metadata.filter.name, [name])
+            self.assertListEqual(channel.metadata.filter.applied, [True])
+        
+        # filters already applied are kept
+        ex_2 = new_run.get_channel('Ex_filtered').apply_filter(
+            sos, channel_name='Ex_2')
+        self.assertListEqual(ex_2.metadata.filter.name, 
+                             ['notch_low_pass', 'sos_filter'])
+        self.assertListEqual(ex_2.metadata.filter.applied, [True, True])
+
+    def test_summary_table_index(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        for ii, comp in enumerate(['Ex', 'Ey', 'Hx', 'Hy']):
+            ch_metadata = metadata.Electric()
+            ch_metadata.sample_rate = 1
+            ch_metadata.time_period.start = f'2020-01-0{ii + 1}T00:00:00'
+            new_run.add_channel(comp, 'electric', np.zeros(10),
+                                channel_metadata=ch_metadata)
+        table = new_run.summary_table
+        self.assertIs(table, new_run.summary_table)
+        
+        start = '2020-01-02T00:00:00'
+        tests = [('component', 'hx', 'eq'), ('start', start, 'eq'),
+                 ('start', start, 'lt'), ('start', start, 'le'),
+                 ('start', start, 'gt'), ('start', start, 'ge'),
+                 ('start', [start, '2020-01-04T00:00:00'], 'be')]
+        expected = [table.locate(*test).tolist() for test in tests]
+        # between includes the end points
+        self.assertListEqual(expected[-1], [1, 2, 3])
+        self.assertRaises(ValueError, table.locate, 'start', 
+                          [start, '2020-01-04T00:00:00'], 'bt')
+        table.create_index('component')
+        table.create_index('start', kind='sorted')
+        self.assertDictEqual(table.indexes, {'component': 'hash',
+                                             'start': 'sorted'})
+        self.assertListEqual([table.locate(*test).tolist() 
+                              for test in tests], expected)
+        self.assertEqual(table.locate('component', 'hz').size, 0)
+        self.assertRaises(ValueError, table.create_index, 'start')
+        self.assertRaises(MTH5TableError, table.create_index, 'fail')
+        
+        # a write through another table object invalidates the cache
+        other = MTH5Table(table.hdf5_dataset)
+        row = np.array([table.values[2]], dtype=table.dtype)
+        row['component'] = 'hz'
+        other.add_row(row)
+        self.assertListEqual(table.locate('component', 'hz').tolist(), [4])
+        self.assertListEqual(table.locate('start', start, 'eq').tolist(),
+                             [1])
+        self.assertListEqual(table.locate('start', start, 'gt').tolist(),
+                             [2, 3, 4])
+        
+        # the write generation is shared while a table of the dataset exists
+        key = table.hdf5_dataset.id
+        self.assertIs(MTH5Table(table.hdf5_dataset)._table_generation,
+                      table._table_generation)
+        del table, other
+        new_run._summary_table = None
+        gc.collect()
+        self.assertNotIn(key, mth5_groups._TABLE_GENERATIONS)
+        
+    def test_summary_table_add_rows(self):
+        table = self.mth5_obj.stations_group.summary_table
+        self.assertEqual(table.nrows, 0)
+        rows = np.zeros(300, dtype=table.dtype)
+        rows['archive_id'] = ['{0:03}'.format(ii) for ii in range(300)]
+        rows['hdf5_reference'] = table.hdf5_reference
+        self.assertListEqual(table.add_rows(rows).tolist(), list(range(300)))
+        self.assertEqual(table.capacity, 300)
+        
+        # appending grows the capacity geometrically
+        index = table.add_row(rows[0:1])
+        self.assertEqual(index, 300)
+        self.assertEqual(table.capacity, 600)
+        self.assertEqual(len(table), 301)
+        self.assertEqual(table.values.shape, (301, ))
+        self.assertIs(table.array, table.hdf5_dataset)
+        self.assertEqual(table.array.shape, (600, ))
+        self.assertEqual(table.hdf5_dataset.attrs['n_rows'], 301)
+        self.assertListEqual(table.locate('archive_id', '000').tolist(),
+                             [0, 300])
+        self.assertRaises(IndexError, table.add_row, rows[0:1], 301)
+        self.assertRaises(MTH5TableError, table.add_rows, 
+                          np.repeat(rows[0:1], 700))
+        self.assertRaises(ValueError, table.add_rows, np.zeros(2))
+        
+        # a new table object of the same dataset has the same rows
+        self.assertEqual(self.mth5_obj.stations_group.summary_table.nrows,
+                         301)
+        
+    def test_summary_table_remove_rows(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        for comp in ['Ex', 'Ey', 'Hx', 'Hy']:
+            new_run.add_channel(comp, 'electric', np.zeros(10))
+        table = new_run.summary_table
+        table.create_index('component')
+        ey_row = np.array([table.values[1]], dtype=table.dtype)
+        
+        new_run.remove_channel('Ey')
+        self.assertListEqual(table.removed_rows.tolist(), [1])
+        self.assertEqual(table.nrows, 4)
+        self.assertEqual(table.locate('component', 'Ey').size, 0)
+        table.drop_index('component')
+        self.assertEqual(table.locate('component', 'Ey').size, 0)
+        self.assertEqual(table.locate('component', '').size, 0)
+        self.assertNotIn('Ey', str(table))
+        
+        # writing a row at a removed index puts it back
+        table.add_row(ey_row, index=1)
+        self.assertEqual(table.removed_rows.size, 0)
+        self.assertListEqual(table.locate('component', 'Ey').tolist(), [1])
+        
+        self.assertListEqual(table.remove_row(np.array([1, 3])).tolist(),
+                             [1, 3])
+        self.assertRaises(IndexError, table.remove_row, 4)
+        self.assertListEqual(table.compact().tolist(), [0, 2])
+        self.assertEqual(table.nrows, 2)
+        self.assertEqual(table.capacity, 2)
+        self.assertNotIn('removed_rows', table.hdf5_dataset.attrs)
+        self.assertListEqual(table.locate('component', 'Hx').tolist(), [1])
+        
+    def test_standards_attribute_index(self):
+        standards = self.mth5_obj.standards_group
+        table = standards.summary_table
+        index = table.locate('attribute', 'survey.release_license')
+        standards.get_attribute_information('survey.release_license')
+        self.assertIn('attribute', table.indexes)
+        self.assertListEqual(
+            table.locate('attribute', 'survey.release_license').tolist(),
+            index.tolist())
+        self.assertRaises(MTH5TableError, 
+                          standards.get_attribute_information, 'fail')
+        
+    def test_channel_catalog(self):
+        for station in ['MT001', 'MT002']:
+            new_run = self.mth5_obj.add_station(station).add_run('a')
+            for comp, sample_rate, month in [('Ex', 4096, '07'),
+                                             ('Hx', 4096, '07'),
+                                             ('Hy', 256, '08')]:
+                ch_metadata = metadata.Magnetic()
+                ch_metadata.sample_rate = sample_rate
+                ch_metadata.time_period.start = f'2020-{month}-10T00:00:00'
+                ch_metadata.time_period.end = f'2020-{month}-11T00:00:00'
+                new_run.add_channel(comp, 'magnetic', np.zeros(10),
+                                    channel_metadata=ch_metadata)
+        catalog = self.mth5_obj.channel_catalog
+        self.assertEqual(catalog.nrows, 6)
+        
+        df = self.mth5_obj.query_channels(component='Hx', sample_rate=4096,
+                                          start='2020-07-01', 
+                                          end='2020-08-01')
+        self.assertListEqual(df.station.tolist(), ['MT001', 'MT002'])
+        self.assertListEqual(df.n_samples.tolist(), [10, 10])
+        self.assertEqual(df.start.iloc[0].isoformat(), 
+                         '2020-07-10T00:00:00+00:00')
+        self.assertEqual(
+            self.mth5_obj.query_channels(component=['Hx', 'Hy'],
+                                         end='2020-07-01').shape[0], 0)
+        self.assertEqual(
+            self.mth5_obj.query_channels(start='2020-08-10T12:00:00'
+                                         ).shape[0], 2)
+        
+        # writing metadata updates the entry
+        hy = self.mth5_obj.get_channel('MT001', 'a', 'Hy')
+        hy.metadata.sample_rate = 512
+        hy.write_metadata()
+        df = self.mth5_obj.query_channels(station='MT001', channel='Hy')
+        self.assertListEqual(df.sample_rate.tolist(), [512])
+        
+        self.mth5_obj.remove_channel('MT001', 'a', 'Ex')
+        self.assertEqual(self.mth5_obj.query_channels(
+            station='MT001').shape[0], 2)
+        self.mth5_obj.remove_station('MT002')
+        self.assertListEqual(
+            self.mth5_obj.query_channels().channel.tolist(), ['Hx', 'Hy'])
+        
+        # the catalog is made from the channels if it is missing
+        stations = self.mth5_obj.stations_group
+        del stations.hdf5_group['Channel_Catalog']
+        catalog = stations.channel_catalog
+        self.assertListEqual(catalog.to_dataframe().channel.tolist(), 
+                             ['Hx', 'Hy'])
+        
+    def test_channel_catalog_read_once(self):
+        catalog = self.mth5_obj.channel_catalog
+        reads = []
+        read_column = catalog._read_column
+        def count_reads(column):
+            reads.append(column)
+            return read_column(column)
+        catalog._read_column = count_reads
+        
+        # the catalog of the file is used to add channels, and is only read
+        # to find the rows of existing channels
+        new_run = self.mth5_obj.add_station('MT001').add_run('a')
+        for comp in ['Ex', 'Ey', 'Hx', 'Hy', 'Hz']:
+            new_run.add_channel(comp, 'electric', np.zeros(16))
+        self.assertIs(self.mth5_obj.channel_catalog, catalog)
+        self.assertLessEqual(len(reads), 3)
+        self.assertListEqual(
+            self.mth5_obj.query_channels(run='a').channel.tolist(), 
+            ['Ex', 'Ey', 'Hx', 'Hy', 'Hz'])
+        
+        # changes made without the catalog are seen
+        other = ChannelCatalog.from_file(new_run.hdf5_group)
+        other.remove_channels(channel='Ey')
+        new_run.get_channel('Hx').write_metadata()
+        self.assertListEqual(
+            self.mth5_obj.query_channels(run='a').channel.tolist(), 
+            ['Ex', 'Hx', 'Hy', 'Hz'])
+        
+    def test_channel_catalog_long_names(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        runs = ['long_run_name_abcdefgh_1', 'long_run_name_abcdefgh_2']
+        for run in runs:
+            new_station.add_run(run).add_channel('Ex', 'electric', 
+                                                 np.zeros(16))
+        self.assertListEqual(self.mth5_obj.query_channels().run.tolist(), 
+                             runs)
+        self.assertListEqual(
+            self.mth5_obj.query_channels(run=runs[1]).run.tolist(), 
+            runs[1:])
+        
+        # names are never cut short
+        new_run = new_station.add_run('r' * 65)
+        self.assertRaises(MTH5Error, new_run.add_channel, 'Ex', 'electric',
+                          np.zeros(16))
+        new_station.remove_run('r' * 65)
+        
+        # catalogs of older files are made again for longer names
+        stations = self.mth5_obj.stations_group
+        old_dtype = np.dtype([(name, 'S20') if name in 
+                              ['station', 'run', 'channel', 'component'] 
+                              else (name, dtype[0]) for name, dtype in 
+                              ChannelCatalog.catalog_dtype.fields.items()])
+        del stations.hdf5_group['Channel_Catalog']
+        stations.hdf5_group.create_dataset('Channel_Catalog', (0, ), 
+                                           maxshape=(None, ), 
+                                           dtype=old_dtype)
+        stations.hdf5_group['Channel_Catalog'].attrs.update(
+            {'type': 'channel catalog', 'n_rows': 0})
+        self.mth5_obj.wrapper_cache.clear()
+        self.assertRaises(MTH5Error, new_station.get_run(runs[0]).add_channel, 
+                          'Ey', 'electric', np.zeros(16))
+        report = self.mth5_obj.rebuild_summaries()
+        self.assertIn('old channel catalog data type', 
+                      report['/Survey/Stations/Channel_Catalog'])
+        self.assertListEqual(
+            self.mth5_obj.query_channels(run=runs[0]).channel.tolist(), 
+            ['Ex', 'Ey'])
+        
+    def test_channel_catalog_writer(self):
+        new_run = self.mth5_obj.add_station('MT001').add_run('a')
+        ex_metadata = metadata.Electric()
+        ex_metadata.sample_rate = 8
+        ex_metadata.time_period.start = '2020-01-01T00:00:00'
+        with new_run.open_channel_writer('Ex', 'electric',
+                                         channel_metadata=ex_metadata,
+                                         chunk_size=16) as writer:
+            writer.append(np.arange(32, dtype=np.float32))
+        df = self.mth5_obj.query_channels()
+        self.assertListEqual(df.n_samples.tolist(), [32])
+        self.assertEqual(df.end.iloc[0].isoformat(),
+                         '2020-01-01T00:00:03.875000+00:00')
+        
+    def test_rebuild_summaries(self):
+        for station in ['MT001', 'MT002']:
+            new_station = self.mth5_obj.add_station(station)
+            for run in ['a', 'b']:
+                new_run = new_station.add_run(run)
+                for comp in ['Ex', 'Hy']:
+                    new_run.add_channel(comp, 'electric', np.zeros(10))
+        report = self.mth5_obj.rebuild_summaries(verify=True)
+        # station summary was never filled and run components are not
+        # updated when channels are added
+        self.assertListEqual(report['/Survey/Stations/Summary'],
+                             ['missing entry MT001', 'missing entry MT002'])
+        self.assertIn("a: components is b'' should be b'Ex,Hy'",
+                      report['/Survey/Stations/MT001/Summary'])
+        self.assertNotIn('/Survey/Stations/MT001/a/Summary', report)
+        self.assertEqual(self.mth5_obj.stations_group.summary_table.nrows, 0)
+        
+        self.mth5_obj.rebuild_summaries()
+        self.assertDictEqual(self.mth5_obj.rebuild_summaries(verify=True), 
+                             {})
+        stations = self.mth5_obj.stations_group
+        self.assertListEqual(
+            stations.summary_table.values['components'].tolist(), 
+            [b'Ex,Hy', b'Ex,Hy'])
+        
+        # drift from editing the file directly
+        del stations.hdf5_group['MT002/b']
+        run = self.mth5_obj.get_run('MT001', 'a')
+        del run.hdf5_group['Hy']
+        del run.hdf5_group['Summary']
+        report = self.mth5_obj.rebuild_summaries(verify=True)
+        self.assertListEqual(report['/Survey/Stations/MT001/a/Summary'],
+                             ['missing summary table'])
+        self.assertListEqual(report['/Survey/Stations/MT002/Summary'],
+                             ['extra entry b'])
+        self.assertIn('extra entry MT001/a/Hy', 
+                      report['/Survey/Stations/Channel_Catalog'])
+        
+        self.mth5_obj.rebuild_summaries()
+        self.assertDictEqual(self.mth5_obj.rebuild_summaries(verify=True), 
+                             {})
+        self.assertEqual(self.mth5_obj.query_channels().shape[0], 5)
+        self.assertListEqual(
+            self.mth5_obj.get_run('MT001', 'a').summary_table.values[
+                'component'].tolist(), [b'Ex'])
+        
     def test_get_channel_fail(self):
         new_station = self.mth5_obj.add_station('MT001')
         new_station.add_run('MT001a')
         self.assertRaises(MTH5Error, self.mth5_obj.get_channel, 
                           'MT001', 'MT001a', 'Ey')
 
+    def test_wrapper_cache(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        ex = new_run.add_channel('Ex', 'electric', np.zeros(16))
+        stations = self.mth5_obj.stations_group
+        self.assertIs(stations, self.mth5_obj.stations_group)
+        self.assertIs(stations.get_station('MT001'), new_station)
+        self.assertIs(new_station.get_run('MT001a'), new_run)
+        self.assertIs(self.mth5_obj.get_channel('MT001', 'MT001a', 'Ex'), ex)
+
+        # typed containers from references
+        self.assertIs(
+            self.mth5_obj.from_reference(new_run.hdf5_group.ref), new_run)
+        self.assertIs(
+            self.mth5_obj.from_reference(ex.metadata.hdf5_reference), ex)
+        self.assertIsInstance(
+            self.mth5_obj.from_reference(
+                self.mth5_obj.survey_group.hdf5_group.ref),
+            mth5.m5groups.SurveyGroup)
+        self.assertIsInstance(
+            self.mth5_obj.from_reference(
+                new_run.summary_table.hdf5_dataset.ref), MTH5Table)
+
+        # removing invalidates only the cached containers of the channel
+        new_run.remove_channel('Ex')
+        ex = new_run.add_channel('Ex', 'magnetic', np.zeros(16))
+        self.assertIsInstance(new_run.get_channel('Ex'),
+                              mth5.m5groups.MagneticDataset)
+        self.assertIs(new_run.get_channel('Ex'), ex)
+        self.assertIs(stations.get_station('MT001'), new_station)
+        self.assertIs(new_station.get_run('MT001a'), new_run)
+        
+        # removing a run removes the containers below it
+        new_station.remove_run('MT001a')
+        new_run = new_station.add_run('MT001a')
+        self.assertIs(new_station.get_run('MT001a'), new_run)
+        self.assertRaises(MTH5Error, new_run.get_channel, 'Ex')
+
+        self.mth5_obj.wrapper_cache.clear()
+        self.assertEqual(len(self.mth5_obj.wrapper_cache), 0)
+        self.assertIsNot(stations.get_station('MT001'), new_station)
+        
+    def test_wrapper_cache_changed_metadata(self):
+        new_station = self.mth5_obj.add_station('MT001')
+        new_run = new_station.add_run('MT001a')
+        ex = new_run.add_channel('Ex', 'electric', np.zeros(16))
+        ex.metadata.sample_rate = 16
+        ex.metadata.filter.name = ['low_pass']
+        ex.write_metadata()
+        self.assertIs(new_run.get_channel('Ex'), ex)
+        
+        # metadata changed and not written is not returned
+        ex.metadata.sample_rate = 8
+        ex.metadata.filter.name.append('notch')
+        new_ex = new_run.get_channel('Ex')
+        self.assertIsNot(new_ex, ex)
+        self.assertEqual(new_ex.metadata.sample_rate, 16)
+        self.assertListEqual(new_ex.metadata.filter.name, ['low_pass'])
+        self.assertIs(new_run.get_channel('Ex'), new_ex)
+        
+    def test_wrapper_cache_per_file(self):
+        self.mth5_obj.add_station('MT001')
+        other_fn = fn_path.joinpath('test_other.mth5')
+        other = mth5.MTH5()
+        other.open_mth5(other_fn, mode='w')
+        try:
+            other.add_station('MT001')
+            self.assertIsNot(other.get_station('MT001'), 
+                             self.mth5_obj.get_station('MT001'))
+            self.assertIsNot(other.wrapper_cache, self.mth5_obj.wrapper_cache)
+        finally:
+            other.close_mth5()
+            other_fn.unlink()
+        self.assertEqual(len(other.wrapper_cache), 0)
+        self.assertGreater(len(self.mth5_obj.wrapper_cache), 0)
+
+    def test_wrapper_cache_max_size(self):
+        self.mth5_obj.wrapper_cache.max_size = 2
+        new_station = self.mth5_obj.add_station('MT001')
+        for run in ['a', 'b', 'c']:
+            new_station.add_run(run)
+        self.assertEqual(len(self.mth5_obj.wrapper_cache), 2)
+        self.assertIsInstance(new_station.get_run('a'),
+                              mth5.m5groups.RunGroup)
+
     def tearDown(self):
         self.mth5_obj.close_mth5()
     
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for MTH5 logging setup
+
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import logging
+import logging.handlers
+import os
+import tempfile
+import unittest
+
+import mth5
+from mth5.utils import mth5logger
+from mth5.utils.mth5logger import ClassLogger
+from mth5.utils.mttime import MTime
+# =============================================================================
+# Tests
+# =============================================================================
+class TestClassLogger(unittest.TestCase):
+    def test_cached_per_class(self):
+        t1 = MTime()
+        t2 = MTime()
+        self.assertIs(t1.logger, t2.logger)
+        self.assertIs(t1.logger, MTime.logger)
+        self.assertEqual(t1.logger.name, 'mth5.utils.mttime.MTime')
+        self.assertNotIn('logger', t1.__dict__)
+
+    def test_subclass(self):
+        class Parent():
+            logger = ClassLogger()
+
+        class Child(Parent):
+            pass
+
+        self.assertTrue(Parent.logger.name.endswith('Parent'))
+        self.assertTrue(Child.logger.name.endswith('Child'))
+        self.assertIs(Child().logger, Child.logger)
+
+    def test_instance_override(self):
+        t1 = MTime()
+        t1.logger = logging.getLogger('test')
+        self.assertEqual(t1.logger.name, 'test')
+        self.assertEqual(MTime().logger.name, 'mth5.utils.mttime.MTime')
+
+
+class TestConfigureLogging(unittest.TestCase):
+    def setUp(self):
+        self.root = logging.getLogger()
+        self.root_handlers = list(self.root.handlers)
+        self.root_level = self.root.level
+        self.mth5_level = logging.getLogger('mth5').level
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def test_null_handler(self):
+        self.assertTrue(any(isinstance(h, logging.NullHandler)
+                            for h in logging.getLogger('mth5').handlers))
+
+    def test_configure(self):
+        listener = mth5.configure_logging(level='INFO')
+        self.assertIsNone(listener)
+        self.assertEqual(logging.getLogger('mth5').level, logging.INFO)
+        self.assertIn('mth5_debug.log', os.listdir(self.tmp.name))
+
+    def test_configure_queue(self):
+        listener = mth5.configure_logging(use_queue=True)
+        self.assertIsInstance(listener, logging.handlers.QueueListener)
+        self.assertFalse(any(isinstance(h, logging.FileHandler)
+                             for h in self.root.handlers))
+        self.assertTrue(any(isinstance(h, logging.handlers.QueueHandler)
+                            for h in self.root.handlers))
+
+        MTime().logger.warning('queued %s', 'message')
+        mth5logger.stop_queue_listener()
+        with open(os.path.join(self.tmp.name, 'mth5_error.log')) as fid:
+            self.assertIn('queued message', fid.read())
+
+    def tearDown(self):
+        mth5logger.stop_queue_listener()
+        for handler in list(self.root.handlers):
+            self.root.removeHandler(handler)
+            if handler not in self.root_handlers:
+                handler.close()
+        for handler in self.root_handlers:
+            self.root.addHandler(handler)
+        self.root.setLevel(self.root_level)
+        logging.getLogger('mth5').setLevel(self.mth5_level)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+# =============================================================================
+# Run
+# =============================================================================
+if __name__ == '__main__':
+    unittest.main()
@@ -6,8 +6,10 @@ Created on Thu May 21 14:09:17 2020
 @author: jpeacock
 """
 
+import datetime
 import unittest
-from mth5.utils.mttime import MTime
+import numpy as np
+from mth5.utils.mttime import MTime, MTimeArray
 from mth5.utils.exceptions import MTTimeError
 
 # =============================================================================
@@ -65,6 +67,97 @@ class TestMTime(unittest.TestCase):
         self.assertTrue(dt_01 == dt_02.epoch_seconds)
         self.assertTrue(dt_01 >= dt_02)
         self.assertTrue(dt_01 <= dt_02)
+
+    def test_iso_fast_path(self):
+        utc = datetime.timezone.utc
+        for dt_str, dt_true in [
+                ('2020-01-02T12:15:20.1234', 
+                 datetime.datetime(2020, 1, 2, 12, 15, 20, 123400, utc)),
+                ('2020-01-02 12:15:20', 
+                 datetime.datetime(2020, 1, 2, 12, 15, 20, tzinfo=utc)),
+                ('2020-01-02T12:15:20.123400+00:00', 
+                 datetime.datetime(2020, 1, 2, 12, 15, 20, 123400, utc)),
+                ('2020-01-02', datetime.datetime(2020, 1, 2, tzinfo=utc)),
+                ('2020-01-02T12:15:20Z', 
+                 datetime.datetime(2020, 1, 2, 12, 15, 20, tzinfo=utc))]:
+            with self.subTest(dt_str=dt_str):
+                t = MTime(dt_str)
+                self.assertEqual(t.dt_object, dt_true)
+                self.assertEqual(t.dt_object.utcoffset(), 
+                                 datetime.timedelta(0))
+                
+    def test_add_keeps_ns(self):
+        t = MTime('2020-01-02T12:15:20.123456789')
+        t_add = t + datetime.timedelta(seconds=1, microseconds=1)
+        self.assertEqual(t_add.epoch_ns, 1577967321123457789)
+        self.assertEqual(t.epoch_ns, 1577967320123456789)
+        self.assertEqual(
+            (t + datetime.timedelta(days=-1)).epoch_ns, 
+            1577967320123456789 - 86400 * 10**9)
+
+    def test_epoch_ns(self):
+        t = MTime('2020-01-02T12:15:20.123456789')
+        self.assertEqual(t.epoch_ns, 1577967320123456789)
+        self.assertEqual(t.microseconds, 123456)
+        self.assertEqual(t.datetime64, 
+                         np.datetime64('2020-01-02T12:15:20.123456789'))
+        self.assertEqual(MTime(t.datetime64).epoch_ns, t.epoch_ns)
+        self.assertTrue(MTime('2020-01-02T12:15:20.123456') < t)
+
+        t.epoch_ns = 1577967320123400000
+        self.assertEqual(t.iso_str, self.dt_true)
+
+    def test_non_utc_fail(self):
+        self.assertRaises(ValueError, MTime, '2020-01-02T12:15:20+05:00')
+
+
+class TestMTimeArray(unittest.TestCase):
+    def setUp(self):
+        self.times = ['2020-01-01T00:00:00', '2020-01-01T00:00:01+00:00',
+                      '2020-01-01 00:00:02Z', '2020-01-01T00:00:03.000000001']
+        self.ns = np.array([0, 1000000000, 2000000000, 3000000001],
+                           dtype=np.int64) + 1577836800000000000
+        self.mtimes = MTimeArray(self.times)
+
+    def test_parse(self):
+        self.assertListEqual(self.mtimes.ns.tolist(), self.ns.tolist())
+        self.assertEqual(self.mtimes.ns.dtype, np.int64)
+        self.assertListEqual(MTimeArray(self.mtimes.datetime64).ns.tolist(),
+                             self.ns.tolist())
+        self.assertListEqual(
+            MTimeArray([MTime(t) for t in self.times]).ns.tolist(),
+            self.ns.tolist())
+        self.assertListEqual(MTimeArray(['01-02-20']).iso_str,
+                             ['2020-01-02T00:00:00.000000+00:00'])
+        self.assertRaises(ValueError, MTimeArray, 
+                          ['2020-01-01T00:00:00+05:00'])
+
+    def test_compare(self):
+        self.assertListEqual((self.mtimes > '2020-01-01T00:00:01').tolist(),
+                             [False, False, True, True])
+        self.assertListEqual((self.mtimes == MTime(self.times[0])).tolist(),
+                             [True, False, False, False])
+        self.assertListEqual((self.mtimes <= self.mtimes).tolist(),
+                             [True] * 4)
+        self.assertEqual(self.mtimes.searchsorted('2020-01-01T00:00:01.5'), 2)
+
+    def test_arithmetic(self):
+        shifted = self.mtimes + datetime.timedelta(seconds=1)
+        self.assertIsInstance(shifted, MTimeArray)
+        self.assertListEqual((shifted.ns - self.ns).tolist(),
+                             [1000000000] * 4)
+        self.assertListEqual((shifted - np.timedelta64(1, 's')).ns.tolist(),
+                             self.ns.tolist())
+        self.assertTrue(((shifted - self.mtimes) == 
+                         np.timedelta64(1, 's')).all())
+        self.assertRaises(MTTimeError, self.mtimes.__add__, 1)
+
+    def test_from_sample_rate(self):
+        mtimes = MTimeArray.from_sample_rate(self.times[0], 4, 4)
+        self.assertListEqual((mtimes.ns - self.ns[0]).tolist(),
+                             [0, 250000000, 500000000, 750000000])
+        self.assertEqual(mtimes[-1].iso_str, '2020-01-01T00:00:00.750000+00:00')
+        self.assertIsInstance(mtimes[1:], MTimeArray)
         
         
 # =============================================================================
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for reading channels in parallel
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import pickle
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from mth5 import mth5
+from mth5.parallel import ChannelLocator, read_many, _read_tasks
+from mth5.utils.exceptions import MTH5Error
+
+fn_path = Path(__file__).parent
+# =============================================================================
+# Tests
+# =============================================================================
+class TestParallel(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.fn = fn_path.joinpath('test_parallel.mth5')
+        mth5_obj = mth5.MTH5()
+        mth5_obj.open_mth5(cls.fn, mode='w')
+        cls.data = {}
+        cls.locators = []
+        for station in ['MT001', 'MT002']:
+            run = mth5_obj.add_station(station).add_run('a')
+            for ii, (comp, dtype) in enumerate([('Ex', np.float32),
+                                                 ('Hx', np.float64),
+                                                 ('Hz', np.int32)]):
+                data = (np.arange(1000 + ii) * (ii + 1)).astype(dtype)
+                channel = run.add_channel(comp, 'electric', data)
+                cls.locators.append(ChannelLocator.from_channel(channel))
+                cls.data[cls.locators[-1]] = data
+        mth5_obj.close_mth5()
+
+    def test_locator(self):
+        locator = self.locators[0]
+        self.assertEqual(locator.path, '/Survey/Stations/MT001/a/Ex')
+        self.assertEqual(pickle.loads(pickle.dumps(locator)), locator)
+        self.assertTrue(np.array_equal(locator.read(), self.data[locator]))
+
+        part = ChannelLocator(self.fn, locator.path, start=10, stop=20)
+        self.assertTrue(np.array_equal(part.read(),
+                                       self.data[locator][10:20]))
+
+    def test_read_many(self):
+        locators = self.locators + [
+            ChannelLocator(self.fn, self.locators[1].path, start=5, stop=50),
+            ChannelLocator(self.fn, self.locators[2].path, start=-10),
+            ChannelLocator(self.fn, self.locators[0].path, start=10,
+                           stop=10)]
+        expected = [self.data[locator] for locator in self.locators] + [
+            self.data[self.locators[1]][5:50],
+            self.data[self.locators[2]][-10:],
+            self.data[self.locators[0]][10:10]]
+
+        for max_workers in [0, 2]:
+            with self.subTest(max_workers=max_workers):
+                arrays = read_many(locators, max_workers=max_workers)
+                self.assertEqual(len(arrays), len(expected))
+                for array, data in zip(arrays, expected):
+                    self.assertEqual(array.dtype, data.dtype)
+                    self.assertTrue(np.array_equal(array, data))
+                    # arrays are in memory of this process, not on the 
+                    # released shared memory block
+                    base = array
+                    while base.base is not None:
+                        base = base.base
+                    self.assertNotIsInstance(base, memoryview)
+
+    def test_read_many_empty(self):
+        self.assertListEqual(read_many([]), [])
+
+    def test_read_many_fail(self):
+        self.assertRaises(MTH5Error, read_many,
+                          [ChannelLocator(self.fn, '/Survey/Stations/Ey')])
+        self.assertRaises(MTH5Error, read_many, ['/Survey/Stations/Ey'])
+
+    def test_read_tasks_fail(self):
+        from multiprocessing import shared_memory
+
+        # a selection larger than the array fails in read_direct, that
+        # error is raised and not the one of closing the block in use
+        locator = self.locators[0]
+        tasks = [(locator.filename, locator.path, (slice(None), ), 0, (10, ),
+                  self.data[locator].dtype.str)]
+        shm = shared_memory.SharedMemory(create=True, size=64)
+        try:
+            with self.assertRaises(Exception) as context:
+                _read_tasks(shm.name, tasks)
+            self.assertNotIsInstance(context.exception, BufferError)
+        finally:
+            shm.close()
+            shm.unlink()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.fn.unlink()
+
+# =============================================================================
+# Run
+# =============================================================================
+if __name__ == '__main__':
+    unittest.main()
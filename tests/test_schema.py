@@ -11,7 +11,15 @@ Created on Tue Apr 28 18:08:40 2020
 # Imports
 # =============================================================================
 
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
 import unittest
+from pathlib import Path
+from unittest import mock
+
 from mth5.standards import schema
 from mth5.utils.exceptions import MTSchemaError
 
@@ -131,10 +139,123 @@ class TestValidators(unittest.TestCase):
         valid_alias = schema.validate_alias(self.alias)
         self.assertIsInstance(valid_alias, list)
         self.assertListEqual(valid_alias, ['other_name'])
+
+class TestStandards(unittest.TestCase):
+    def setUp(self):
+        self.standards = schema.Standards()
+        
+    def test_read_once(self):
+        self.standards.run_dict
+        self.standards.station_dict
+        misses = schema._read_csv.cache_info().misses
+        schema.Standards().run_dict
+        schema.Standards().station_dict
+        self.assertEqual(misses, schema._read_csv.cache_info().misses)
+        self.assertIs(self.standards.run_dict, schema.Standards().run_dict)
+        
+    def test_read_only(self):
+        run_dict = self.standards.run_dict
+        self.assertRaises(MTSchemaError, run_dict.update, 
+                          {'new': run_dict['id']})
+        self.assertRaises(MTSchemaError, run_dict.add_dict, 
+                          self.standards.person_dict, 'person')
+        with self.assertRaises(TypeError):
+            run_dict['id']['units'] = 'm'
+        # lists are tuples so they cannot be changed in place
+        self.assertIsInstance(run_dict['id']['alias'], tuple)
+        with self.assertRaises(AttributeError):
+            run_dict['id']['alias'].append('run_id')
+        
+    def test_copy(self):
+        run_dict = self.standards.run_dict.copy()
+        run_dict['id']['units'] = 'm'
+        run_dict['id']['alias'].append('run_id')
+        run_dict.add_dict(self.standards.declination_dict, 'declination')
+        self.assertIn('declination.value', list(run_dict.keys()))
+        self.assertNotIn('declination.value', 
+                         list(self.standards.run_dict.keys()))
+        self.assertIsNone(self.standards.run_dict['id']['units'])
+        self.assertNotIn('run_id', self.standards.run_dict['id']['alias'])
+
+    def test_standards_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # the cache directory is made if needed
+            cache_fn = Path(temp_dir).joinpath('mth5', 
+                                               'standards_cache.pickle')
+            self.assertTrue(schema.save_standards_cache(cache_fn))
+            run_dict = self.standards.run_dict
+            
+            schema._STANDARDS_REGISTRY.clear()
+            self.assertTrue(schema.load_standards_cache(cache_fn))
+            self.assertDictEqual(dict(run_dict.__dict__), 
+                                 dict(schema.Standards().run_dict.__dict__))
+            
+            # a cache from different csv files is not loaded
+            with open(cache_fn, 'rb') as fid:
+                cache = pickle.load(fid)
+            cache['key'] = 'old'
+            with open(cache_fn, 'wb') as fid:
+                pickle.dump(cache, fid)
+            self.assertFalse(schema.load_standards_cache(cache_fn))
+            self.assertFalse(schema.load_standards_cache(
+                Path(temp_dir).joinpath('none.pickle')))
+            
+    def test_standards_cache_not_in_package(self):
+        self.assertNotEqual(schema.get_cache_fn().parent, schema.CSV_PATH)
         
-    
-    
+    def test_standards_cache_not_written_on_import(self):
+        package_path = Path(__file__).resolve().parent.parent
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [str(package_path)] +
+            [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p])
+        # run from a temporary directory so the log files end up there
+        with tempfile.TemporaryDirectory() as temp_dir, \
+                tempfile.TemporaryDirectory() as cwd:
+            env['XDG_CACHE_HOME'] = temp_dir
+            subprocess.run([sys.executable, '-c', 
+                            'import mth5.metadata, mth5.mth5'],
+                           env=env, cwd=cwd, check=True, capture_output=True)
+            self.assertListEqual(os.listdir(temp_dir), [])
+            
+            # the cache is made when the standards are first used
+            subprocess.run([sys.executable, '-c', 
+                            'from mth5 import metadata; metadata.Station()'],
+                           env=env, cwd=cwd, check=True, capture_output=True)
+            self.assertListEqual(os.listdir(temp_dir), ['mth5'])
+            
+    def test_standards_cache_read_only(self):
+        with mock.patch.object(schema.Path, 'mkdir', 
+                               side_effect=PermissionError('read only')):
+            self.assertFalse(schema.save_standards_cache())
+        with mock.patch.object(schema, 'get_cache_dir', 
+                               side_effect=RuntimeError('no home')):
+            self.assertFalse(schema.save_standards_cache())
+            self.assertFalse(schema.load_standards_cache())
         
+    def test_csv_key(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            csv_fn = Path(temp_dir).joinpath('run.csv')
+            csv_fn.write_text('attribute,type\n')
+            key = schema.get_csv_key([csv_fn])
+            self.assertEqual(key, schema.get_csv_key([csv_fn]))
+            
+            csv_fn.write_text('attribute,type,required\n')
+            self.assertNotEqual(key, schema.get_csv_key([csv_fn]))
+            csv_fn.unlink()
+            self.assertEqual(schema.get_csv_key([csv_fn]), 
+                             (('run.csv', None, None), ))
+            
+    def test_standards_cache_temp_file_removed(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            cache_fn = Path(temp_dir).joinpath('standards_cache.pickle')
+            with mock.patch.object(schema.pickle, 'dump', 
+                                   side_effect=TypeError('cannot pickle')):
+                self.assertFalse(schema.save_standards_cache(cache_fn))
+            with mock.patch.object(schema.pickle, 'dump', 
+                                   side_effect=pickle.PicklingError()):
+                self.assertFalse(schema.save_standards_cache(cache_fn))
+            self.assertListEqual(os.listdir(temp_dir), [])
                 
         
 # =============================================================================
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+Test single writer multiple reader mode.
+
+The reader runs in a fresh interpreter because HDF5 shares a file that is
+opened twice in one process, so a reader in the same process would just be
+the writer.
+
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from mth5 import mth5, metadata
+from mth5.utils.exceptions import MTH5Error, MTH5TableError
+
+package_path = Path(__file__).parent.parent
+fn_path = Path(__file__).parent
+
+READER = """
+import sys
+from mth5 import mth5
+reader = mth5.MTH5()
+reader.open_mth5(sys.argv[1], 'r', swmr=True)
+hx = reader.get_channel('MT001', 'MT001a', 'Hx')
+print(hx.n_samples, flush=True)
+sys.stdin.readline()
+reader.refresh()
+run = reader.get_run('MT001', 'MT001a')
+print(hx.n_samples, run.summary_table.values['end'][0].decode(), flush=True)
+catalog = reader.query_channels(channel='Hx')
+print(catalog.n_samples[0], catalog.end[0].isoformat(), flush=True)
+reader.close_mth5()
+"""
+
+HOLD = """
+import sys
+from mth5 import mth5
+reader = mth5.MTH5()
+reader.open_mth5(sys.argv[1], 'r', swmr=True)
+print('open', flush=True)
+sys.stdin.readline()
+reader.close_mth5()
+"""
+# =============================================================================
+# Tests
+# =============================================================================
+class TestSWMR(unittest.TestCase):
+    def setUp(self):
+        self.fn = fn_path.joinpath('test_swmr.mth5')
+        self.mth5_obj = mth5.MTH5()
+        self.mth5_obj.open_mth5(self.fn, mode='w', swmr=True)
+        # the reader runs here so its log files end up here
+        self.reader_dir = tempfile.TemporaryDirectory()
+        self.mth5_obj.add_station('MT001')
+        run = self.mth5_obj.add_run('MT001', 'MT001a')
+        hx_metadata = metadata.Magnetic()
+        hx_metadata.sample_rate = 8
+        hx_metadata.time_period.start = '2020-01-01T00:00:00+00:00'
+        self.writer = run.open_channel_writer('Hx', 'magnetic',
+                                              channel_metadata=hx_metadata,
+                                              chunk_size=16)
+
+    def start_reader(self, script=READER):
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [str(package_path)] +
+            [p for p in env.get('PYTHONPATH', '').split(os.pathsep) if p])
+        return subprocess.Popen([sys.executable, '-c', script, str(self.fn)],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, env=env,
+                                cwd=self.reader_dir.name,
+                                universal_newlines=True)
+
+    def test_swmr_write_read(self):
+        self.writer.append(np.arange(16))
+        self.mth5_obj.start_swmr_write()
+        self.assertTrue(self.mth5_obj.swmr_mode)
+
+        reader = self.start_reader()
+        try:
+            self.assertEqual(reader.stdout.readline().strip(), '16')
+            self.writer.append(np.arange(16))
+            reader.stdin.write('\n')
+            reader.stdin.flush()
+            self.assertEqual(reader.stdout.readline().split(),
+                             ['32', '2020-01-01T00:00:03.875000+00:00'])
+            self.assertEqual(reader.stdout.readline().split(),
+                             ['32', '2020-01-01T00:00:03.875000+00:00'])
+            self.assertEqual(reader.wait(timeout=60), 0,
+                             reader.stderr.read())
+        finally:
+            reader.kill()
+            reader.stdout.close()
+            reader.stderr.close()
+            reader.stdin.close()
+
+        hx = self.writer.close()
+        self.assertEqual(hx.n_samples, 32)
+
+    def test_swmr_metadata_written_on_close(self):
+        self.writer.append(np.arange(16))
+        # station summaries are not filled when stations are added
+        self.mth5_obj.rebuild_summaries()
+        self.mth5_obj.start_swmr_write()
+        self.writer.append(np.arange(16))
+        self.writer.close()
+        self.mth5_obj.close_mth5()
+        
+        self.mth5_obj.open_mth5(self.fn, mode='a')
+        hx = self.mth5_obj.get_channel('MT001', 'MT001a', 'Hx')
+        self.assertEqual(hx.metadata.time_period.end, 
+                         '2020-01-01T00:00:03.875000+00:00')
+        self.assertEqual(
+            self.mth5_obj.query_channels().end.iloc[0].isoformat(), 
+            '2020-01-01T00:00:03.875000+00:00')
+        self.assertDictEqual(self.mth5_obj.rebuild_summaries(verify=True), 
+                             {})
+
+    def test_swmr_metadata_kept_while_reading(self):
+        self.writer.append(np.arange(16))
+        self.mth5_obj.start_swmr_write()
+        reader = self.start_reader(HOLD)
+        try:
+            self.assertEqual(reader.stdout.readline().strip(), 'open')
+            self.writer.append(np.arange(16))
+            self.writer.close()
+            # the file cannot be opened to write the metadata
+            self.assertRaises(MTH5Error, self.mth5_obj.close_mth5)
+            self.assertFalse(self.mth5_obj.h5_is_read())
+            reader.stdin.write('\n')
+            reader.stdin.flush()
+            self.assertEqual(reader.wait(timeout=60), 0, 
+                             reader.stderr.read())
+        finally:
+            reader.kill()
+            reader.stdout.close()
+            reader.stderr.close()
+            reader.stdin.close()
+            
+        self.mth5_obj.close_mth5()
+        self.mth5_obj.open_mth5(self.fn, mode='r')
+        hx = self.mth5_obj.get_channel('MT001', 'MT001a', 'Hx')
+        self.assertEqual(hx.metadata.time_period.end, 
+                         '2020-01-01T00:00:03.875000+00:00')
+        
+    def test_swmr_tables_attributes(self):
+        run = self.mth5_obj.get_run('MT001', 'MT001a')
+        self.mth5_obj.start_swmr_write()
+        self.writer.append(np.arange(16))
+        tables = [run.summary_table, self.mth5_obj.channel_catalog]
+        attrs = [dict(table.hdf5_dataset.attrs) for table in tables]
+        self.writer.append(np.arange(16))
+        self.writer.close()
+        for table, table_attrs in zip(tables, attrs):
+            self.assertEqual(table.nrows, 1)
+            self.assertListEqual(sorted(table.hdf5_dataset.attrs.keys()),
+                                 sorted(table_attrs.keys()))
+            self.assertEqual(table.hdf5_dataset.attrs['n_rows'], 
+                             table_attrs['n_rows'])
+            # rows cannot be added or removed
+            self.assertRaises(MTH5TableError, table.add_row, table.values[0:1])
+            self.assertRaises(MTH5TableError, table.remove_row, 0)
+            
+    def test_swmr_no_new_objects(self):
+        self.mth5_obj.start_swmr_write()
+        # starting again does nothing
+        self.mth5_obj.start_swmr_write()
+        self.assertEqual(self.writer.append(np.arange(8)), 8)
+        self.assertEqual(
+            self.mth5_obj.get_run('MT001', 'MT001a').summary_table.values[
+                'n_samples'].tolist(), [8])
+
+    def test_swmr_old_format(self):
+        self.writer.close()
+        self.mth5_obj.close_mth5()
+        self.mth5_obj.open_mth5(self.fn, mode='w')
+        self.assertRaises(MTH5Error, self.mth5_obj.start_swmr_write)
+        self.assertFalse(self.mth5_obj.swmr_mode)
+
+    def test_read_mode_groups(self):
+        self.writer.close()
+        self.mth5_obj.close_mth5()
+        self.mth5_obj.open_mth5(self.fn, mode='r')
+        self.assertIsNotNone(self.mth5_obj.stations_group)
+        self.assertEqual(
+            self.mth5_obj.get_channel('MT001', 'MT001a', 'Hx').n_samples, 0)
+        self.assertRaises(MTH5Error, self.mth5_obj.start_swmr_write)
+
+    def tearDown(self):
+        self.mth5_obj.close_mth5()
+        self.fn.unlink()
+        self.reader_dir.cleanup()
+
+# =============================================================================
+# Run
+# =============================================================================
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Tests for MTTS
+
+"""
+# =============================================================================
+# Imports
+# =============================================================================
+import unittest
+import numpy as np
+
+from mth5 import metadata
+from mth5.timeseries import MTTS, MTTSError
+# =============================================================================
+# Tests
+# =============================================================================
+class TestMTTS(unittest.TestCase):
+    def setUp(self):
+        self.metadata = metadata.Electric()
+        self.metadata.sample_rate = 4
+        self.metadata.time_period.start = '2020-01-01T00:00:00'
+        self.data = np.arange(16, dtype=np.float32)
+        self.mtts = MTTS('electric', data=self.data,
+                         channel_metadata=self.metadata)
+
+    def test_implicit_time_axis(self):
+        self.assertNotIn('time', self.mtts.ts.coords)
+        self.assertEqual(self.mtts.ts.nbytes, self.data.nbytes)
+        self.assertEqual(self.mtts.n_samples, 16)
+        self.assertEqual(self.mtts.sample_rate, 4)
+        self.assertEqual(self.mtts.start, '2020-01-01T00:00:00+00:00')
+        self.assertEqual(self.mtts.end, '2020-01-01T00:00:03.750000+00:00')
+        self.assertEqual(self.mtts.metadata.time_period.end,
+                         '2020-01-01T00:00:03.750000+00:00')
+
+    def test_time_index(self):
+        time_index = self.mtts.time_index
+        self.assertEqual(time_index.dtype, np.dtype('datetime64[ns]'))
+        self.assertEqual(time_index.size, 16)
+        self.assertEqual(time_index[1], 
+                         np.datetime64('2020-01-01T00:00:00.25'))
+        self.assertNotIn('time', self.mtts.ts.coords)
+
+    def test_materialize_time(self):
+        ts = self.mtts.materialize_time()
+        self.assertIn('time', ts.coords)
+        self.assertListEqual(
+            ts.sel(time=slice('2020-01-01T00:00:01',
+                              '2020-01-01T00:00:01.5')).values.tolist(),
+            [4, 5, 6])
+
+    def test_set_start(self):
+        self.mtts.start = '2020-01-02T00:00:00'
+        self.assertEqual(self.mtts.end, '2020-01-02T00:00:03.750000+00:00')
+        self.assertEqual(self.mtts.time_index[0], 
+                         np.datetime64('2020-01-02T00:00:00'))
+
+        self.mtts.materialize_time()
+        self.mtts.start = '2020-01-03T00:00:00'
+        self.assertEqual(self.mtts.ts.time.values[-1],
+                         np.datetime64('2020-01-03T00:00:03.75'))
+
+    def test_get_slice(self):
+        ts_slice = self.mtts.get_slice('2020-01-01T00:00:01',
+                                       '2020-01-01T00:00:02')
+        self.assertListEqual(ts_slice.values.tolist(), [4, 5, 6, 7, 8])
+        self.assertEqual(ts_slice.attrs['time_period.start'],
+                         '2020-01-01T00:00:01+00:00')
+        self.assertEqual(ts_slice.attrs['time_period.end'],
+                         '2020-01-01T00:00:02+00:00')
+
+    def test_get_slice_view(self):
+        ts_slice = self.mtts.get_slice('2020-01-01T00:00:01',
+                                       '2020-01-01T00:00:02')
+        self.assertTrue(np.shares_memory(ts_slice.values, 
+                                         self.mtts.ts.values))
+        self.assertEqual(self.mtts.ts.attrs['time_period.start'],
+                         '2020-01-01T00:00:00+00:00')
+
+    def test_get_slice_index(self):
+        self.assertEqual(self.mtts.get_slice_index('2020-01-01T00:00:00.9',
+                                                   '2020-01-01T00:00:02.1'),
+                         (4, 9))
+        self.assertEqual(self.mtts.get_slice_index('2019-12-31T00:00:00',
+                                                   '2020-01-02T00:00:00'),
+                         (0, 16))
+        self.mtts.materialize_time()
+        self.assertEqual(self.mtts.get_slice_index('2020-01-01T00:00:00.9',
+                                                   '2020-01-01T00:00:02.1'),
+                         (4, 9))
+
+    def test_get_slice_irregular_rate(self):
+        self.metadata.sample_rate = 3
+        mtts = MTTS('electric', data=np.arange(30), 
+                    channel_metadata=self.metadata)
+        regular = mtts.get_slice('2020-01-01T00:00:01',
+                                 '2020-01-01T00:00:04.333333333')
+        mtts.materialize_time()
+        coordinate = mtts.get_slice('2020-01-01T00:00:01',
+                                    '2020-01-01T00:00:04.333333333')
+        self.assertListEqual(regular.values.tolist(), list(range(3, 14)))
+        self.assertListEqual(regular.values.tolist(), 
+                             coordinate.values.tolist())
+        self.assertEqual(regular.attrs['time_period.end'],
+                         coordinate.attrs['time_period.end'])
+
+    def test_get_slice_fail(self):
+        self.assertRaises(MTTSError, self.mtts.get_slice,
+                          '2020-01-02T00:00:00', '2020-01-03T00:00:00')
+
+    def test_from_xarray(self):
+        new_mtts = MTTS('electric', data=self.mtts.ts)
+        self.assertEqual(new_mtts.start, self.mtts.start)
+        self.assertEqual(new_mtts.end, self.mtts.end)
+        self.assertEqual(new_mtts.sample_rate, 4)
+
+        new_mtts = MTTS('electric', data=self.mtts.materialize_time())
+        self.assertEqual(new_mtts.sample_rate, 4)
+        self.assertEqual(new_mtts.end, self.mtts.end)
+
+    def test_resample(self):
+        self.metadata.sample_rate = 64
+        mtts = MTTS('electric', data=np.ones(256), 
+                    channel_metadata=self.metadata)
+        new_mtts = mtts.resample(8)
+        self.assertEqual(new_mtts.sample_rate, 8)
+        self.assertEqual(new_mtts.n_samples, 32)
+        self.assertEqual(new_mtts.start, mtts.start)
+        self.assertEqual(mtts.sample_rate, 64)
+        # away from the edges a constant stays constant
+        self.assertTrue(np.allclose(new_mtts.ts.values[10:-10], 1, atol=1E-3))
+
+        mtts.resample(8, inplace=True)
+        self.assertEqual(mtts.sample_rate, 8)
+        self.assertEqual(mtts.metadata.sample_rate, 8)
+        self.assertEqual(mtts.end, '2020-01-01T00:00:03.875000+00:00')
+
+    def test_low_pass_filter(self):
+        self.metadata.sample_rate = 256
+        t = np.arange(4096) / 256.
+        mtts = MTTS('electric', data=np.sin(2 * np.pi * 100 * t),
+                    channel_metadata=self.metadata)
+        new_mtts = mtts.low_pass_filter(15, 55, inplace=False)
+        self.assertLess(np.abs(new_mtts.ts.values[256:]).max(), 0.01)
+        self.assertGreater(np.abs(mtts.ts.values).max(), 0.99)
+        self.assertEqual(new_mtts.start, mtts.start)
+
+        mtts.notch_filter(100)
+        self.assertLess(np.abs(mtts.ts.values[2048:]).max(), 0.01)
+
+    def test_bad_data(self):
+        self.assertRaises(MTTSError, MTTS, 'electric', [1, 2, 3])
+
+# =============================================================================
+# Run
+# =============================================================================
+if __name__ == '__main__':
+    unittest.main()